@@ -1,3 +1,9 @@
 from .item import Item
 from .bid import Bid
-from .auction import Auction
\ No newline at end of file
+from .auction import Auction
+from .email_outbox import EmailOutbox
+from .user_stats import UserStats
+from .proxy_bid import ProxyBid
+# Relationship targets, so standalone tools (services CLIs) configure mappers without the app
+from .user import User
+from .order import Order
@@ -1,4 +1,5 @@
 from sqlmodel import SQLModel, Field, Relationship, Column, Integer, ForeignKey
+from sqlalchemy import Index
 from typing import Optional, List
 from datetime import datetime
 
@@ -8,7 +9,7 @@ class AuctionBase(SQLModel):
     end_date: datetime
     min_bid_increment: float = 1.0
     item_id: int = Field(foreign_key="item.id")
-    user_id: int = Field(foreign_key="user.id")
+    user_id: int = Field(foreign_key="user.id", index=True)
 
 
 class Auction(AuctionBase, table=True):
@@ -18,6 +19,10 @@ class Auction(AuctionBase, table=True):
     
     # Instead of using a foreign key, we'll track the winning bid ID as a normal field
     winning_bid_id: Optional[int] = None
+
+    # Denormalized top of the bid book, maintained by bid_service.place_bid
+    current_price: Optional[float] = None
+    highest_bid_id: Optional[int] = None
     
     user: "User" = Relationship(back_populates="auctions")
 
@@ -31,6 +36,12 @@ class Auction(AuctionBase, table=True):
     )
 
 
+# Sweeps for expired auctions filter on both columns
+Index("ix_auction_is_active_end_date", Auction.is_active, Auction.end_date)
+# Keyset pagination for the auction listing
+Index("ix_auction_end_date_id", Auction.end_date, Auction.id)
+
+
 class AuctionCreate(AuctionBase):
     pass
 
@@ -40,6 +51,8 @@ class AuctionRead(AuctionBase):
     is_active: bool
     created_at: datetime
     winning_bid_id: Optional[int] = None
+    current_price: Optional[float] = None
+    highest_bid_id: Optional[int] = None
     user_id: int
     item_id: int
 
@@ -1,4 +1,5 @@
 from sqlmodel import SQLModel, Field, Relationship
+from sqlalchemy import Index
 from typing import Optional, List
 from datetime import datetime
 
@@ -23,6 +24,14 @@ class Bid(BidBase, table=True):
     )
 
 
+# Top-of-book lookups (highest bid per auction) and per-user bid history
+Index("ix_bid_auction_id_amount", Bid.auction_id, Bid.amount.desc())
+Index("ix_bid_user_id_created_at", Bid.user_id, Bid.created_at)
+# Keyset pagination for the bid listing, overall and per auction
+Index("ix_bid_created_at_id", Bid.created_at, Bid.id)
+Index("ix_bid_auction_id_created_at_id", Bid.auction_id, Bid.created_at, Bid.id)
+
+
 class BidCreate(BidBase):
     pass
 
@@ -0,0 +1,22 @@
+from sqlmodel import SQLModel, Field
+from sqlalchemy import Index
+from typing import Optional
+from datetime import datetime
+
+
+class EmailOutbox(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    from_address: str
+    to_address: str
+    subject: str
+    html: str
+    status: str = "pending"  # pending, sent or failed
+    attempts: int = 0
+    next_attempt_at: datetime = Field(default_factory=datetime.utcnow)
+    last_error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    sent_at: Optional[datetime] = None
+
+
+# The outbox worker only ever looks for due pending messages
+Index("ix_emailoutbox_status_next_attempt_at", EmailOutbox.status, EmailOutbox.next_attempt_at)
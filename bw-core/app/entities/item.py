@@ -1,4 +1,5 @@
 from sqlmodel import SQLModel, Field, Relationship
+from sqlalchemy import DDL, Index, event, func, literal_column
 from typing import Optional, List
 from datetime import datetime
 
@@ -19,6 +20,35 @@ class Item(ItemBase, table=True):
     orders: List["Order"] = Relationship(back_populates="item")
 
 
+# Keyset pagination for the item listing
+Index("ix_item_created_at_id", Item.created_at, Item.id)
+
+# Weighted full-text document (name ranks above description). Search queries
+# must use this exact expression for the planner to pick the GIN index.
+ITEM_SEARCH_DOCUMENT = func.setweight(
+    func.to_tsvector(literal_column("'english'"), Item.name), literal_column("'A'")
+).op("||")(
+    func.setweight(func.to_tsvector(literal_column("'english'"), Item.description), literal_column("'B'"))
+)
+
+# Postgres-only search indexes; SQLite falls back to the in-memory index in services/search.py
+event.listen(
+    SQLModel.metadata, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql")
+)
+event.listen(
+    Item.__table__,
+    "after_create",
+    DDL(
+        "CREATE INDEX IF NOT EXISTS ix_item_search_document ON item USING gin (("
+        "setweight(to_tsvector('english', item.name), 'A') || "
+        "setweight(to_tsvector('english', item.description), 'B')))"
+    ).execute_if(dialect="postgresql")
+)
+Index(
+    "ix_item_name_trgm", Item.name, postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}
+).ddl_if(dialect="postgresql")
+
+
 class ItemCreate(ItemBase):
     pass
 
@@ -0,0 +1,30 @@
+from sqlmodel import SQLModel, Field
+from sqlalchemy import Index, UniqueConstraint
+from typing import Optional
+from datetime import datetime
+
+
+class ProxyBidBase(SQLModel):
+    max_amount: float
+    user_id: int = Field(foreign_key="user.id")
+    auction_id: int = Field(foreign_key="auction.id")
+
+
+class ProxyBid(ProxyBidBase, table=True):
+    """A bidder's hidden maximum; the engine bids on their behalf up to it"""
+    __tablename__ = "proxy_bid"
+    __table_args__ = (UniqueConstraint("auction_id", "user_id"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    # Earlier proxies win ties at the same maximum
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    # Cleared once outbid beyond the maximum
+    is_active: bool = True
+
+
+# Resolution reads the live proxies of one auction, strongest first
+Index("ix_proxy_bid_auction_id_active_max", ProxyBid.auction_id, ProxyBid.is_active, ProxyBid.max_amount)
+
+
+class ProxyBidCreate(ProxyBidBase):
+    pass
@@ -1,6 +1,7 @@
 from sqlmodel import Field, SQLModel, Relationship
 from enum import Enum
 from typing import List, ClassVar
+from sqlalchemy import Index
 from sqlalchemy.orm import relationship
 
 
@@ -30,6 +31,15 @@ class User(SQLModel, table=True):
         orm_mode = True
         from_attributes = True
 
+
+# Trigram indexes let substring search on username/email use an index (Postgres only)
+Index(
+    "ix_user_username_trgm", User.username, postgresql_using="gin", postgresql_ops={"username": "gin_trgm_ops"}
+).ddl_if(dialect="postgresql")
+Index(
+    "ix_user_email_trgm", User.email, postgresql_using="gin", postgresql_ops={"email": "gin_trgm_ops"}
+).ddl_if(dialect="postgresql")
+
 # Request model to create a new user.
 class UserCreate(SQLModel):
     username: str
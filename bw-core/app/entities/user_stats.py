@@ -0,0 +1,14 @@
+from sqlmodel import SQLModel, Field
+from typing import Optional
+from datetime import datetime
+
+
+class UserStats(SQLModel, table=True):
+    """Activity counters per user, kept current by the write paths that change them"""
+    __tablename__ = "user_stats"
+
+    user_id: int = Field(foreign_key="user.id", primary_key=True, ondelete="CASCADE")
+    bids_placed: int = 0
+    auctions_created: int = 0
+    auctions_won: int = 0
+    last_activity: Optional[datetime] = None
@@ -1,20 +1,66 @@
-from fastapi import FastAPI
+import os
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.docs import get_swagger_ui_html
 
-from .routers import hello, auction_router, item_router, bid_router, user, order_router, payment_router
+from .routers import hello, auction_router, item_router, bid_router, user, order_router, payment_router, ws_router
 from .services.background_service import start_background_tasks, stop_background_tasks
+from .services.auction_events import start_event_hub, stop_event_hub
+from .services.security import shutdown_password_pool
+from .services.db import dispose_async_engine, mark_write
+from .services.compression import CompressionMiddleware
+from .services.idempotency import IdempotencyMiddleware, REPLAYED_HEADER, idempotency_store
+from .services.response_cache import response_cache
+
+# Browser origins allowed to call the API with cookies. Credentialed requests need the
+# exact origin echoed back, so the read-your-writes cookie never works with a bare "*".
+CORS_ORIGINS = [origin.strip() for origin in os.getenv("CORS_ORIGINS", "http://localhost:3000").split(",") if origin.strip()]
 
 app = FastAPI()
 
+# Client retries of these writes are answered from the idempotency store instead of running twice.
+# Added before CORS so replayed responses still get CORS headers on the way out.
+app.add_middleware(
+    IdempotencyMiddleware,
+    routes=[
+        ("POST", r"/api/v1/bids/"),
+        ("POST", r"/api/v1/payments/process-auction-payment/\d+"),
+    ],
+)
+
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    allow_origins=CORS_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", REPLAYED_HEADER],
+)
+
+# Listings and bid histories are worth compressing from a smaller size than the default
+app.add_middleware(
+    CompressionMiddleware,
+    route_minimum_sizes={
+        "/api/v1/auctions": 512,
+        "/api/v1/bids": 512,
+        "/api/v1/items": 512,
+    },
 )
 
+# Methods that never write; anything else pins the client to the primary for a moment
+READ_ONLY_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+@app.middleware("http")
+async def read_your_writes(request: Request, call_next):
+    """Start the read-your-writes window so replica lag never hides a client's own write"""
+    response = await call_next(request)
+    if request.method not in READ_ONLY_METHODS and response.status_code < 400:
+        mark_write(response)
+    return response
+
+
 app.include_router(hello.router, prefix="/api/v1")
 app.include_router(user.router, prefix="/api/v1")
 app.include_router(auction_router.router, prefix="/api/v1") 
@@ -22,6 +68,7 @@ app.include_router(item_router.router, prefix="/api/v1")
 app.include_router(bid_router.router, prefix="/api/v1")
 app.include_router(order_router.router, prefix="/api/v1")
 app.include_router(payment_router.router, prefix="/api/v1")
+app.include_router(ws_router.router, prefix="/api/v1")
 
 @app.get("/", include_in_schema=False)
 async def root():
@@ -30,9 +77,20 @@ async def root():
 @app.on_event("startup")
 async def startup_event():
     """Start background tasks when the application starts"""
-    start_background_tasks()
+    # Shared cache tables are created here, off the event loop, rather than by the first request;
+    # if the database isn't reachable yet, the first request creates them instead (also off the loop)
+    try:
+        await response_cache.ensure_tables()
+        await idempotency_store.ensure_table()
+    except Exception as e:
+        print(f"Could not create the shared cache tables: {e}")
+    start_event_hub()
+    await start_background_tasks()
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Stop background tasks when the application shuts down"""
-    stop_background_tasks()
+    await stop_background_tasks()
+    stop_event_hub()
+    shutdown_password_pool()
+    await dispose_async_engine()
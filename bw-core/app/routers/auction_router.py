@@ -1,29 +1,45 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import asyncio
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
 from sqlmodel import Session, select
-from typing import List
+from typing import List, Optional
 from fastapi import BackgroundTasks
 from datetime import datetime, timedelta
 from ..entities.bid import Bid
 from ..entities.item import Item
 from ..entities.user import User
-from ..services.db import get_db
+from sqlmodel.ext.asyncio.session import AsyncSession
+from ..services.db import engine, get_db, get_async_db, get_read_db, get_async_read_db
 from ..services.auction_service import (
     determine_winner,
     process_ended_auctions,
     get_auction_with_winner,
     get_auction_with_latest_bid,
+    get_auction_bids_page,
     get_auctions_by_seller,
     get_auctions_by_seller2
 )
 from ..entities.auction import Auction, AuctionCreate, AuctionRead, AuctionUpdate
 from ..services.user import get_user_by_id, get_user_role, hash_password
-from ..services.email_service import send_hi_email, send_auction_end_notification
+from ..services.email_service import send_hi_email, queue_auction_end_notification, outbox_worker
+from ..services.auction_events import hub, format_sse, publish_auction_ended
+from ..services.auction_closer import closer
+from ..services.search import memory_index, search_auctions
+from ..services.response_cache import cached_auction_response, invalidate_auctions, response_cache
+from ..services.fast_json import FastJSONResponse, json_list, serialize_auction
+from ..services.pagination import keyset_page, NEXT_CURSOR_HEADER
+from ..services.user_stats import record_auction_created, record_auctions_won, rebuild_user_stats
+from ..services.synthetic_data import SYNTHETIC_PASSWORD, SyntheticConfig, generate
+from ..services.security import require_admin_token
 
 router = APIRouter(
     prefix="/auctions",
     tags=["auctions"],
 )
 
+# Comment frames keep idle SSE connections open through proxies
+SSE_HEARTBEAT_SECONDS = 15
+
 
 @router.post("/", response_model=AuctionRead, status_code=status.HTTP_201_CREATED)
 def create_auction(auction: AuctionCreate, db: Session = Depends(get_db)):
@@ -37,24 +53,30 @@ def create_auction(auction: AuctionCreate, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail="User must be a seller")
     db_auction = Auction.model_validate(auction)
     db.add(db_auction)
+    record_auction_created(db, db_auction)
     db.commit()
     db.refresh(db_auction)
+    closer.schedule(db_auction.id, db_auction.end_date)
     return db_auction
 
 
 @router.get("/", response_model=List[AuctionRead])
-def read_auctions(
-    skip: int = 0, limit: int = 100, active_only: bool = False, db: Session = Depends(get_db)
+async def read_auctions(
+    after: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    active_only: bool = False,
+    db: AsyncSession = Depends(get_async_read_db)
 ):
+    """Auctions ending soonest first. The X-Next-Cursor header, passed back as `after`, fetches the next page."""
     query = select(Auction)
     if active_only:
         query = query.where(Auction.is_active == True)
     
-    auctions = db.exec(query.offset(skip).limit(limit)).all()
-    return auctions
+    auctions, next_cursor = await db.run_sync(keyset_page, query, (Auction.end_date, Auction.id), after, limit)
+    return json_list(auctions, serialize_auction, {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None)
 
 @router.get("/startedby2", response_model=List[AuctionRead])
-def get_auctions_started_by_seller2(seller_id: int, db: Session = Depends(get_db)):
+def get_auctions_started_by_seller2(seller_id: int, db: Session = Depends(get_read_db)):
     """
     Fetch all auctions started by the seller with the given seller_id.
     """
@@ -65,10 +87,10 @@ def get_auctions_started_by_seller2(seller_id: int, db: Session = Depends(get_db
     if not auctions:
         raise HTTPException(status_code=404, detail="No auctions found for the given seller ID")
      
-    return auctions
+    return json_list(auctions, serialize_auction)
 
 @router.get("/startedby", response_model=List[AuctionRead])
-def get_auctions_started_by_seller(seller_id: int, db: Session = Depends(get_db)):
+def get_auctions_started_by_seller(seller_id: int, db: Session = Depends(get_read_db)):
     """
     Fetch all auctions started by the seller with the given seller_id.
     """
@@ -79,14 +101,98 @@ def get_auctions_started_by_seller(seller_id: int, db: Session = Depends(get_db)
     if not auctions:
         raise HTTPException(status_code=404, detail="No auctions found for the given seller ID")
     
-    return auctions
+    return json_list(auctions, serialize_auction)
+
+@router.get("/search", response_model=List[dict])
+def search_auction_listings(
+    q: str = Query(..., min_length=1),
+    active_only: bool = True,
+    ending_within_hours: Optional[float] = Query(None, gt=0),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Search auctions by item name and description, best match first.
+    ending_within_hours narrows to active auctions closing inside that window.
+    """
+    ending_within = timedelta(hours=ending_within_hours) if ending_within_hours else None
+    return FastJSONResponse(search_auctions(db, q, active_only, ending_within, limit))
+
+@router.get("/closer/metrics", response_model=dict)
+def get_closer_metrics():
+    """Close-lag distribution and backlog of the in-memory auction closer"""
+    return {"pending": closer.pending(), "close_lag": closer.lag.snapshot()}
+
+@router.get("/cache/metrics", response_model=dict)
+def get_cache_metrics():
+    """Hit ratio and size of the auction response cache"""
+    return response_cache.stats()
 
 @router.get("/{auction_id}", response_model=dict)
-def read_auction(auction_id: int, db: Session = Depends(get_db)):
-    result = get_auction_with_latest_bid(db, auction_id)
-    if not result:
+async def read_auction(auction_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    response = await cached_auction_response(
+        request, f"auction:{auction_id}", auction_id,
+        lambda: db.run_sync(get_auction_with_latest_bid, auction_id)
+    )
+    if response is None:
         raise HTTPException(status_code=404, detail="Auction not found")
-    return result
+    return response
+
+
+@router.get("/{auction_id}/bids", response_model=dict)
+async def read_auction_bids(
+    auction_id: int,
+    after: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Keyset-paginated bid history, highest first. Pass next_cursor back as `after`."""
+    if not await db.get(Auction, auction_id):
+        raise HTTPException(status_code=404, detail="Auction not found")
+    return FastJSONResponse(await db.run_sync(get_auction_bids_page, auction_id, after, limit))
+
+
+@router.get("/{auction_id}/events")
+async def stream_auction_events(auction_id: int, last_event_id: Optional[str] = Header(None)):
+    """
+    Server-Sent Events feed of price ticks and the ended event for one auction.
+    Reconnects send Last-Event-ID (a bid id, so any worker can resume it) and
+    are replayed from memory, not the database.
+    """
+    try:
+        resume_from = int(last_event_id) if last_event_id else 0
+    except ValueError:
+        resume_from = 0
+
+    async def event_stream():
+        last_seen = resume_from
+        subscriber = hub.subscribe(auction_id)
+        try:
+            for event_id, event in hub.events_since(auction_id, last_seen):
+                yield format_sse(event_id, event)
+                last_seen = event_id
+
+            while True:
+                try:
+                    entry = await asyncio.wait_for(subscriber.queue.get(), SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if entry is None:
+                    # Dropped for falling behind; EventSource reconnects and resumes
+                    return
+                event_id, event = entry
+                if event_id > last_seen:
+                    yield format_sse(event_id, event)
+                    last_seen = event_id
+        finally:
+            hub.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 @router.patch("/{auction_id}", response_model=AuctionRead)
@@ -102,8 +208,10 @@ def update_auction(
         setattr(db_auction, key, value)
     
     db.add(db_auction)
+    invalidate_auctions(db, [auction_id])
     db.commit()
     db.refresh(db_auction)
+    closer.schedule(db_auction.id, db_auction.end_date if db_auction.is_active else None)
     return db_auction
 
 
@@ -114,17 +222,22 @@ def delete_auction(auction_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Auction not found")
     
     db.delete(db_auction)
+    invalidate_auctions(db, [auction_id])
     db.commit()
+    closer.schedule(auction_id, None)
     return None
 
 
 @router.get("/{auction_id}/status", response_model=dict)
-def get_auction_status(auction_id: int, db: Session = Depends(get_db)):
+async def get_auction_status(auction_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
     """Get detailed status of an auction, including winner information if ended"""
-    result = get_auction_with_winner(db, auction_id)
-    if not result:
+    response = await cached_auction_response(
+        request, f"auction-status:{auction_id}", auction_id,
+        lambda: db.run_sync(get_auction_with_winner, auction_id)
+    )
+    if response is None:
         raise HTTPException(status_code=404, detail="Auction not found")
-    return result
+    return response
 
 
 @router.post("/{auction_id}/end", response_model=dict)
@@ -145,7 +258,7 @@ def end_auction_manually(auction_id: int, db: Session = Depends(get_db)):
     highest_bid = db.exec(
         select(Bid)
         .where(Bid.auction_id == auction_id)
-        .order_by(Bid.amount.desc())
+        .order_by(Bid.amount.desc(), Bid.id)
     ).first()
     
     # Update auction status
@@ -168,31 +281,38 @@ def end_auction_manually(auction_id: int, db: Session = Depends(get_db)):
             print("Winner or seller not found")  # Debug log
             raise HTTPException(status_code=404, detail="Winner or seller not found")
             
-        # Send email notifications
-        try:
-            email_response = send_auction_end_notification(
-                winner_email=winner.email,
-                seller_email=seller.email,
-                item_name=item.name,
-                winning_amount=highest_bid.amount
-            )
-            print("Email notifications sent:", email_response)  # Debug log
-        except Exception as e:
-            print(f"Failed to send email notifications: {str(e)}")  # Debug log
-            # Don't raise the exception - we still want to end the auction even if email fails
+        # Queue email notifications; they are committed with the auction update
+        # and delivered by the outbox worker, so ending never waits on email
+        queue_auction_end_notification(
+            db,
+            winner_email=winner.email,
+            seller_email=seller.email,
+            item_name=item.name,
+            winning_amount=highest_bid.amount
+        )
+        record_auctions_won(db, [highest_bid.id])
     else:
         print(f"No bids found for auction {auction_id}")  # Debug log
     
     # Save the changes
     try:
         db.add(auction)
+        invalidate_auctions(db, [auction_id])
         db.commit()
         db.refresh(auction)
         print(f"Successfully ended auction {auction_id}")  # Debug log
+        outbox_worker.notify()
     except Exception as e:
         print(f"Error saving auction {auction_id}: {str(e)}")  # Debug log
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Error saving auction: {str(e)}")
+
+    closer.schedule(auction.id, None)
+    publish_auction_ended(
+        auction.id,
+        highest_bid.id if highest_bid else None,
+        highest_bid.amount if highest_bid else None
+    )
     
     # Return winner info if there's a winner
     if highest_bid:
@@ -217,12 +337,15 @@ def process_ended_auctions_route(background_tasks: BackgroundTasks, db: Session
 def create_sample_auction(db: Session = Depends(get_db)):
     """Creates multiple sample auctions with sellers, items, and bids for testing"""
     
+    # Every sample user shares the same password, so hash it once
+    sample_password = hash_password("123")
+
     # Create sellers
     sellers = [
         User(
             username=f"seller_{i}",
             email=f"s{i}@test.com",
-            password=hash_password("123"),
+            password=sample_password,
             is_active=True,
             is_admin=False,
             role="seller",
@@ -241,7 +364,7 @@ def create_sample_auction(db: Session = Depends(get_db)):
         User(
             username=f"bidder_{i}",
             email=f"b{i}@test.com",
-            password=hash_password("123"),
+            password=sample_password,
             is_active=True,
             is_admin=False,
             role="buyer",
@@ -400,12 +523,20 @@ def create_sample_auction(db: Session = Depends(get_db)):
             created_bids.append(bid)
     db.flush()
 
+    # Keep the denormalized top bid in sync (amounts above are ascending)
+    for auction in created_auctions:
+        auction_bids = [bid for bid in created_bids if bid.auction_id == auction.id]
+        if auction_bids:
+            auction.current_price = auction_bids[-1].amount
+            auction.highest_bid_id = auction_bids[-1].id
+
     # Set winning bid for ended auction
     ended_auction = created_auctions[0]
     ended_auction.winning_bid_id = created_bids[2].id  # Highest bid for first auction
     ended_auction.is_active = False
 
     db.commit()
+    rebuild_user_stats(db, [user.id for user in sellers + bidders])
 
     return {
         "message": "Sample auctions created successfully",
@@ -416,6 +547,50 @@ def create_sample_auction(db: Session = Depends(get_db)):
         "bidders_created": len(bidders)
     }
 
+
+async def _load_synthetic_dataset(config: SyntheticConfig):
+    summary = await asyncio.to_thread(generate, engine, config)
+    # The rows bypassed the ORM, so nothing in this process has seen them yet
+    memory_index.invalidate()
+    await closer.resync()
+    print(f"Synthetic dataset loaded: {summary}")
+
+
+@router.post(
+    "/create-synthetic",
+    response_model=dict,
+    status_code=status.HTTP_202_ACCEPTED,
+    tags=["development"],
+    dependencies=[Depends(require_admin_token)]
+)
+def create_synthetic_dataset(
+    background_tasks: BackgroundTasks,
+    users: int = Query(10_000, ge=2),
+    auctions: int = Query(5_000, ge=0),
+    bids: int = Query(500_000, ge=0),
+    seed: int = 4413
+):
+    """
+    Bulk-loads synthetic users, auctions and bids in the background. Operators
+    only (X-Admin-Token): every generated user shares SYNTHETIC_PASSWORD. For
+    millions of rows use `python -m app.services.synthetic_data` instead.
+
+    Cached auction reads are invalidated for every worker when the postgres
+    response cache is in use. Only the worker that ran the load rebuilds its
+    search index and closer heap, though: with several workers, the others
+    find the new auctions at the closer's next resync or fallback sweep, and
+    their in-memory search index (SQLite only) not until they restart.
+    """
+    config = SyntheticConfig(users=users, auctions=auctions, bids=bids, seed=seed)
+    background_tasks.add_task(_load_synthetic_dataset, config)
+    return {
+        "message": "Synthetic dataset load started",
+        "users": users,
+        "auctions": auctions,
+        "bids": bids,
+        "password": SYNTHETIC_PASSWORD
+    }
+
 @router.post("/test/email", response_model=dict)
 def test_email_service():
     """
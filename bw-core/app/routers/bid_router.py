@@ -1,11 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlmodel import Session, select
-from typing import List
+from typing import List, Optional
 
-from ..services.db import get_db
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from ..services.db import get_db, get_async_db, get_read_db
 from ..entities.bid import Bid, BidCreate, BidRead, BidUpdate
-from ..entities.auction import Auction
-from ..services.user import get_user_by_id, get_user_role
+from ..entities.proxy_bid import ProxyBidCreate
+from ..services.bid_service import delete_bid, place_bid, place_proxy_bid, update_bid
+from ..services.bid_sequencer import sequencer
+from ..services.fast_json import json_list, serialize_bid
+from ..services.export import export_response
+from ..services.pagination import keyset_page, NEXT_CURSOR_HEADER
+from ..services.security import require_admin_token
 
 router = APIRouter(
     prefix="/bids",
@@ -14,51 +21,53 @@ router = APIRouter(
 
 
 @router.post("/", response_model=BidRead, status_code=status.HTTP_201_CREATED)
-def create_bid(bid: BidCreate, db: Session = Depends(get_db)):
-    # Check if auction exists and is active
-    auction = db.get(Auction, bid.auction_id)
-    if not auction:
-        raise HTTPException(status_code=404, detail="Auction not found")
-    if not auction.is_active:
-        raise HTTPException(status_code=400, detail="Auction is not active")
-    if get_user_by_id(db, bid.user_id) is None:
-        raise HTTPException(status_code=400, detail="User not found")
-    if get_user_role(db, bid.user_id) != "buyer":
-        raise HTTPException(status_code=400, detail="User must be a buyer")
-    
-    # Find the highest bid for this auction
-    highest_bid_query = select(Bid).where(Bid.auction_id == bid.auction_id).order_by(Bid.amount.desc())
-    highest_bid = db.exec(highest_bid_query).first()
-    
-    # Check if the new bid is high enough
-    min_bid = auction.item.initial_price
-    if highest_bid:
-        min_bid = highest_bid.amount + auction.min_bid_increment
-    
-    if bid.amount < min_bid:
-        raise HTTPException(
-            status_code=400, 
-            detail=f"Bid must be at least {min_bid}"
-        )
-    
-    # Create the bid
-    db_bid = Bid.model_validate(bid)
-    db.add(db_bid)
-    db.commit()
-    db.refresh(db_bid)
-    return db_bid
+async def create_bid(bid: BidCreate, db: AsyncSession = Depends(get_async_db)):
+    if sequencer.owns(bid.auction_id):
+        # This worker is the auction's single writer: queue it for the next group commit
+        return await sequencer.submit(bid)
+    return await db.run_sync(place_bid, bid)
+
+
+@router.post("/proxy", response_model=dict, status_code=status.HTTP_201_CREATED)
+async def create_proxy_bid(proxy_bid: ProxyBidCreate, db: AsyncSession = Depends(get_async_db)):
+    """
+    Bid up to max_amount automatically. Competing proxies are resolved at once
+    and only the resulting visible bids are written; the maximum stays private.
+    """
+    return await db.run_sync(place_proxy_bid, proxy_bid)
 
 
 @router.get("/", response_model=List[BidRead])
 def read_bids(
-    skip: int = 0, limit: int = 100, auction_id: int = None, db: Session = Depends(get_db)
+    after: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    auction_id: int = None,
+    db: Session = Depends(get_read_db)
 ):
+    """Newest bids first. The X-Next-Cursor header, passed back as `after`, fetches the next page."""
     query = select(Bid)
     if auction_id:
         query = query.where(Bid.auction_id == auction_id)
     
-    bids = db.exec(query.order_by(Bid.created_at.desc()).offset(skip).limit(limit)).all()
-    return bids
+    bids, next_cursor = keyset_page(db, query, (Bid.created_at, Bid.id), after, limit, descending=True)
+    return json_list(bids, serialize_bid, {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None)
+
+
+@router.get("/sequencer/metrics", response_model=dict)
+def sequencer_metrics():
+    """Live actors and queued bids on this worker's bid sequencer"""
+    return sequencer.stats()
+
+
+@router.get("/export", dependencies=[Depends(require_admin_token)])
+def export_bids(auction_id: Optional[int] = None, user_id: Optional[int] = None, format: str = "ndjson"):
+    """Stream every matching bid as NDJSON or CSV, oldest first, in constant memory. Operators only (X-Admin-Token)."""
+    statement = select(Bid.id, Bid.auction_id, Bid.user_id, Bid.amount, Bid.created_at)
+    if auction_id:
+        statement = statement.where(Bid.auction_id == auction_id)
+    if user_id:
+        statement = statement.where(Bid.user_id == user_id)
+    return export_response(statement.order_by(Bid.id), format, "bids")
 
 
 @router.get("/{bid_id}", response_model=BidRead)
@@ -70,29 +79,13 @@ def read_bid(bid_id: int, db: Session = Depends(get_db)):
 
 
 @router.patch("/{bid_id}", response_model=BidRead)
-def update_bid(
+def update_bid_route(
     bid_id: int, bid_update: BidUpdate, db: Session = Depends(get_db)
 ):
-    db_bid = db.get(Bid, bid_id)
-    if not db_bid:
-        raise HTTPException(status_code=404, detail="Bid not found")
-    
-    bid_data = bid_update.dict(exclude_unset=True)
-    for key, value in bid_data.items():
-        setattr(db_bid, key, value)
-    
-    db.add(db_bid)
-    db.commit()
-    db.refresh(db_bid)
-    return db_bid
+    return update_bid(db, bid_id, bid_update)
 
 
 @router.delete("/{bid_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_bid(bid_id: int, db: Session = Depends(get_db)):
-    db_bid = db.get(Bid, bid_id)
-    if not db_bid:
-        raise HTTPException(status_code=404, detail="Bid not found")
-    
-    db.delete(db_bid)
-    db.commit()
+def delete_bid_route(bid_id: int, db: Session = Depends(get_db)):
+    delete_bid(db, bid_id)
     return None
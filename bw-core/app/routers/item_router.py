@@ -1,8 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlmodel import Session, select
-from typing import List
+from typing import List, Optional
 
-from ..services.db import get_db
+from ..services.db import get_db, get_read_db
+from ..services.fast_json import json_list, serialize_item
+from ..services.pagination import keyset_page, NEXT_CURSOR_HEADER
 from ..entities.item import Item, ItemCreate, ItemRead, ItemUpdate
 
 router = APIRouter(
@@ -21,9 +23,14 @@ def create_item(item: ItemCreate, db: Session = Depends(get_db)):
 
 
 @router.get("/", response_model=List[ItemRead])
-def read_items(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    items = db.exec(select(Item).offset(skip).limit(limit)).all()
-    return items
+def read_items(
+    after: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    db: Session = Depends(get_read_db)
+):
+    """Items oldest first. The X-Next-Cursor header, passed back as `after`, fetches the next page."""
+    items, next_cursor = keyset_page(db, select(Item), (Item.created_at, Item.id), after, limit)
+    return json_list(items, serialize_item, {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None)
 
 
 @router.get("/{item_id}", response_model=ItemRead)
@@ -2,8 +2,10 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from app.services.order_service import OrderService
 from app.services.db import get_db
-from typing import List
+from typing import List, Optional
 from app.entities.order import Order
+from app.services.export import export_response
+from app.services.security import require_admin_token
 from sqlmodel import select
 
 router = APIRouter()
@@ -25,6 +27,35 @@ def get_user_orders(user_id: int, db: Session = Depends(get_db)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/orders/export", dependencies=[Depends(require_admin_token)])
+def export_orders(
+    user_id: Optional[int] = None,
+    auction_id: Optional[int] = None,
+    format: str = "ndjson",
+    include_shipping: bool = False
+):
+    """
+    Stream every matching order as NDJSON or CSV in constant memory. Operators
+    only (X-Admin-Token). Buyers' names, addresses and phone numbers are left
+    out unless include_shipping is set.
+    """
+    columns = [Order.id, Order.user_id, Order.auction_id, Order.item_id, Order.total_paid]
+    if include_shipping:
+        columns += [
+            Order.user_name,
+            Order.street_address,
+            Order.province,
+            Order.country,
+            Order.postal_code,
+            Order.phone_number,
+        ]
+    statement = select(*columns)
+    if user_id:
+        statement = statement.where(Order.user_id == user_id)
+    if auction_id:
+        statement = statement.where(Order.auction_id == auction_id)
+    return export_response(statement.order_by(Order.id), format, "orders")
+
 # @router.post("/orders/", response_model=dict)
 # def create_order(order_data: OrderRequest, db: Session = Depends(get_db)):
 #     try:
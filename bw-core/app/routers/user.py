@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlmodel import Session
 from typing import List
 from app.models.user import UserResponse, UserUpdate
 from app.services.user import *
-from app.services.db import get_db
+from app.services.db import get_db, get_async_db, get_read_db
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app.models.user import UserCreate
 from app.entities.user import UserRole
 from typing import Optional
@@ -11,6 +12,11 @@ from app.models.user import UserAuthenticate
 from datetime import datetime, timedelta
 from fastapi import BackgroundTasks
 from app.models.user import UserProfileResponse
+from app.entities.user_stats import UserStats
+from app.services.security import verify_password_async, hash_password_async, needs_rehash
+from app.services.rate_limit import login_throttle
+from app.services import search
+from starlette.concurrency import run_in_threadpool
 
 
 
@@ -21,32 +27,23 @@ router = APIRouter(prefix="/user", tags=["User Management"])
  #   return get_all_users(db)
 
 @router.get("/", response_model=List[UserResponse])
-def list_users(db: Session = Depends(get_db)):
-    users = get_all_users(db)
-    user_list = []
-    
-    for user in users:
-        # Get auctions where user is the seller
-        listed_auctions = [auction.id for auction in user.auctions]
-
-        # Get auctions where user is bidding
-        bidding_on_auctions = [bid.auction_id for bid in user.bids]
-
-        user_list.append(UserResponse(
-            id=user.id,
-            username=user.username,
-            email=user.email,
-            role=user.role,
-            listed_auctions=listed_auctions,
-            bidding_on_auctions=bidding_on_auctions
-        ))
-    
-    return user_list
+def list_users(
+    after: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db)
+):
+    """List users by id; pass the last id of a page as `after` to get the next one."""
+    return get_users_page(db, after, limit)
 
 @router.get("/search/", response_model=List[UserResponse])
-def search_users(query: str, db: Session = Depends(get_db)):
-    users = search_users_in_db(db, query)
-    return users
+def search_users(
+    query: Optional[str] = None,
+    role: Optional[UserRole] = None,
+    limit: int = Query(50, ge=1, le=200),
+    db: Session = Depends(get_read_db)
+):
+    """Users whose username or email contains the query, closest match first."""
+    return search.search_users(db, query, role, limit)
 
 @router.get("/search2", response_model=bool)
 def check_user_by_email(email: str, db: Session = Depends(get_db)):
@@ -66,11 +63,11 @@ def read_user(user_id: int, db: Session = Depends(get_db)):
     return user
 
 @router.post("/", response_model=UserResponse)
-def create_user(user: UserCreate, db: Session = Depends(get_db)):
-    existing_user = get_user_by_email(db, user.email)
+async def create_user(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    existing_user = await db.run_sync(get_user_by_email, user.email)
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
-    return create_user_in_db(db, user)
+    return await create_user_in_db_async(db, user)
 
 @router.put("/{user_id}", response_model=UserResponse)
 def update_user(user_id: int, user_update: UserUpdate, db: Session = Depends(get_db)):
@@ -96,33 +93,25 @@ def update_user(user_id: int, user_update: UserUpdate, db: Session = Depends(get
 
 @router.get("/{user_id}/profile", response_model=UserProfileResponse)
 def get_user_profile(user_id: int, db: Session = Depends(get_db)):
-    user = get_user_by_id(db, user_id)
-    if not user:
+    # One primary-key read of the user joined to their maintained stats row
+    row = db.exec(
+        select(User, UserStats)
+        .outerjoin(UserStats, UserStats.user_id == User.id)
+        .where(User.id == user_id)
+    ).first()
+    if not row:
         raise HTTPException(status_code=404, detail="User not found")
-
-    # Count total auctions created by the user (if seller)
-    total_auctions_created = len(user.auctions)
-
-    # Count total bids placed by the user (if buyer)
-    total_bids_placed = len(user.bids)
-
-    # Count how many auctions they won
-    total_won_auctions = sum(1 for bid in user.bids if bid.auction.winning_bid_id == bid.id)
-
-    # Find last activity timestamp
-    last_bid_time = max((bid.created_at for bid in user.bids), default=None)
-    last_auction_time = max((auction.created_at for auction in user.auctions), default=None)
-    last_activity = max(filter(None, [last_bid_time, last_auction_time]), default=None)
+    user, stats = row
 
     return UserProfileResponse(
         id=user.id,
         username=user.username,
         email=user.email,
         role=user.role,
-        total_bids_placed=total_bids_placed,
-        total_auctions_created=total_auctions_created,
-        total_won_auctions=total_won_auctions,
-        last_activity=last_activity
+        total_bids_placed=stats.bids_placed if stats else 0,
+        total_auctions_created=stats.auctions_created if stats else 0,
+        total_won_auctions=stats.auctions_won if stats else 0,
+        last_activity=stats.last_activity if stats else None
     )
 
 
@@ -157,59 +146,33 @@ def delete_user(user_id: int, db: Session = Depends(get_db)):
 
 
 
-@router.get("/search/", response_model=List[UserResponse])
-def search_users(query: Optional[str] = None, role: Optional[UserRole] = None, db: Session = Depends(get_db)):
-    statement = select(User)
-    
-    # Apply search filter if provided
-    if query:
-        statement = statement.where(
-            (User.username.ilike(f"%{query}%")) | (User.email.ilike(f"%{query}%"))
-        )
-
-    # Apply role filter if provided
-    if role:
-        statement = statement.where(User.role == role)
-
-    users = db.exec(statement).all()
-    return users
-
-
-
-# Temporary storage for failed login attempts
-failed_login_attempts = {}
+@router.post("/login", response_model=UserResponse)
+async def login(user_data: UserAuthenticate, db: AsyncSession = Depends(get_async_db), background_tasks: BackgroundTasks = None):
+    throttle_key = user_data.email.lower()
 
-def reset_failed_attempts(username: str):
-    """Resets the failed login count after timeout."""
-    if username in failed_login_attempts:
-        del failed_login_attempts[username]
+    # Check if the email has too many recent failed attempts
+    if await run_in_threadpool(login_throttle.is_blocked, throttle_key):
+        raise HTTPException(status_code=429, detail="Too many failed attempts. Try again later.")
 
-@router.post("/login", response_model=UserResponse)
-def login(user_data: UserAuthenticate, db: Session = Depends(get_db), background_tasks: BackgroundTasks = None):
-    user = get_user_by_email(db, user_data.email)
+    user = await db.run_sync(get_user_by_email, user_data.email)
 
     if not user:
         raise HTTPException(status_code=404, detail="User does not exist")
 
-    # Check if the user has too many failed attempts
-    if user.email in failed_login_attempts:
-        attempts, lockout_time = failed_login_attempts[user.email]
-        if attempts >= 5 and lockout_time > datetime.utcnow():
-            raise HTTPException(status_code=429, detail="Too many failed attempts. Try again later.")
-
-    # Verify password
-    if not verify_password(user_data.password, user.password):
+    # Verify password on the bcrypt process pool
+    if not await verify_password_async(user_data.password, user.password):
         # Track failed attempts
-        if user.email not in failed_login_attempts:
-            failed_login_attempts[user.email] = (1, datetime.utcnow() + timedelta(minutes=5))
-        else:
-            attempts, _ = failed_login_attempts[user.email]
-            failed_login_attempts[user.email] = (attempts + 1, datetime.utcnow() + timedelta(minutes=5))
+        await run_in_threadpool(login_throttle.record_failure, throttle_key)
 
         raise HTTPException(status_code=401, detail="Incorrect password")
 
+    # Upgrade the stored hash if the configured cost factor changed
+    if needs_rehash(user.password):
+        new_hash = await hash_password_async(user_data.password)
+        await db.run_sync(update_user_password, user, new_hash)
+
     # Reset failed attempts on successful login
-    background_tasks.add_task(reset_failed_attempts, user.email)
+    background_tasks.add_task(login_throttle.reset, throttle_key)
 
     return user
 
@@ -0,0 +1,44 @@
+import asyncio
+
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, status
+
+from ..services.auction_events import hub
+
+router = APIRouter(
+    prefix="/ws",
+    tags=["realtime"],
+)
+
+
+@router.websocket("/auctions/{auction_id}")
+async def auction_feed(websocket: WebSocket, auction_id: int):
+    """Push bid and auction-ended events for one auction to the client"""
+    await websocket.accept()
+    subscriber = hub.subscribe(auction_id)
+
+    async def send_events():
+        while True:
+            entry = await subscriber.queue.get()
+            if entry is None:
+                # Dropped for falling behind - the client should refetch and reconnect
+                await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+                return
+            await websocket.send_json(entry[1])
+
+    async def watch_disconnect():
+        # Clients don't send anything; this only notices when they go away
+        while True:
+            await websocket.receive_text()
+
+    sender = asyncio.create_task(send_events())
+    receiver = asyncio.create_task(watch_disconnect())
+    try:
+        done, pending = await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        for task in done:
+            exc = task.exception()
+            if exc and not isinstance(exc, WebSocketDisconnect):
+                raise exc
+    finally:
+        hub.unsubscribe(subscriber)
@@ -0,0 +1,170 @@
+# services/auction_closer.py
+import asyncio
+import heapq
+import os
+from bisect import bisect_left
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlmodel import Session
+
+from .db import engine
+from .auction_service import get_active_auction_deadlines, close_due_auctions
+
+# Most auctions closed by a single UPDATE
+CLOSE_BATCH_SIZE = int(os.getenv("AUCTION_CLOSE_BATCH_SIZE", "500"))
+# Upper bounds (ms) of the close-lag histogram buckets; the last bucket is open
+LAG_BUCKETS_MS = [10, 50, 100, 250, 500, 1000, 5000, 60000]
+
+
+class CloseLagHistogram:
+    """Distribution of how late auctions were closed relative to end_date"""
+
+    def __init__(self, buckets_ms: List[int] = LAG_BUCKETS_MS):
+        self.buckets_ms = buckets_ms
+        self.counts = [0] * (len(buckets_ms) + 1)
+        self.total = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, lag_ms: float):
+        lag_ms = max(lag_ms, 0.0)
+        self.counts[bisect_left(self.buckets_ms, lag_ms)] += 1
+        self.total += 1
+        self.sum_ms += lag_ms
+        self.max_ms = max(self.max_ms, lag_ms)
+
+    def snapshot(self) -> Dict:
+        labels = [f"le_{bound}ms" for bound in self.buckets_ms] + ["gt_{}ms".format(self.buckets_ms[-1])]
+        return {
+            "closed": self.total,
+            "mean_ms": self.sum_ms / self.total if self.total else 0.0,
+            "max_ms": self.max_ms,
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+class AuctionCloser:
+    """
+    Closes auctions at their deadline from an in-memory min-heap of end dates.
+
+    The heap may hold stale entries after a reschedule; the authoritative
+    deadline for each auction is kept in _deadlines and stale pops are
+    skipped. Everything due at once is closed with one set-based UPDATE per
+    batch, run off the event loop so DB latency never delays the timer.
+    """
+
+    def __init__(self, batch_size: int = CLOSE_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.lag = CloseLagHistogram()
+        self._heap: List[Tuple[datetime, int]] = []
+        self._deadlines: Dict[int, datetime] = {}
+        self._wakeup = asyncio.Event()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        await self.resync()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        self._loop = None
+
+    async def resync(self):
+        """
+        Rebuild the heap from every active auction in the database. If that
+        fails (e.g. a fresh database before /hello/initdb creates the tables)
+        the current heap is kept and the next resync or the sweep catches up.
+        """
+        try:
+            deadlines = await asyncio.to_thread(_load_deadlines)
+        except Exception as e:
+            print(f"Failed to load auction deadlines: {str(e)}")
+            return
+        self._deadlines = dict(deadlines)
+        self._heap = [(end_date, auction_id) for auction_id, end_date in deadlines]
+        heapq.heapify(self._heap)
+        self._wakeup.set()
+
+    def schedule(self, auction_id: int, end_date: Optional[datetime]):
+        """
+        Track (or stop tracking, with end_date=None) an auction's deadline.
+        Safe to call from the sync route handlers' worker threads.
+        """
+        if self._loop is None:
+            return
+        self._loop.call_soon_threadsafe(self._schedule, auction_id, end_date)
+
+    def _schedule(self, auction_id: int, end_date: Optional[datetime]):
+        if end_date is None:
+            self._deadlines.pop(auction_id, None)
+            return
+        self._deadlines[auction_id] = end_date
+        heapq.heappush(self._heap, (end_date, auction_id))
+        if self._heap[0][1] == auction_id:
+            self._wakeup.set()
+
+    def pending(self) -> int:
+        return len(self._deadlines)
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            due = self._pop_due(datetime.utcnow())
+            if due:
+                await self._close(due)
+                continue
+
+            timeout = None
+            if self._heap:
+                timeout = max((self._heap[0][0] - datetime.utcnow()).total_seconds(), 0)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def _pop_due(self, now: datetime) -> List[Tuple[int, datetime]]:
+        due = []
+        while self._heap and self._heap[0][0] <= now and len(due) < self.batch_size:
+            end_date, auction_id = heapq.heappop(self._heap)
+            if self._deadlines.get(auction_id) != end_date:
+                continue
+            del self._deadlines[auction_id]
+            due.append((auction_id, end_date))
+        return due
+
+    async def _close(self, due: List[Tuple[int, datetime]]):
+        try:
+            closed = await asyncio.to_thread(_close_batch, [auction_id for auction_id, _ in due])
+        except Exception as e:
+            print(f"Failed to close auctions {[auction_id for auction_id, _ in due]}: {str(e)}")
+            # Put them back so the next pass retries
+            for auction_id, end_date in due:
+                self._schedule(auction_id, end_date)
+            await asyncio.sleep(1)
+            return
+
+        closed_at = datetime.utcnow()
+        for row in closed:
+            self.lag.observe((closed_at - row["end_date"]).total_seconds() * 1000)
+
+
+def _load_deadlines():
+    with Session(engine) as db:
+        return [(auction_id, end_date) for auction_id, end_date in get_active_auction_deadlines(db)]
+
+
+def _close_batch(auction_ids: List[int]):
+    with Session(engine) as db:
+        return close_due_auctions(db, auction_ids)
+
+
+closer = AuctionCloser()
@@ -0,0 +1,312 @@
+# services/auction_events.py
+import asyncio
+import json
+import os
+import queue
+import select
+import threading
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+from .db import engine
+
+# Events a slow client may have queued before it is dropped
+SUBSCRIBER_QUEUE_SIZE = int(os.getenv("AUCTION_EVENTS_QUEUE_SIZE", "100"))
+# "memory" (single worker) or "postgres" (LISTEN/NOTIFY shared across workers)
+EVENTS_BACKEND = os.getenv("AUCTION_EVENTS_BACKEND", "memory")
+NOTIFY_CHANNEL = "auction_events"
+# Recent events kept per auction so SSE clients can resume with Last-Event-ID
+HISTORY_SIZE = int(os.getenv("AUCTION_EVENTS_HISTORY_SIZE", "50"))
+# Auctions whose history is retained, least recently active evicted first
+HISTORY_AUCTIONS = int(os.getenv("AUCTION_EVENTS_HISTORY_AUCTIONS", "10000"))
+# Backoff between attempts to re-establish a dropped LISTEN/NOTIFY connection, doubling up to the max
+RECONNECT_MIN_SECONDS = float(os.getenv("AUCTION_EVENTS_RECONNECT_MIN_SECONDS", "0.5"))
+RECONNECT_MAX_SECONDS = float(os.getenv("AUCTION_EVENTS_RECONNECT_MAX_SECONDS", "30"))
+# Notifications waiting for the publisher connection; beyond this new ones are dropped
+PUBLISH_QUEUE_SIZE = int(os.getenv("AUCTION_EVENTS_PUBLISH_QUEUE_SIZE", "10000"))
+# Ends the publisher thread once everything queued before it has been sent
+_STOP = object()
+# Event id of "ended": always an auction's last event, so it sorts after every bid id
+ENDED_EVENT_ID = 2 ** 53 - 1
+
+
+class Subscriber:
+    """
+    One watcher of one auction, fed through a bounded queue of
+    (event id, event) pairs
+    """
+
+    def __init__(self, auction_id: int, maxsize: int):
+        self.auction_id = auction_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = False
+
+
+class AuctionEventHub:
+    """
+    Per-auction subscriber registry living on the application's event loop.
+
+    publish() is safe to call from sync route handlers running in the
+    threadpool; delivery always happens on the loop. A subscriber whose
+    queue is full is dropped (its queue is replaced by a single None
+    sentinel) so one slow socket never holds back the rest of the fan-out.
+
+    Every dispatched event is kept in a small ring buffer under its event id,
+    so reconnecting clients can replay what they missed without touching the
+    database. Event ids come from the event itself (the bid id), so they mean
+    the same on every worker and a client can resume against any of them.
+    """
+
+    def __init__(
+        self,
+        queue_size: int = SUBSCRIBER_QUEUE_SIZE,
+        history_size: int = HISTORY_SIZE,
+        history_auctions: int = HISTORY_AUCTIONS
+    ):
+        self.queue_size = queue_size
+        self.history_size = history_size
+        self.history_auctions = history_auctions
+        self._subscribers: Dict[int, Set[Subscriber]] = {}
+        self._history: "OrderedDict[int, Deque[Tuple[int, Dict[str, Any]]]]" = OrderedDict()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._backend = None
+
+    def start(self, loop: asyncio.AbstractEventLoop, backend=None):
+        self._loop = loop
+        self._backend = backend or MemoryBackend()
+        self._backend.start(self)
+
+    def stop(self):
+        if self._backend:
+            self._backend.stop()
+        self._backend = None
+        self._loop = None
+
+    def subscribe(self, auction_id: int) -> Subscriber:
+        subscriber = Subscriber(auction_id, self.queue_size)
+        self._subscribers.setdefault(auction_id, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        watchers = self._subscribers.get(subscriber.auction_id)
+        if watchers is None:
+            return
+        watchers.discard(subscriber)
+        if not watchers:
+            del self._subscribers[subscriber.auction_id]
+
+    def subscriber_count(self, auction_id: int) -> int:
+        return len(self._subscribers.get(auction_id, ()))
+
+    def events_since(self, auction_id: int, last_event_id: int) -> List[Tuple[int, Dict[str, Any]]]:
+        """Buffered events newer than last_event_id, oldest first"""
+        # Publishes from different workers can land slightly out of order
+        return sorted((entry for entry in self._history.get(auction_id, ()) if entry[0] > last_event_id), key=lambda entry: entry[0])
+
+    def publish(self, auction_id: int, event: Dict[str, Any]):
+        """Hand an event to the backend; a no-op until the hub is started"""
+        if self._backend is None:
+            return
+        self._backend.publish(auction_id, event)
+
+    def deliver(self, auction_id: int, event: Dict[str, Any]):
+        """Called by the backend from any thread to fan an event out locally"""
+        if self._loop is None:
+            return
+        self._loop.call_soon_threadsafe(self._dispatch, auction_id, event)
+
+    def _dispatch(self, auction_id: int, event: Dict[str, Any]):
+        entry = (event_id(event), event)
+        self._remember(auction_id, entry)
+
+        for subscriber in list(self._subscribers.get(auction_id, ())):
+            try:
+                subscriber.queue.put_nowait(entry)
+            except asyncio.QueueFull:
+                self._drop(subscriber)
+
+    def _remember(self, auction_id: int, entry: Tuple[int, Dict[str, Any]]):
+        history = self._history.get(auction_id)
+        if history is None:
+            history = self._history[auction_id] = deque(maxlen=self.history_size)
+            if len(self._history) > self.history_auctions:
+                self._history.popitem(last=False)
+        else:
+            self._history.move_to_end(auction_id)
+        history.append(entry)
+
+    def _drop(self, subscriber: Subscriber):
+        subscriber.dropped = True
+        self.unsubscribe(subscriber)
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        subscriber.queue.put_nowait(None)
+
+
+class MemoryBackend:
+    """Delivers straight to the local hub - correct for a single worker"""
+
+    def start(self, hub: AuctionEventHub):
+        self._hub = hub
+
+    def stop(self):
+        pass
+
+    def publish(self, auction_id: int, event: Dict[str, Any]):
+        self._hub.deliver(auction_id, event)
+
+
+class PostgresNotifyBackend:
+    """
+    Shares events between uvicorn workers through LISTEN/NOTIFY.
+    Every worker, including the publisher, receives its own notification
+    and fans it out to its local subscribers.
+
+    Two daemon threads each hold one long-lived connection: a listener, and
+    a publisher draining a queue, so publish() never waits on the database.
+    Either reconnects with exponential backoff when its connection drops.
+    Notifications sent while a worker's listener is reconnecting are missed
+    by that worker.
+    """
+
+    def __init__(self, db_engine=engine, queue_size: int = PUBLISH_QUEUE_SIZE):
+        self.engine = db_engine
+        self._stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._outbox: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        # Taken off the queue but not yet confirmed sent; resent after a reconnect
+        self._in_flight = None
+        self.reconnects = 0
+        self.dropped = 0
+
+    def start(self, hub: AuctionEventHub):
+        self._hub = hub
+        self._stopping.clear()
+        self._threads = [
+            threading.Thread(target=self._keep_connected, args=(self._listen,), name="auction-events-listener", daemon=True),
+            threading.Thread(target=self._keep_connected, args=(self._send,), name="auction-events-publisher", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        try:
+            # Queued notifications go out first; the sentinel then ends the publisher
+            self._outbox.put(_STOP, timeout=2)
+        except queue.Full:
+            pass
+        for thread in self._threads:
+            thread.join(timeout=2)
+        self._threads = []
+
+    def publish(self, auction_id: int, event: Dict[str, Any]):
+        payload = json.dumps({"auction_id": auction_id, "event": event}, default=str)
+        try:
+            self._outbox.put_nowait(payload)
+        except queue.Full:
+            self.dropped += 1
+
+    def _keep_connected(self, session):
+        """Run session on a dedicated connection, reconnecting with backoff until stopped"""
+        delay = RECONNECT_MIN_SECONDS
+        while True:
+            raw = None
+            try:
+                # Taken out of the pool for as long as it stays healthy
+                raw = self.engine.raw_connection()
+                raw.detach()
+                conn = raw.dbapi_connection
+                conn.autocommit = True
+                delay = RECONNECT_MIN_SECONDS
+                if session(conn):
+                    return
+            except Exception as exc:
+                self.reconnects += 1
+                print(f"Auction events connection lost ({exc!r}); reconnecting in {delay:.1f}s")
+                if self._stopping.wait(delay):
+                    return
+                delay = min(delay * 2, RECONNECT_MAX_SECONDS)
+            finally:
+                if raw is not None:
+                    try:
+                        raw.close()
+                    except Exception:
+                        pass
+
+    def _listen(self, conn) -> bool:
+        with conn.cursor() as cursor:
+            cursor.execute(f"LISTEN {NOTIFY_CHANNEL}")
+        while not self._stopping.is_set():
+            if select.select([conn], [], [], 1.0) == ([], [], []):
+                continue
+            conn.poll()
+            while conn.notifies:
+                notify = conn.notifies.pop(0)
+                message = json.loads(notify.payload)
+                self._hub.deliver(message["auction_id"], message["event"])
+        return True
+
+    def _send(self, conn) -> bool:
+        with conn.cursor() as cursor:
+            while True:
+                if self._in_flight is None:
+                    self._in_flight = self._outbox.get()
+                if self._in_flight is _STOP:
+                    return True
+                cursor.execute("SELECT pg_notify(%s, %s)", (NOTIFY_CHANNEL, self._in_flight))
+                self._in_flight = None
+
+
+hub = AuctionEventHub()
+
+
+def start_event_hub():
+    """Bind the hub to the running loop with the configured backend"""
+    backend = PostgresNotifyBackend() if EVENTS_BACKEND == "postgres" else MemoryBackend()
+    hub.start(asyncio.get_running_loop(), backend)
+
+
+def stop_event_hub():
+    hub.stop()
+
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def publish_bid_placed(bid):
+    hub.publish(bid.auction_id, {
+        "type": "bid",
+        "auction_id": bid.auction_id,
+        "bid_id": bid.id,
+        "amount": bid.amount,
+        "user_id": bid.user_id,
+        "created_at": _iso(bid.created_at)
+    })
+
+
+def publish_auction_ended(auction_id: int, winning_bid_id: Optional[int] = None, winning_amount: Optional[float] = None):
+    hub.publish(auction_id, {
+        "type": "ended",
+        "auction_id": auction_id,
+        "winning_bid_id": winning_bid_id,
+        "winning_amount": winning_amount
+    })
+
+
+def event_id(event: Dict[str, Any]) -> int:
+    """Id of a hub event, the same on every worker: the bid id, or ENDED_EVENT_ID"""
+    return event["bid_id"] if event["type"] == "bid" else ENDED_EVENT_ID
+
+
+def format_sse(frame_id: int, event: Dict[str, Any]) -> str:
+    """Render a hub event as a compact Server-Sent Events frame"""
+    if event["type"] == "bid":
+        name = "tick"
+        data = {"price": event["amount"], "bid_id": event["bid_id"], "ts": event["created_at"]}
+    else:
+        name = "ended"
+        data = {"price": event["winning_amount"], "bid_id": event["winning_bid_id"]}
+    return f"id: {frame_id}\nevent: {name}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
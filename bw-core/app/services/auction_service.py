@@ -6,6 +6,17 @@ from ..entities.bid import Bid
 from typing import Dict, Any, Optional
 from ..entities.auction import AuctionRead
 from typing import List
+from sqlalchemy import update, and_, func
+from sqlalchemy.orm import aliased
+from .pagination import keyset_page
+from .fast_json import serialize_bid
+from .auction_events import publish_auction_ended
+from .response_cache import invalidate_auctions
+from .email_service import queue_auction_end_notifications, outbox_worker
+from .user_stats import record_auctions_won
+
+# Number of bids embedded in the auction detail response
+TOP_BIDS_LIMIT = 10
 
 
 def check_auction_status(auction: Auction) -> bool:
@@ -39,15 +50,17 @@ def determine_winner(db: Session, auction_id: int) -> Optional[Dict[str, Any]]:
         highest_bid = db.exec(
             select(Bid)
             .where(Bid.auction_id == auction_id)
-            .order_by(Bid.amount.desc())
+            .order_by(Bid.amount.desc(), Bid.id)
         ).first()
         
         # Update auction status
         auction.is_active = False
         if highest_bid:
             auction.winning_bid_id = highest_bid.id
+            record_auctions_won(db, [highest_bid.id])
             
         db.add(auction)
+        invalidate_auctions(db, [auction_id])
         db.commit()
         db.refresh(auction)
         
@@ -104,78 +117,162 @@ def get_auction_with_winner(db: Session, auction_id: int) -> Dict[str, Any]:
     return result
 
 
-def process_ended_auctions(db: Session) -> int:
-    """Find all auctions that have ended but are still active and process them"""
+def settle_ended_auctions(db: Session) -> List[Dict[str, Any]]:
+    """
+    Settle every expired active auction in one statement and one transaction.
+
+    A window function ranks each expired auction's bids; the top one (if any)
+    becomes the winner and also re-seeds the denormalized price columns. The
+    settled rows are returned for downstream notification.
+    """
     current_time = datetime.utcnow()
+    is_expired = and_(Auction.is_active == True, Auction.end_date <= current_time)
     
-    # Find auctions that have ended but are still marked as active
-    query = select(Auction).where(
-        Auction.is_active == True,
-        Auction.end_date <= current_time
+    ranked = (
+        select(
+            Bid.auction_id,
+            Bid.id.label("bid_id"),
+            Bid.amount,
+            func.row_number().over(
+                partition_by=Bid.auction_id,
+                order_by=(Bid.amount.desc(), Bid.id)
+            ).label("rank")
+        )
+        .where(Bid.auction_id.in_(select(Auction.id).where(is_expired)))
+        .subquery()
+    )
+    expired = aliased(Auction)
+    settlement = (
+        select(expired.id.label("auction_id"), ranked.c.bid_id, ranked.c.amount)
+        .select_from(expired)
+        .outerjoin(ranked, and_(ranked.c.auction_id == expired.id, ranked.c.rank == 1))
+        .where(expired.is_active == True, expired.end_date <= current_time)
+        .subquery()
     )
     
-    ended_auctions = db.exec(query).all()
-    processed_count = 0
+    result = db.execute(
+        update(Auction)
+        .where(Auction.id == settlement.c.auction_id, is_expired)
+        .values(
+            is_active=False,
+            winning_bid_id=settlement.c.bid_id,
+            highest_bid_id=settlement.c.bid_id,
+            current_price=func.coalesce(settlement.c.amount, Auction.current_price)
+        )
+        .returning(
+            Auction.id,
+            Auction.item_id,
+            Auction.user_id,
+            Auction.end_date,
+            Auction.winning_bid_id,
+            Auction.current_price
+        )
+        .execution_options(synchronize_session=False)
+    )
+    settled = [
+        {
+            "auction_id": row.id,
+            "item_id": row.item_id,
+            "seller_id": row.user_id,
+            "end_date": row.end_date,
+            "winning_bid_id": row.winning_bid_id,
+            "winning_amount": row.current_price if row.winning_bid_id else None
+        }
+        for row in result
+    ]
+    winning_bid_ids = [row["winning_bid_id"] for row in settled if row["winning_bid_id"]]
+    queue_auction_end_notifications(db, winning_bid_ids)
+    record_auctions_won(db, winning_bid_ids)
+    invalidate_auctions(db, [row["auction_id"] for row in settled])
+    db.commit()
+    if settled:
+        outbox_worker.notify()
+    return settled
+
+
+def process_ended_auctions(db: Session) -> int:
+    """Settle all auctions that have ended but are still active"""
+    settled = settle_ended_auctions(db)
+    for row in settled:
+        publish_auction_ended(row["auction_id"], row["winning_bid_id"], row["winning_amount"])
+    return len(settled)
+
+
+def get_active_auction_deadlines(db: Session) -> List[tuple]:
+    """(id, end_date) of every auction still open, for the in-memory closer"""
+    query = select(Auction.id, Auction.end_date).where(Auction.is_active == True)
+    return db.exec(query).all()
+
+
+def close_due_auctions(db: Session, auction_ids: List[int]) -> List[Dict[str, Any]]:
+    """
+    Close every listed auction that is still active and past its end_date in
+    one UPDATE, taking the denormalized highest bid as the winner.
+    Auctions already closed elsewhere (another worker, a manual end) are skipped.
+    """
+    if not auction_ids:
+        return []
     
-    for auction in ended_auctions:
-        # Mark auction as inactive regardless of whether there's a winner
-        auction.is_active = False
-        
-        # Try to determine winner
-        winner_result = determine_winner(db, auction.id)
-        if winner_result:
-            processed_count += 1
-        
-        # Commit changes even if no winner was found
-        db.add(auction)
-        db.commit()
-        db.refresh(auction)
+    result = db.execute(
+        update(Auction)
+        .where(
+            Auction.id.in_(auction_ids),
+            Auction.is_active == True,
+            Auction.end_date <= datetime.utcnow()
+        )
+        .values(is_active=False, winning_bid_id=Auction.highest_bid_id)
+        .returning(Auction.id, Auction.end_date, Auction.winning_bid_id, Auction.current_price)
+        .execution_options(synchronize_session=False)
+    )
+    closed = [dict(row._mapping) for row in result]
+    winning_bid_ids = [row["winning_bid_id"] for row in closed if row["winning_bid_id"]]
+    queue_auction_end_notifications(db, winning_bid_ids)
+    record_auctions_won(db, winning_bid_ids)
+    invalidate_auctions(db, [row["id"] for row in closed])
+    db.commit()
+    if closed:
+        outbox_worker.notify()
     
-    return processed_count
+    for row in closed:
+        publish_auction_ended(
+            row["id"],
+            row["winning_bid_id"],
+            row["current_price"] if row["winning_bid_id"] else None
+        )
+    return closed
 
 
 def get_latest_bid(db: Session, auction_id: int) -> Optional[Bid]:
     """Get the latest bid for an auction"""
-    query = select(Bid).where(Bid.auction_id == auction_id).order_by(Bid.amount.desc())
+    query = select(Bid).where(Bid.auction_id == auction_id).order_by(Bid.amount.desc(), Bid.id)
     return db.exec(query).first()
 
 
-def get_auction_with_latest_bid(db: Session, auction_id: int) -> Optional[dict]:
-    """Get auction details with the latest bid information"""
+def bid_to_dict(bid: Bid) -> dict:
+    return serialize_bid(bid)
+
+
+def get_auction_with_latest_bid(db: Session, auction_id: int, bid_limit: int = TOP_BIDS_LIMIT) -> Optional[dict]:
+    """Get auction details with the latest bid and only the top bids"""
     auction = db.get(Auction, auction_id)
     if not auction:
         return None
     
-    # Get all bids for this auction
-    bids_query = select(Bid).where(Bid.auction_id == auction_id).order_by(Bid.amount.desc())
-    all_bids = db.exec(bids_query).all()
+    # Only the top of the book - full history is paged via get_auction_bids_page
+    bids_query = (
+        select(Bid)
+        .where(Bid.auction_id == auction_id)
+        .order_by(Bid.amount.desc(), Bid.id)
+        .limit(bid_limit)
+    )
+    top_bids = db.exec(bids_query).all()
     
-    latest_bid = all_bids[0] if all_bids else None
+    latest_bid = top_bids[0] if top_bids else None
     current_price = auction.item.initial_price
     
     if latest_bid:
         current_price = latest_bid.amount
     
-    # Convert bids to dict format
-    bids_dict = [{
-        "id": bid.id,
-        "amount": bid.amount,
-        "user_id": bid.user_id,
-        "auction_id": bid.auction_id,
-        "created_at": bid.created_at
-    } for bid in all_bids]
-    
-    # Convert latest_bid to dict if it exists
-    latest_bid_dict = None
-    if latest_bid:
-        latest_bid_dict = {
-            "id": latest_bid.id,
-            "amount": latest_bid.amount,
-            "user_id": latest_bid.user_id,
-            "auction_id": latest_bid.auction_id,
-            "created_at": latest_bid.created_at
-        }
-    
     return {
         "id": auction.id,
         "start_date": auction.start_date,
@@ -187,8 +284,8 @@ def get_auction_with_latest_bid(db: Session, auction_id: int) -> Optional[dict]:
         "created_at": auction.created_at,
         "winning_bid_id": auction.winning_bid_id,
         "current_price": current_price,
-        "latest_bid": latest_bid_dict,
-        "bids": bids_dict,
+        "latest_bid": bid_to_dict(latest_bid) if latest_bid else None,
+        "bids": [bid_to_dict(bid) for bid in top_bids],
         "item": {
             "id": auction.item.id,
             "name": auction.item.name,
@@ -199,6 +296,23 @@ def get_auction_with_latest_bid(db: Session, auction_id: int) -> Optional[dict]:
         }
     }
 
+
+def get_auction_bids_page(
+    db: Session, auction_id: int, after: Optional[str] = None, limit: int = 50
+) -> Dict[str, Any]:
+    """
+    Page through an auction's bid history, highest first.
+    Uses a keyset on (amount, id) so deep pages cost the same as the first.
+    """
+    bids, next_cursor = keyset_page(
+        db, select(Bid).where(Bid.auction_id == auction_id), (Bid.amount, Bid.id), after, limit, descending=True
+    )
+    
+    return {
+        "bids": [bid_to_dict(bid) for bid in bids],
+        "next_cursor": next_cursor
+    }
+
 def get_auctions_by_seller(db: Session, seller_id: int):
     """
     Fetch all auctions started by a specific seller.
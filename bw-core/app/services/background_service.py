@@ -1,32 +1,104 @@
+import asyncio
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 from sqlmodel import Session
 from .db import engine
 from .auction_service import process_ended_auctions
+from .bid_service import backfill_top_of_book
+from .auction_closer import closer
+from .bid_sequencer import sequencer
+from .email_service import outbox_worker
+from .rate_limit import login_throttle
+from .response_cache import response_cache
+from .idempotency import idempotency_store
 
 # Create a scheduler instance
 scheduler = AsyncIOScheduler()
 
 def process_ended_auctions_task():
-    """Background task to process ended auctions"""
+    """Background task to settle ended auctions the closer's heap missed"""
     with Session(engine) as db:
         count = process_ended_auctions(db)
-        print(f"Processed {count} ended auctions")
+        if count:
+            print(f"Processed {count} ended auctions")
 
-def start_background_tasks():
+def backfill_top_of_book_task():
+    """One-off: seed the top of book of auctions whose bids predate those columns"""
+    try:
+        with Session(engine) as db:
+            count = backfill_top_of_book(db)
+    except Exception as e:
+        print(f"Could not backfill auction prices: {e}")
+        return
+    if count:
+        print(f"Backfilled the top bid of {count} auctions")
+
+async def start_background_tasks():
     """Start all background tasks"""
-    # Process ended auctions every 5 minutes
+    # Before any bid is accepted, so the compare-and-swap never sees a missing top of book
+    await asyncio.to_thread(backfill_top_of_book_task)
+
+    # Close auctions at their deadline from the in-memory timer heap
+    await closer.start()
+
+    # Deliver queued notification emails off the request path
+    outbox_worker.start()
+
+    # Accept bids on this worker's share of auctions through per-auction actors
+    await sequencer.start()
+
+    # Safety net: pick up auctions created or edited outside this worker
+    scheduler.add_job(
+        closer.resync,
+        trigger=IntervalTrigger(minutes=10),
+        id='resync_auction_closer',
+        name='Resync auction closer',
+        replace_existing=True
+    )
+
+    # Fallback sweep: anything the heap doesn't know about (another worker's insert,
+    # an edit, a bulk load) is settled at most a minute late rather than at the next resync
     scheduler.add_job(
         process_ended_auctions_task,
-        trigger=IntervalTrigger(minutes=1),  # Changed to 1 minute for more frequent checks
+        trigger=IntervalTrigger(minutes=1),
         id='process_ended_auctions',
         name='Process ended auctions',
         replace_existing=True
     )
     
+    # Expire login throttle counters that no longer matter
+    scheduler.add_job(
+        login_throttle.purge_expired,
+        trigger=IntervalTrigger(minutes=1),
+        id='purge_login_throttle',
+        name='Purge login throttle',
+        replace_existing=True
+    )
+    
+    # Drop expired cached responses (the memory LRU would only evict them under pressure)
+    scheduler.add_job(
+        response_cache.purge_expired,
+        trigger=IntervalTrigger(minutes=1),
+        id='purge_response_cache',
+        name='Purge response cache',
+        replace_existing=True
+    )
+    
+    # Forget idempotency keys past their TTL
+    scheduler.add_job(
+        idempotency_store.purge_expired,
+        trigger=IntervalTrigger(minutes=1),
+        id='purge_idempotency_keys',
+        name='Purge idempotency keys',
+        replace_existing=True
+    )
+    
     # Start the scheduler
     scheduler.start()
 
-def stop_background_tasks():
+async def stop_background_tasks():
     """Stop all background tasks"""
-    scheduler.shutdown() 
\ No newline at end of file
+    scheduler.shutdown()
+    await sequencer.stop()
+    await closer.stop()
+    await outbox_worker.stop()
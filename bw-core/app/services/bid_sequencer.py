@@ -0,0 +1,425 @@
+# services/bid_sequencer.py
+import asyncio
+import bisect
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import text, update
+from sqlmodel import Session, select
+
+from ..entities.auction import Auction
+from ..entities.bid import Bid, BidCreate
+from ..entities.item import Item
+from ..entities.user import User
+from .db import engine
+from .bid_service import place_bid, resolve_proxy_bids
+from .auction_events import publish_bid_placed
+from .user_stats import record_bids_placed
+from .response_cache import invalidate_auctions
+
+# Off by default: every bid goes through place_bid's compare-and-swap
+SEQUENCER_ENABLED = os.getenv("BID_SEQUENCER", "off") == "on"
+# Workers sharing the hash ring, and optionally this one's slot. Processes started
+# together (uvicorn --workers N) share one environment, so with a count above one
+# and no index each process claims a free slot with a Postgres advisory lock.
+SEQUENCER_WORKER_COUNT = int(os.getenv("SEQUENCER_WORKER_COUNT", "1"))
+SEQUENCER_WORKER_INDEX = int(os.environ["SEQUENCER_WORKER_INDEX"]) if os.getenv("SEQUENCER_WORKER_INDEX") else None
+# Most bids validated and committed together by one actor
+SEQUENCER_BATCH_SIZE = int(os.getenv("SEQUENCER_BATCH_SIZE", "200"))
+# An actor with no bids for this long drops its state and exits
+SEQUENCER_ACTOR_IDLE_SECONDS = float(os.getenv("SEQUENCER_ACTOR_IDLE_SECONDS", "60"))
+# Bidder roles remembered per worker, shared by all its actors, and for how long
+SEQUENCER_USER_CACHE_SIZE = int(os.getenv("SEQUENCER_USER_CACHE_SIZE", "10000"))
+SEQUENCER_USER_CACHE_SECONDS = float(os.getenv("SEQUENCER_USER_CACHE_SECONDS", "60"))
+# Lost commit races retried from reloaded state before falling back to place_bid
+SEQUENCER_MAX_RETRIES = 3
+VIRTUAL_NODES = 64
+# Advisory lock keys SLOT_LOCK_BASE + index mark claimed slots
+SLOT_LOCK_BASE = 4413_0000
+
+
+class HashRing:
+    """Consistent hashing of auction ids onto workers, so adding one moves only ~1/N of the auctions"""
+
+    def __init__(self, worker_count: int, virtual_nodes: int = VIRTUAL_NODES):
+        points = [
+            (self._hash(f"worker-{worker}-{replica}"), worker)
+            for worker in range(worker_count)
+            for replica in range(virtual_nodes)
+        ]
+        points.sort()
+        self._keys = [point for point, _ in points]
+        self._workers = [worker for _, worker in points]
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+    def owner(self, auction_id: int) -> int:
+        index = bisect.bisect(self._keys, self._hash(f"auction-{auction_id}")) % len(self._keys)
+        return self._workers[index]
+
+
+@dataclass
+class AuctionState:
+    """An auction's top of book as last committed, plus what validation needs besides it"""
+    is_active: bool
+    current_price: Optional[float]
+    highest_bid_id: Optional[int]
+    min_bid_increment: float
+    initial_price: float
+
+
+@dataclass
+class _PendingBid:
+    bid: BidCreate
+    future: asyncio.Future = field(repr=False)
+
+
+class _Conflict(Exception):
+    """The auction row moved under the batch (another worker, the closer, an edit)"""
+
+
+class AuctionActor:
+    """
+    The single writer for one auction on this worker.
+
+    Bids queue up and are drained as a micro-batch: each is validated in
+    order against the in-memory price with no database reads, and the
+    accepted ones are written in one transaction whose UPDATE only matches
+    if the auction row is still exactly as the actor last saw it. A bidder
+    is answered only after that commit, so a crash never acknowledges a bid
+    that was not stored. State is loaded when the actor starts and again
+    only after a lost compare-and-swap or a failed commit; a successful
+    commit hands back the new state, so steady batches read nothing.
+    Standing proxies answer the batch's final bid within the same transaction.
+    """
+
+    def __init__(self, sequencer: "BidSequencer", auction_id: int):
+        self.sequencer = sequencer
+        self.auction_id = auction_id
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.state: Optional[AuctionState] = None
+        self.task: Optional[asyncio.Task] = None
+
+    async def run(self):
+        try:
+            while True:
+                try:
+                    first = await asyncio.wait_for(self.queue.get(), SEQUENCER_ACTOR_IDLE_SECONDS)
+                except asyncio.TimeoutError:
+                    if self.queue.empty():
+                        return
+                    continue
+                batch = [first]
+                while len(batch) < self.sequencer.batch_size and not self.queue.empty():
+                    batch.append(self.queue.get_nowait())
+                await self._process(batch)
+        finally:
+            self.sequencer.retire(self)
+
+    async def _process(self, batch: List[_PendingBid]):
+        try:
+            for _ in range(SEQUENCER_MAX_RETRIES):
+                if self.state is None:
+                    self.state = await asyncio.to_thread(_load_state, self.auction_id)
+                roles = await self.sequencer.roles_for(batch)
+                accepted, rejected = self._validate(batch, roles)
+                if not accepted:
+                    self._reject_each(rejected)
+                    return
+                try:
+                    written, state = await asyncio.to_thread(_commit_batch, self.auction_id, self.state, accepted)
+                except _Conflict:
+                    # Rejections were judged against the same stale state: re-validate the whole batch
+                    self.state = None
+                    continue
+                self.state = state
+                self._reject_each(rejected)
+                for placed in written:
+                    publish_bid_placed(placed)
+                for (pending, _), placed in zip(accepted, written):
+                    if not pending.future.done():
+                        pending.future.set_result(placed)
+                return
+            # Still losing races: let the row lock arbitrate each bid
+            self.state = None
+            for pending in batch:
+                if not pending.future.done():
+                    await self._fallback(pending)
+        except Exception as e:
+            self.state = None
+            print(f"Bid sequencer failed on auction {self.auction_id}: {str(e)}")
+            for pending in batch:
+                if not pending.future.done():
+                    pending.future.set_exception(e)
+
+    def _validate(
+        self, batch: List[_PendingBid], roles: Dict[int, Optional[str]]
+    ) -> Tuple[List[Tuple[_PendingBid, BidCreate]], List[Tuple[_PendingBid, Exception]]]:
+        """
+        Same checks and messages as place_bid, advancing the in-memory price
+        bid by bid. Returns the accepted bids and the rejected ones with their
+        errors; nobody is answered yet, since a lost compare-and-swap means
+        the whole batch was judged against a stale price.
+        """
+        state = self.state
+        if state is None:
+            error = HTTPException(status_code=404, detail="Auction not found")
+            return [], [(pending, error) for pending in batch]
+        price = state.current_price
+        accepted, rejected = [], []
+        for pending in batch:
+            bid = pending.bid
+            role = roles.get(bid.user_id)
+            if not state.is_active:
+                error = HTTPException(status_code=400, detail="Auction is not active")
+            elif role is None:
+                error = HTTPException(status_code=400, detail="User not found")
+            elif role != "buyer":
+                error = HTTPException(status_code=400, detail="User must be a buyer")
+            else:
+                min_bid = state.initial_price if price is None else price + state.min_bid_increment
+                if bid.amount < min_bid:
+                    error = HTTPException(status_code=400, detail=f"Bid must be at least {min_bid}")
+                else:
+                    price = bid.amount
+                    accepted.append((pending, bid))
+                    continue
+            rejected.append((pending, error))
+        return accepted, rejected
+
+    @staticmethod
+    def _reject_each(rejected: List[Tuple[_PendingBid, Exception]]):
+        for pending, error in rejected:
+            if not pending.future.done():
+                pending.future.set_exception(error)
+
+    async def _fallback(self, pending: _PendingBid):
+        try:
+            placed = await asyncio.to_thread(_place_bid, pending.bid)
+        except Exception as e:
+            if not pending.future.done():
+                pending.future.set_exception(e)
+            return
+        if not pending.future.done():
+            pending.future.set_result(placed)
+
+
+class BidSequencer:
+    """
+    Routes bids on the auctions this worker owns (per the hash ring) to one
+    actor each, spawning actors on demand and letting idle ones exit.
+    Auctions owned by other workers keep using place_bid directly.
+
+    Two processes that end up with the same slot (a lost lock connection,
+    a duplicated explicit index) stay correct, since every batch commits
+    through a compare-and-swap; they only lose races to each other.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = SEQUENCER_ENABLED,
+        worker_index: Optional[int] = SEQUENCER_WORKER_INDEX,
+        worker_count: int = SEQUENCER_WORKER_COUNT,
+        batch_size: int = SEQUENCER_BATCH_SIZE
+    ):
+        self.enabled = enabled
+        self.worker_index = worker_index
+        self.worker_count = worker_count
+        self.ring = HashRing(worker_count)
+        self.batch_size = batch_size
+        self.actors: Dict[int, AuctionActor] = {}
+        self.roles: "OrderedDict[int, Tuple[Optional[str], float]]" = OrderedDict()
+        self._slot_connection = None
+        self._running = False
+
+    async def start(self):
+        if not self.enabled:
+            return
+        if self.worker_index is None:
+            if self.worker_count == 1:
+                self.worker_index = 0
+            elif engine.dialect.name != "postgresql":
+                raise RuntimeError(
+                    "SEQUENCER_WORKER_COUNT > 1 needs Postgres to hand out slots; set SEQUENCER_WORKER_INDEX per process"
+                )
+            else:
+                self.worker_index = await asyncio.to_thread(self._claim_slot)
+                if self.worker_index is None:
+                    print(f"All {self.worker_count} sequencer slots are taken; this worker will not sequence bids")
+                    return
+        self._running = True
+
+    def _claim_slot(self) -> Optional[int]:
+        """
+        Take the first free slot's advisory lock on a connection held for the
+        life of the process, so the lock goes away with the process.
+        """
+        connection = engine.connect()
+        connection.detach()
+        for index in range(self.worker_count):
+            if connection.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": SLOT_LOCK_BASE + index}).scalar():
+                connection.commit()
+                self._slot_connection = connection
+                return index
+        connection.close()
+        return None
+
+    async def stop(self):
+        self._running = False
+        actors = list(self.actors.values())
+        for actor in actors:
+            actor.task.cancel()
+        for actor in actors:
+            try:
+                await actor.task
+            except asyncio.CancelledError:
+                pass
+        self.actors.clear()
+        if self._slot_connection is not None:
+            self._slot_connection.close()
+            self._slot_connection = None
+
+    async def roles_for(self, batch: List[_PendingBid]) -> Dict[int, Optional[str]]:
+        """The batch's bidders' roles from the worker-wide cache, loading only the missing or stale ones"""
+        now = time.monotonic()
+        user_ids = {pending.bid.user_id for pending in batch}
+        missing = {
+            user_id for user_id in user_ids
+            if user_id not in self.roles or now - self.roles[user_id][1] > SEQUENCER_USER_CACHE_SECONDS
+        }
+        if missing:
+            for user_id, role in (await asyncio.to_thread(_load_roles, missing)).items():
+                self.roles[user_id] = (role, now)
+        for user_id in user_ids:
+            self.roles.move_to_end(user_id)
+        roles = {user_id: self.roles[user_id][0] for user_id in user_ids}
+        while len(self.roles) > SEQUENCER_USER_CACHE_SIZE:
+            self.roles.popitem(last=False)
+        return roles
+
+    def owns(self, auction_id: int) -> bool:
+        return self._running and self.ring.owner(auction_id) == self.worker_index
+
+    async def submit(self, bid: BidCreate) -> Bid:
+        actor = self.actors.get(bid.auction_id)
+        if actor is None:
+            actor = AuctionActor(self, bid.auction_id)
+            actor.task = asyncio.create_task(actor.run())
+            self.actors[bid.auction_id] = actor
+        future = asyncio.get_running_loop().create_future()
+        actor.queue.put_nowait(_PendingBid(bid, future))
+        return await future
+
+    def retire(self, actor: AuctionActor):
+        if self.actors.get(actor.auction_id) is actor:
+            del self.actors[actor.auction_id]
+        # Bids that slipped in while the actor was exiting go to a fresh one
+        while not actor.queue.empty():
+            pending = actor.queue.get_nowait()
+            if self._running and not pending.future.done():
+                asyncio.ensure_future(self._resubmit(pending))
+            elif not pending.future.done():
+                pending.future.cancel()
+
+    async def _resubmit(self, pending: _PendingBid):
+        try:
+            pending.future.set_result(await self.submit(pending.bid))
+        except Exception as e:
+            if not pending.future.done():
+                pending.future.set_exception(e)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self._running,
+            "worker_index": self.worker_index,
+            "worker_count": self.worker_count,
+            "cached_roles": len(self.roles),
+            "actors": len(self.actors),
+            "queued": sum(actor.queue.qsize() for actor in self.actors.values()),
+        }
+
+
+def _load_state(auction_id: int) -> Optional[AuctionState]:
+    with Session(engine) as db:
+        row = db.exec(
+            select(
+                Auction.is_active, Auction.current_price, Auction.highest_bid_id,
+                Auction.min_bid_increment, Item.initial_price
+            )
+            .join(Item, Item.id == Auction.item_id)
+            .where(Auction.id == auction_id)
+        ).first()
+    return AuctionState(*row) if row else None
+
+
+def _load_roles(user_ids) -> Dict[int, Optional[str]]:
+    with Session(engine) as db:
+        roles = dict(db.exec(select(User.id, User.role).where(User.id.in_(user_ids))).all())
+    return {user_id: roles.get(user_id) for user_id in user_ids}
+
+
+def _place_bid(bid: BidCreate) -> Bid:
+    with Session(engine, expire_on_commit=False) as db:
+        return place_bid(db, bid)
+
+
+def _commit_batch(
+    auction_id: int, state: AuctionState, accepted: List[Tuple[_PendingBid, BidCreate]]
+) -> Tuple[List[Bid], AuctionState]:
+    """
+    Write a validated batch in one transaction, guarded on the row being as
+    the actor last loaded it. Returns every bid written (the batch in order,
+    then any proxy answers) and the auction's new state.
+    """
+    with Session(engine, expire_on_commit=False) as db:
+        final_amount = accepted[-1][1].amount
+        result = db.execute(
+            update(Auction)
+            .where(
+                Auction.id == auction_id,
+                Auction.is_active == True,
+                Auction.highest_bid_id.is_not_distinct_from(state.highest_bid_id),
+                Auction.current_price.is_not_distinct_from(state.current_price),
+                Auction.min_bid_increment == state.min_bid_increment,
+            )
+            .values(current_price=final_amount)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 0:
+            db.rollback()
+            raise _Conflict()
+
+        bids = [Bid.model_validate(bid) for _, bid in accepted]
+        db.add_all(bids)
+        db.flush()
+        db.execute(
+            update(Auction)
+            .where(Auction.id == auction_id)
+            .values(highest_bid_id=bids[-1].id)
+            .execution_options(synchronize_session=False)
+        )
+        record_bids_placed(db, bids)
+        auction = db.get(Auction, auction_id)
+        proxy_bids = resolve_proxy_bids(db, auction, final_amount, bids[-1].user_id)
+        invalidate_auctions(db, [auction_id])
+        db.commit()
+
+    top = (proxy_bids or bids)[-1]
+    new_state = AuctionState(
+        is_active=True,
+        current_price=top.amount,
+        highest_bid_id=top.id,
+        min_bid_increment=state.min_bid_increment,
+        initial_price=state.initial_price,
+    )
+    return bids + proxy_bids, new_state
+
+
+sequencer = BidSequencer()
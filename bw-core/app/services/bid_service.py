@@ -0,0 +1,329 @@
+# services/bid_service.py
+from typing import List, NamedTuple, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import and_, update, func
+from sqlmodel import Session, select
+
+from ..entities.auction import Auction
+from ..entities.bid import Bid, BidCreate, BidUpdate
+from ..entities.proxy_bid import ProxyBid, ProxyBidCreate
+from .user import get_user_by_id
+from .auction_events import publish_bid_placed
+from .user_stats import record_bid_placed, refresh_user_stats
+from .response_cache import invalidate_auctions
+from .fast_json import serialize_bid
+
+
+def get_min_bid(auction: Auction) -> float:
+    """Smallest amount the next bid on this auction must reach"""
+    if auction.current_price is None:
+        return auction.item.initial_price
+    return auction.current_price + auction.min_bid_increment
+
+
+def place_bid(db: Session, bid: BidCreate) -> Bid:
+    """
+    Accept or reject a bid with a single compare-and-swap on the auction row.
+
+    The conditional UPDATE only matches while the auction is active and the
+    amount clears the denormalized current price plus the increment (or the
+    item's initial price for the first bid). The row lock it takes serializes
+    competing bidders until commit, so each price level has exactly one winner
+    and no bid ever scans the auction's bid history.
+    """
+    auction = db.get(Auction, bid.auction_id)
+    if not auction:
+        raise HTTPException(status_code=404, detail="Auction not found")
+    if not auction.is_active:
+        raise HTTPException(status_code=400, detail="Auction is not active")
+    user = get_user_by_id(db, bid.user_id)
+    if user is None:
+        raise HTTPException(status_code=400, detail="User not found")
+    if user.role != "buyer":
+        raise HTTPException(status_code=400, detail="User must be a buyer")
+
+    initial_price = auction.item.initial_price
+    result = db.execute(
+        update(Auction)
+        .where(
+            Auction.id == bid.auction_id,
+            Auction.is_active == True,
+            func.coalesce(
+                Auction.current_price + Auction.min_bid_increment, initial_price
+            ) <= bid.amount,
+        )
+        .values(current_price=bid.amount)
+        .execution_options(synchronize_session=False)
+    )
+
+    if result.rowcount == 0:
+        # Lost the race (or bid too low) - report against the latest state
+        db.rollback()
+        db.refresh(auction)
+        if not auction.is_active:
+            raise HTTPException(status_code=400, detail="Auction is not active")
+        raise HTTPException(
+            status_code=400,
+            detail=f"Bid must be at least {get_min_bid(auction)}"
+        )
+
+    db_bid = Bid.model_validate(bid)
+    db.add(db_bid)
+    db.flush()
+    db.execute(
+        update(Auction)
+        .where(Auction.id == bid.auction_id)
+        .values(highest_bid_id=db_bid.id)
+        .execution_options(synchronize_session=False)
+    )
+    record_bid_placed(db, db_bid)
+    # Standing proxies answer the manual bid in the same transaction
+    proxy_bids = resolve_proxy_bids(db, auction, bid.amount, bid.user_id)
+    invalidate_auctions(db, [bid.auction_id])
+    db.commit()
+    db.refresh(db_bid)
+    for placed in [db_bid, *proxy_bids]:
+        publish_bid_placed(placed)
+    return db_bid
+
+
+def _lock_active_auction(db: Session, auction_id: int) -> Auction:
+    auction = db.exec(
+        select(Auction)
+        .where(Auction.id == auction_id)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    ).first()
+    if not auction:
+        raise HTTPException(status_code=404, detail="Auction not found")
+    if not auction.is_active:
+        # A settled auction's winning_bid_id and price are final
+        raise HTTPException(status_code=400, detail="Auction is not active")
+    return auction
+
+
+def _recompute_top_of_book(db: Session, auction: Auction):
+    """Point current_price and highest_bid_id back at the best remaining bid (or clear them)"""
+    top = db.exec(
+        select(Bid)
+        .where(Bid.auction_id == auction.id)
+        .order_by(Bid.amount.desc(), Bid.id)
+        .limit(1)
+    ).first()
+    auction.current_price = top.amount if top else None
+    auction.highest_bid_id = top.id if top else None
+    db.add(auction)
+
+
+def backfill_top_of_book(db: Session) -> int:
+    """
+    Seed current_price and highest_bid_id for auctions that have bids but no
+    top of book yet (rows written before the columns existed). Until then the
+    compare-and-swap in place_bid would measure new bids against initial_price.
+    Returns how many auctions were filled in.
+    """
+    missing = and_(Auction.highest_bid_id.is_(None), Auction.id.in_(select(Bid.auction_id)))
+    ranked = (
+        select(
+            Bid.auction_id,
+            Bid.id.label("bid_id"),
+            Bid.amount,
+            func.row_number().over(
+                partition_by=Bid.auction_id,
+                order_by=(Bid.amount.desc(), Bid.id)
+            ).label("rank")
+        )
+        .where(Bid.auction_id.in_(select(Auction.id).where(missing)))
+        .subquery()
+    )
+    result = db.execute(
+        update(Auction)
+        .where(Auction.id == ranked.c.auction_id, ranked.c.rank == 1, Auction.highest_bid_id.is_(None))
+        .values(current_price=ranked.c.amount, highest_bid_id=ranked.c.bid_id)
+        .returning(Auction.id)
+        .execution_options(synchronize_session=False)
+    )
+    filled = list(result.scalars())
+    invalidate_auctions(db, filled)
+    db.commit()
+    return len(filled)
+
+
+def update_bid(db: Session, bid_id: int, bid_update: BidUpdate) -> Bid:
+    """Edit a bid on an active auction, moving the top of book with it under the auction row lock"""
+    db_bid = db.get(Bid, bid_id)
+    if not db_bid:
+        raise HTTPException(status_code=404, detail="Bid not found")
+    auction = _lock_active_auction(db, db_bid.auction_id)
+
+    previous_user_id = db_bid.user_id
+    for key, value in bid_update.model_dump(exclude_unset=True).items():
+        setattr(db_bid, key, value)
+    db.add(db_bid)
+    db.flush()
+    _recompute_top_of_book(db, auction)
+    if db_bid.user_id != previous_user_id:
+        refresh_user_stats(db, [previous_user_id, db_bid.user_id])
+    invalidate_auctions(db, [auction.id])
+    db.commit()
+    db.refresh(db_bid)
+    return db_bid
+
+
+def delete_bid(db: Session, bid_id: int):
+    """Remove a bid from an active auction; the next best bid (if any) becomes the top of book"""
+    db_bid = db.get(Bid, bid_id)
+    if not db_bid:
+        raise HTTPException(status_code=404, detail="Bid not found")
+    auction = _lock_active_auction(db, db_bid.auction_id)
+
+    db.delete(db_bid)
+    db.flush()
+    _recompute_top_of_book(db, auction)
+    # bids_placed drops, and last_activity may fall back to an older bid
+    refresh_user_stats(db, [db_bid.user_id])
+    invalidate_auctions(db, [auction.id])
+    db.commit()
+
+
+class _Contender(NamedTuple):
+    user_id: int
+    capacity: float
+    proxy: Optional[ProxyBid]
+
+
+def _write_bid(db: Session, auction_id: int, user_id: int, amount: float) -> Bid:
+    """Insert a bid and move the top of book to it; the caller holds the auction row lock"""
+    db_bid = Bid(amount=amount, user_id=user_id, auction_id=auction_id)
+    db.add(db_bid)
+    db.flush()
+    db.execute(
+        update(Auction)
+        .where(Auction.id == auction_id)
+        .values(current_price=amount, highest_bid_id=db_bid.id)
+        .execution_options(synchronize_session=False)
+    )
+    record_bid_placed(db, db_bid)
+    return db_bid
+
+
+def resolve_proxy_bids(
+    db: Session, auction: Auction, price: Optional[float], leader_id: Optional[int]
+) -> List[Bid]:
+    """
+    Play out every active proxy on the auction in one pass and write only the
+    bids that end up visible: the runner-up at its maximum and the winner one
+    increment above it (capped at the winner's own maximum).
+
+    The current leader defends with their proxy maximum, or just the visible
+    price without one. Challengers need a maximum of at least the next valid
+    bid. Ties go to the defender, then to the earlier proxy. The caller must
+    hold the auction row lock and pass the committed-so-far price and leader.
+    """
+    proxies = db.exec(
+        select(ProxyBid)
+        .where(ProxyBid.auction_id == auction.id, ProxyBid.is_active == True)
+        .order_by(ProxyBid.max_amount.desc(), ProxyBid.created_at, ProxyBid.id)
+    ).all()
+    if not proxies:
+        return []
+
+    increment = auction.min_bid_increment
+    next_valid = auction.item.initial_price if price is None else price + increment
+    leader_proxy = next((proxy for proxy in proxies if proxy.user_id == leader_id), None)
+    contenders = [
+        _Contender(proxy.user_id, proxy.max_amount, proxy)
+        for proxy in proxies
+        if proxy.user_id != leader_id and proxy.max_amount >= next_valid
+    ]
+    if not contenders:
+        return []
+    if leader_id is not None:
+        capacity = max(price, leader_proxy.max_amount) if leader_proxy else price
+        # Stable sort keeps the defender ahead of challengers with the same capacity
+        contenders = sorted(
+            [_Contender(leader_id, capacity, leader_proxy), *contenders], key=lambda contender: -contender.capacity
+        )
+
+    winner = contenders[0]
+    runner_up = contenders[1] if len(contenders) > 1 else None
+    written = []
+    if runner_up is None:
+        winning_amount = next_valid
+    elif runner_up.capacity == winner.capacity:
+        # A tie is decided by precedence; the loser gets no visible bid at the same amount
+        winning_amount = winner.capacity
+    else:
+        if runner_up.user_id != leader_id or runner_up.capacity > price:
+            written.append(_write_bid(db, auction.id, runner_up.user_id, runner_up.capacity))
+        winning_amount = min(winner.capacity, runner_up.capacity + increment)
+
+    if winner.user_id != leader_id or written or winning_amount > price:
+        written.append(_write_bid(db, auction.id, winner.user_id, winning_amount))
+
+    # Proxies that can no longer beat the new price are spent
+    for proxy in proxies:
+        if proxy.user_id != winner.user_id and proxy.max_amount < winning_amount + increment:
+            proxy.is_active = False
+            db.add(proxy)
+    return written
+
+
+def place_proxy_bid(db: Session, proxy_bid: ProxyBidCreate) -> dict:
+    """
+    Register (or raise) a bidder's maximum and resolve the auction's proxies
+    immediately, under the same row lock that serializes manual bids.
+    """
+    auction = db.exec(
+        select(Auction)
+        .where(Auction.id == proxy_bid.auction_id)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    ).first()
+    if not auction:
+        raise HTTPException(status_code=404, detail="Auction not found")
+    if not auction.is_active:
+        raise HTTPException(status_code=400, detail="Auction is not active")
+    user = get_user_by_id(db, proxy_bid.user_id)
+    if user is None:
+        raise HTTPException(status_code=400, detail="User not found")
+    if user.role != "buyer":
+        raise HTTPException(status_code=400, detail="User must be a buyer")
+
+    price = auction.current_price
+    leader_id = db.get(Bid, auction.highest_bid_id).user_id if auction.highest_bid_id else None
+    if proxy_bid.user_id == leader_id:
+        if proxy_bid.max_amount <= price:
+            raise HTTPException(status_code=400, detail=f"Maximum bid must be above {price}")
+    elif proxy_bid.max_amount < get_min_bid(auction):
+        raise HTTPException(status_code=400, detail=f"Maximum bid must be at least {get_min_bid(auction)}")
+
+    proxy = db.exec(
+        select(ProxyBid).where(ProxyBid.auction_id == auction.id, ProxyBid.user_id == proxy_bid.user_id)
+    ).first()
+    if proxy is None:
+        proxy = ProxyBid.model_validate(proxy_bid)
+    else:
+        # Keeps its original created_at, and with it its tie precedence
+        proxy.max_amount = proxy_bid.max_amount
+        proxy.is_active = True
+    db.add(proxy)
+    db.flush()
+
+    written = resolve_proxy_bids(db, auction, price, leader_id)
+    invalidate_auctions(db, [auction.id])
+    db.commit()
+    for placed in written:
+        db.refresh(placed)
+        publish_bid_placed(placed)
+    db.refresh(auction)
+
+    leader_bid = db.get(Bid, auction.highest_bid_id) if auction.highest_bid_id else None
+    return {
+        "auction_id": auction.id,
+        "max_amount": proxy.max_amount,
+        "is_leading": leader_bid is not None and leader_bid.user_id == proxy_bid.user_id,
+        "current_price": auction.current_price,
+        "bids": [serialize_bid(placed) for placed in written],
+    }
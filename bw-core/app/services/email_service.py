@@ -1,6 +1,33 @@
+import asyncio
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
 import resend
+from sqlalchemy.orm import aliased
+from sqlmodel import Session, select
+
+from .db import engine
+from ..entities.auction import Auction
+from ..entities.bid import Bid
+from ..entities.email_outbox import EmailOutbox
+from ..entities.item import Item
+from ..entities.user import User
+
+RESEND_API_KEY = os.getenv("RESEND_API_KEY")
+resend.api_key = RESEND_API_KEY
+
+NOTIFICATION_SENDER = "BidWize <onboarding@resend.dev>"
+# "resend" sends for real; "fake" records messages in memory and must be chosen
+# explicitly for local runs and tests, so a missing key never looks like delivery.
+EMAIL_TRANSPORT = os.getenv("EMAIL_TRANSPORT", "resend")
+# Resend's batch endpoint accepts at most 100 messages per call
+OUTBOX_BATCH_SIZE = min(int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", "100")), 100)
+OUTBOX_POLL_SECONDS = float(os.getenv("EMAIL_OUTBOX_POLL_SECONDS", "5"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS", "6"))
+OUTBOX_BACKOFF_SECONDS = float(os.getenv("EMAIL_OUTBOX_BACKOFF_SECONDS", "2"))
+OUTBOX_MAX_BACKOFF_SECONDS = 15 * 60
 
-resend.api_key = "re_Ev1bAfrR_EmBj2MpuvyGL8JrF6bzfJdrC"
 
 def send_hi_email():
     print("Function started")
@@ -18,47 +45,193 @@ def send_hi_email():
         print("Failed to send email:", str(e))
         raise e
 
-def send_auction_end_notification(winner_email: str, seller_email: str, item_name: str, winning_amount: float):
+
+def build_auction_end_messages(winner_email: str, seller_email: str, item_name: str, winning_amount: float) -> List[EmailOutbox]:
+    """The winner and seller notifications for one ended auction, ready to queue"""
+    winner_message = EmailOutbox(
+        from_address=NOTIFICATION_SENDER,
+        to_address=winner_email,
+        subject="🎉 Congratulations! You Won the Someething2!",
+        html=f"""
+            <h1>🎉 Congratulations! 🎉</h1>
+            <p>You have successfully won the auction for {item_name}!</p>
+            <p>Winning Amount: ${winning_amount:.2f}</p>
+            <p>Please proceed to complete your purchase.</p>
+        """,
+    )
+    seller_message = EmailOutbox(
+        from_address=NOTIFICATION_SENDER,
+        to_address=seller_email,
+        subject="Your Auction Has Ended",
+        html=f"""
+            <h1>Your Auction Has Ended</h1>
+            <p>The auction for {item_name} has ended successfully.</p>
+            <p>Final Price: ${winning_amount:.2f}</p>
+            <p>We'll notify you once the buyer completes their purchase.</p>
+        """,
+    )
+    return [winner_message, seller_message]
+
+
+def queue_auction_end_notification(db: Session, winner_email: str, seller_email: str, item_name: str, winning_amount: float):
     """
-    Send notifications to both the winner and seller when an auction ends
+    Add the auction-end notifications to the outbox in the caller's transaction.
+    Nothing is sent until the caller commits and the outbox worker picks them up.
     """
-    try:
-        # Send to winner
-        winner_params = {
-            "from": "BidWize <onboarding@resend.dev>",
-            "to": [winner_email],
-            "subject": "🎉 Congratulations! You Won the Someething2!",
-            "html": f"""
-                <h1>🎉 Congratulations! 🎉</h1>
-                <p>You have successfully won the auction for {item_name}!</p>
-                <p>Winning Amount: ${winning_amount:.2f}</p>
-                <p>Please proceed to complete your purchase.</p>
-            """,
-        }
-        winner_response = resend.Emails.send(winner_params)
-        print("Winner notification sent:", winner_response)
-
-        # Send to seller
-        seller_params = {
-            "from": "BidWize <onboarding@resend.dev>",
-            "to": [seller_email],
-            "subject": "Your Auction Has Ended",
-            "html": f"""
-                <h1>Your Auction Has Ended</h1>
-                <p>The auction for {item_name} has ended successfully.</p>
-                <p>Final Price: ${winning_amount:.2f}</p>
-                <p>We'll notify you once the buyer completes their purchase.</p>
-            """,
-        }
-        seller_response = resend.Emails.send(seller_params)
-        print("Seller notification sent:", seller_response)
+    for message in build_auction_end_messages(winner_email, seller_email, item_name, winning_amount):
+        db.add(message)
+
+
+def queue_auction_end_notifications(db: Session, winning_bid_ids: List[int]):
+    """Queue notifications for many settled auctions with a single lookup query"""
+    if not winning_bid_ids:
+        return
+    winner = aliased(User)
+    seller = aliased(User)
+    rows = db.exec(
+        select(Bid.amount, winner.email, seller.email, Item.name)
+        .join(Auction, Auction.id == Bid.auction_id)
+        .join(Item, Item.id == Auction.item_id)
+        .join(winner, winner.id == Bid.user_id)
+        .join(seller, seller.id == Auction.user_id)
+        .where(Bid.id.in_(winning_bid_ids))
+    ).all()
+    for amount, winner_email, seller_email, item_name in rows:
+        queue_auction_end_notification(db, winner_email, seller_email, item_name, amount)
+
+
+class ResendTransport:
+    """Sends a batch through Resend's batch endpoint"""
+
+    def send_batch(self, messages: List[Dict]):
+        resend.Batch.send(messages)
+
+
+class FakeTransport:
+    """Keeps every batch in memory instead of sending it"""
+
+    def __init__(self):
+        self.sent: List[Dict] = []
+
+    def send_batch(self, messages: List[Dict]):
+        self.sent.extend(messages)
 
-        return {
-            "winner_email_sent": winner_response,
-            "seller_email_sent": seller_response
+
+def get_transport():
+    """The configured transport, or None when Resend is selected without a key"""
+    if EMAIL_TRANSPORT == "fake":
+        return FakeTransport()
+    if not RESEND_API_KEY:
+        print("ERROR: RESEND_API_KEY is not set; queued emails stay pending until it is (EMAIL_TRANSPORT=fake for local runs)")
+        return None
+    return ResendTransport()
+
+
+def backoff_delay(attempts: int) -> timedelta:
+    """Exponential backoff after the given number of failed attempts"""
+    return timedelta(seconds=min(OUTBOX_BACKOFF_SECONDS * 2 ** (attempts - 1), OUTBOX_MAX_BACKOFF_SECONDS))
+
+
+def drain_outbox_batch(db: Session, transport, batch_size: int = OUTBOX_BATCH_SIZE) -> int:
+    """
+    Send one batch of due messages and record the outcome.
+    Rows are claimed with SKIP LOCKED so several workers can drain in parallel.
+    Returns how many messages were taken from the outbox.
+    """
+    now = datetime.utcnow()
+    messages = db.exec(
+        select(EmailOutbox)
+        .where(EmailOutbox.status == "pending", EmailOutbox.next_attempt_at <= now)
+        .order_by(EmailOutbox.next_attempt_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    ).all()
+    if not messages:
+        db.rollback()
+        return 0
+
+    params = [
+        {
+            "from": message.from_address,
+            "to": [message.to_address],
+            "subject": message.subject,
+            "html": message.html,
         }
+        for message in messages
+    ]
+    try:
+        transport.send_batch(params)
     except Exception as e:
-        print("Failed to send auction end notifications:", str(e))
-        raise e
+        print(f"Failed to send {len(messages)} queued emails: {str(e)}")
+        for message in messages:
+            message.attempts += 1
+            message.last_error = str(e)
+            if message.attempts >= OUTBOX_MAX_ATTEMPTS:
+                message.status = "failed"
+            else:
+                message.next_attempt_at = now + backoff_delay(message.attempts)
+            db.add(message)
+    else:
+        for message in messages:
+            message.status = "sent"
+            message.attempts += 1
+            message.sent_at = datetime.utcnow()
+            db.add(message)
+    db.commit()
+    return len(messages)
+
+
+class EmailOutboxWorker:
+    """Drains the outbox in the background so no request waits on email delivery"""
+
+    def __init__(self, poll_seconds: float = OUTBOX_POLL_SECONDS):
+        self.poll_seconds = poll_seconds
+        self.transport = None
+        self._wakeup = asyncio.Event()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, transport=None):
+        self.transport = transport or get_transport()
+        if self.transport is None:
+            # Nothing to send with: leave the rows pending rather than drain them
+            return
+        self._loop = asyncio.get_running_loop()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        self._loop = None
+
+    def notify(self):
+        """Wake the worker after queueing mail; safe from any thread"""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            try:
+                drained = await asyncio.to_thread(self._drain_once)
+            except Exception as e:
+                print(f"Email outbox worker error: {str(e)}")
+                drained = 0
+            if drained:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    def _drain_once(self) -> int:
+        with Session(engine) as db:
+            return drain_outbox_batch(db, self.transport)
+
 
-send_hi_email()
\ No newline at end of file
+outbox_worker = EmailOutboxWorker()
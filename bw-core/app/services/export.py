@@ -0,0 +1,59 @@
+# services/export.py
+import csv
+import io
+import os
+from typing import Iterator, Sequence
+
+import orjson
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+from .db import engine, connect_read_replica
+
+# Rows fetched per round trip from the server-side cursor, and per chunk sent
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "5000"))
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _encode_ndjson(rows: Sequence, columns: Sequence[str]) -> bytes:
+    return b"".join(orjson.dumps(dict(zip(columns, row))) + b"\n" for row in rows)
+
+
+def _encode_csv(rows: Sequence, columns: Sequence[str]) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue().encode("utf-8")
+
+
+def stream_export(statement, fmt: str, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[bytes]:
+    """
+    Run a column-only select on a server-side cursor and yield the encoded
+    output one batch at a time. Plain rows skip the ORM identity map, and
+    only one batch is ever held, so memory stays flat however many rows match.
+    The connection is its own (a replica when one is available) because the
+    request's session is gone by the time a streaming body is consumed.
+    """
+    encode = _encode_csv if fmt == "csv" else _encode_ndjson
+    connection = connect_read_replica() or engine.connect()
+    try:
+        result = connection.execution_options(stream_results=True, yield_per=batch_size).execute(statement)
+        columns = list(result.keys())
+        if fmt == "csv":
+            yield _encode_csv([columns], columns)
+        for rows in result.partitions():
+            yield encode(rows, columns)
+    finally:
+        connection.close()
+
+
+def export_response(statement, fmt: str, filename: str) -> StreamingResponse:
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format; use one of {', '.join(EXPORT_FORMATS)}")
+    return StreamingResponse(
+        stream_export(statement, fmt, EXPORT_BATCH_SIZE),
+        media_type=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'}
+    )
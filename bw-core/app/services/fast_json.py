@@ -0,0 +1,52 @@
+# services/fast_json.py
+from operator import attrgetter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Type
+
+import orjson
+from fastapi.responses import JSONResponse
+from sqlmodel import SQLModel
+
+from ..entities.auction import AuctionRead
+from ..entities.bid import BidRead
+from ..entities.item import ItemRead
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response encoded with orjson, which handles datetimes natively and
+    produces the same output as FastAPI's encoder for our payloads.
+    Returning it from a route skips response_model validation entirely.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+def encode_json(content: Any) -> bytes:
+    return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+def compile_serializer(model: Type[SQLModel]) -> Callable[[Any], Dict[str, Any]]:
+    """
+    A function that turns an ORM row into a dict with exactly the fields of
+    the given read model. The field list and getter are built once, so each
+    call is one C-level attrgetter plus a dict(zip()) - no validation.
+    """
+    fields = tuple(model.model_fields)
+    getter = attrgetter(*fields)
+    if len(fields) == 1:
+        return lambda obj: {fields[0]: getter(obj)}
+    return lambda obj: dict(zip(fields, getter(obj)))
+
+
+serialize_auction = compile_serializer(AuctionRead)
+serialize_bid = compile_serializer(BidRead)
+serialize_item = compile_serializer(ItemRead)
+
+
+def json_list(
+    rows: Iterable[Any], serializer: Callable[[Any], Dict[str, Any]], headers: Optional[Dict[str, str]] = None
+) -> FastJSONResponse:
+    """Serialize a list of rows straight to a response"""
+    content: List[Dict[str, Any]] = [serializer(row) for row in rows]
+    return FastJSONResponse(content, headers=headers)
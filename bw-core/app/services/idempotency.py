@@ -0,0 +1,325 @@
+# services/idempotency.py
+import asyncio
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, NamedTuple, Optional, Tuple
+
+from sqlalchemy import text
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse, Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .db import engine, get_async_engine
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+# "memory" (per worker) or "postgres" (shared unlogged table)
+IDEMPOTENCY_BACKEND = os.getenv("IDEMPOTENCY_BACKEND", "memory")
+# How long a completed request's response is replayed for its key
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+# How long an unfinished request holds its key, so a crashed worker never blocks it for good
+IDEMPOTENCY_LOCK_SECONDS = float(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "60"))
+IDEMPOTENCY_MAX_KEYS = int(os.getenv("IDEMPOTENCY_MAX_KEYS", "100000"))
+MAX_KEY_LENGTH = 255
+
+# Outcomes of IdempotencyStore.begin
+STARTED = "started"
+REPLAY = "replay"
+IN_PROGRESS = "in_progress"
+MISMATCH = "mismatch"
+
+
+class StoredResponse(NamedTuple):
+    status_code: int
+    content_type: Optional[str]
+    body: bytes
+
+
+def request_fingerprint(method: str, path: str, query_string: bytes, body: bytes) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    for part in (method.encode(), path.encode(), query_string, body):
+        digest.update(len(part).to_bytes(8, "big"))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+class MemoryIdempotencyStore:
+    """
+    Idempotency keys for a single worker: each key maps to the fingerprint of
+    the request that claimed it and, once that request finishes, its response.
+    Oldest keys are evicted first beyond max_keys.
+    """
+
+    def __init__(
+        self,
+        ttl: float = IDEMPOTENCY_TTL_SECONDS,
+        lock_ttl: float = IDEMPOTENCY_LOCK_SECONDS,
+        max_keys: int = IDEMPOTENCY_MAX_KEYS
+    ):
+        self.ttl = ttl
+        self.lock_ttl = lock_ttl
+        self.max_keys = max_keys
+        self.replays = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def ensure_table(self):
+        pass
+
+    async def begin(self, key: str, fingerprint: str) -> Tuple[str, Optional[StoredResponse]]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= now:
+                self._entries[key] = (fingerprint, now + self.lock_ttl, None)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_keys:
+                    self._entries.popitem(last=False)
+                return STARTED, None
+            stored_fingerprint, _, response = entry
+            if stored_fingerprint != fingerprint:
+                return MISMATCH, None
+            if response is None:
+                return IN_PROGRESS, None
+            self.replays += 1
+            return REPLAY, response
+
+    async def finish(self, key: str, fingerprint: str, response: StoredResponse):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == fingerprint:
+                self._entries[key] = (fingerprint, time.monotonic() + self.ttl, response)
+
+    async def abandon(self, key: str, fingerprint: str):
+        """Release an unfinished claim so the client's retry runs the request again"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == fingerprint and entry[2] is None:
+                del self._entries[key]
+
+    def purge_expired(self) -> int:
+        now = time.monotonic()
+        with self._lock:
+            expired = [key for key, (_, expires_at, _) in self._entries.items() if expires_at <= now]
+            for key in expired:
+                del self._entries[key]
+        return len(expired)
+
+    def stats(self) -> dict:
+        return {"backend": "memory", "keys": len(self._entries), "replays": self.replays}
+
+
+class PostgresIdempotencyStore:
+    """
+    The same keys in an UNLOGGED table so a retry landing on another worker
+    is still recognised. Claiming is a single INSERT ... ON CONFLICT, which
+    makes concurrent duplicates race on the primary key rather than in
+    application code; a crash loses the table, which only forgets old keys.
+    """
+
+    def __init__(self, ttl: float = IDEMPOTENCY_TTL_SECONDS, lock_ttl: float = IDEMPOTENCY_LOCK_SECONDS, db_engine=engine):
+        self.ttl = ttl
+        self.lock_ttl = lock_ttl
+        self.engine = db_engine
+        self.replays = 0
+        self._ready = False
+
+    def _ensure_table(self):
+        if self._ready:
+            return
+        with self.engine.begin() as conn:
+            conn.execute(text(
+                "CREATE UNLOGGED TABLE IF NOT EXISTS idempotency_key ("
+                " key TEXT PRIMARY KEY,"
+                " fingerprint TEXT NOT NULL,"
+                " expires_at DOUBLE PRECISION NOT NULL,"
+                " status_code INTEGER,"
+                " content_type TEXT,"
+                " body BYTEA)"
+            ))
+        self._ready = True
+
+    async def ensure_table(self):
+        """_ensure_table on a worker thread; called at startup so no request pays for the DDL"""
+        if not self._ready:
+            await asyncio.to_thread(self._ensure_table)
+
+    async def begin(self, key: str, fingerprint: str) -> Tuple[str, Optional[StoredResponse]]:
+        await self.ensure_table()
+        now = time.time()
+        async with get_async_engine().begin() as conn:
+            claimed = await conn.scalar(
+                text(
+                    "INSERT INTO idempotency_key (key, fingerprint, expires_at)"
+                    " VALUES (:key, :fingerprint, :lock_until)"
+                    " ON CONFLICT (key) DO UPDATE SET"
+                    " fingerprint = excluded.fingerprint, expires_at = excluded.expires_at,"
+                    " status_code = NULL, content_type = NULL, body = NULL"
+                    " WHERE idempotency_key.expires_at <= :now"
+                    " RETURNING key"
+                ),
+                {"key": key, "fingerprint": fingerprint, "lock_until": now + self.lock_ttl, "now": now}
+            )
+            if claimed is not None:
+                return STARTED, None
+            row = (await conn.execute(
+                text("SELECT fingerprint, status_code, content_type, body FROM idempotency_key WHERE key = :key"),
+                {"key": key}
+            )).first()
+        if row is None:
+            # Purged between the two statements; the client's retry will claim it
+            return IN_PROGRESS, None
+        if row.fingerprint != fingerprint:
+            return MISMATCH, None
+        if row.status_code is None:
+            return IN_PROGRESS, None
+        self.replays += 1
+        return REPLAY, StoredResponse(row.status_code, row.content_type, bytes(row.body))
+
+    async def finish(self, key: str, fingerprint: str, response: StoredResponse):
+        async with get_async_engine().begin() as conn:
+            await conn.execute(
+                text(
+                    "UPDATE idempotency_key SET"
+                    " status_code = :status_code, content_type = :content_type, body = :body, expires_at = :expires_at"
+                    " WHERE key = :key AND fingerprint = :fingerprint"
+                ),
+                {
+                    "key": key,
+                    "fingerprint": fingerprint,
+                    "status_code": response.status_code,
+                    "content_type": response.content_type,
+                    "body": response.body,
+                    "expires_at": time.time() + self.ttl,
+                }
+            )
+
+    async def abandon(self, key: str, fingerprint: str):
+        async with get_async_engine().begin() as conn:
+            await conn.execute(
+                text(
+                    "DELETE FROM idempotency_key"
+                    " WHERE key = :key AND fingerprint = :fingerprint AND status_code IS NULL"
+                ),
+                {"key": key, "fingerprint": fingerprint}
+            )
+
+    def purge_expired(self) -> int:
+        self._ensure_table()
+        with self.engine.begin() as conn:
+            result = conn.execute(text("DELETE FROM idempotency_key WHERE expires_at <= :now"), {"now": time.time()})
+        return result.rowcount
+
+    def stats(self) -> dict:
+        return {"backend": "postgres", "replays": self.replays}
+
+
+def build_idempotency_store(backend: Optional[str] = None):
+    backend = backend or IDEMPOTENCY_BACKEND
+    if backend == "postgres":
+        return PostgresIdempotencyStore()
+    return MemoryIdempotencyStore()
+
+
+idempotency_store = build_idempotency_store()
+
+
+class IdempotencyMiddleware:
+    """
+    Honours the Idempotency-Key header on the given (method, path pattern)
+    routes. The first request with a key runs normally and its response is
+    stored; a retry with the same key and body gets that response back
+    without reaching the route (marked Idempotent-Replayed), a duplicate
+    that arrives while the first is still running gets 409, and reusing a
+    key for a different request gets 422. 5xx responses are not stored, so
+    those retries run again. Requests without the header are untouched.
+    """
+
+    def __init__(self, app: ASGIApp, routes: Iterable[Tuple[str, str]], store=None):
+        self.app = app
+        self.routes = [(method, re.compile(pattern)) for method, pattern in routes]
+        self.store = store or idempotency_store
+
+    def applies_to(self, method: str, path: str) -> bool:
+        return any(method == route_method and pattern.fullmatch(path) for route_method, pattern in self.routes)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not self.applies_to(scope["method"], scope["path"]):
+            await self.app(scope, receive, send)
+            return
+        idempotency_key = Headers(scope=scope).get(IDEMPOTENCY_HEADER)
+        if idempotency_key is None:
+            await self.app(scope, receive, send)
+            return
+        if not idempotency_key or len(idempotency_key) > MAX_KEY_LENGTH:
+            await JSONResponse(
+                {"detail": f"{IDEMPOTENCY_HEADER} must be 1 to {MAX_KEY_LENGTH} characters"}, status_code=400
+            )(scope, receive, send)
+            return
+
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                return
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        body = b"".join(chunks)
+
+        key = f"{scope['method']} {scope['path']} {idempotency_key}"
+        fingerprint = request_fingerprint(scope["method"], scope["path"], scope.get("query_string", b""), body)
+        outcome, stored = await self.store.begin(key, fingerprint)
+        if outcome == REPLAY:
+            await Response(
+                stored.body, status_code=stored.status_code, media_type=stored.content_type,
+                headers={REPLAYED_HEADER: "true"}
+            )(scope, receive, send)
+            return
+        if outcome == IN_PROGRESS:
+            await JSONResponse(
+                {"detail": f"A request with this {IDEMPOTENCY_HEADER} is still being processed"},
+                status_code=409, headers={"Retry-After": "1"}
+            )(scope, receive, send)
+            return
+        if outcome == MISMATCH:
+            await JSONResponse(
+                {"detail": f"This {IDEMPOTENCY_HEADER} was already used for a different request"}, status_code=422
+            )(scope, receive, send)
+            return
+
+        body_sent = False
+
+        async def replay_body() -> Message:
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        status_code = 500
+        content_type = None
+        response_chunks = []
+
+        async def capture(message: Message):
+            nonlocal status_code, content_type
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                content_type = Headers(raw=message["headers"]).get("content-type")
+            elif message["type"] == "http.response.body":
+                response_chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, replay_body, capture)
+        except BaseException:
+            await self.store.abandon(key, fingerprint)
+            raise
+        if status_code >= 500:
+            await self.store.abandon(key, fingerprint)
+        else:
+            await self.store.finish(key, fingerprint, StoredResponse(status_code, content_type, b"".join(response_chunks)))
@@ -0,0 +1,61 @@
+# services/pagination.py
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import DateTime, tuple_
+from sqlmodel import Session
+
+# Response header carrying the token for the next page of a list endpoint
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(*values: Any) -> str:
+    """Pack the sort key of the last row on a page into an opaque token"""
+    raw = json.dumps(list(values), default=str, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(token: str, size: int) -> List[Any]:
+    """Unpack a token produced by encode_cursor, rejecting anything malformed"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token.encode("ascii")))
+    except (ValueError, UnicodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def _cursor_value(column, value: Any) -> Any:
+    """Turn a decoded cursor value back into the column's Python type"""
+    if value is not None and isinstance(column.type, DateTime):
+        try:
+            return datetime.fromisoformat(value)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    return value
+
+
+def keyset_page(
+    db: Session, query, keys: Sequence, after: Optional[str], limit: int, descending: bool = False
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    One page of query ordered by the key columns, starting after the row the
+    cursor points at. The last key must be unique (normally the id) so ties
+    never skip or repeat rows, and the seek stays an index range scan however
+    deep the page is. Returns the rows and the cursor for the next page.
+    """
+    if after:
+        values = tuple(_cursor_value(key, value) for key, value in zip(keys, decode_cursor(after, len(keys))))
+        position = tuple_(*keys)
+        query = query.where(position < values if descending else position > values)
+    order = [key.desc() for key in keys] if descending else list(keys)
+    rows = db.exec(query.order_by(*order).limit(limit)).all()
+
+    next_cursor = None
+    if len(rows) == limit:
+        next_cursor = encode_cursor(*(getattr(rows[-1], key.key) for key in keys))
+    return rows, next_cursor
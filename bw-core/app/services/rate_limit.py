@@ -0,0 +1,217 @@
+# services/rate_limit.py
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from sqlalchemy import text
+
+from .db import engine
+
+# "memory" (per worker) or "postgres" (shared unlogged table)
+LOGIN_THROTTLE_BACKEND = os.getenv("LOGIN_THROTTLE_BACKEND", "memory")
+LOGIN_MAX_FAILURES = int(os.getenv("LOGIN_MAX_FAILURES", "5"))
+LOGIN_THROTTLE_WINDOW_SECONDS = int(os.getenv("LOGIN_THROTTLE_WINDOW_SECONDS", "300"))
+# Cap on tracked keys in memory. Expired counters go first, then the least recently
+# failed ones below the limit; a blocked key is never evicted early
+LOGIN_THROTTLE_MAX_KEYS = int(os.getenv("LOGIN_THROTTLE_MAX_KEYS", "100000"))
+
+
+def window_start_for(now: float, window: int) -> int:
+    return int(now // window) * window
+
+
+def weighted_count(window_start: int, current: int, previous: int, now: float, window: int) -> float:
+    """
+    Sliding-window estimate from two fixed-window counters: all of the
+    current window plus the still-overlapping share of the previous one.
+    """
+    this_window = window_start_for(now, window)
+    if window_start == this_window:
+        overlap = 1 - (now - this_window) / window
+        return current + previous * overlap
+    if window_start == this_window - window:
+        # Nothing recorded yet in this window; last window's count becomes "previous"
+        overlap = 1 - (now - this_window) / window
+        return current * overlap
+    return 0.0
+
+
+class MemoryRateLimitStore:
+    """
+    Sliding-window failure counters for a single worker.
+    Each key costs one small tuple; keys idle for two windows are purged.
+
+    Keys that reached the limit live in their own LRU, so making room for a
+    new key (oldest counter below the limit first, in O(1)) never lifts a
+    throttle. If every tracked key is blocked, the store is saturated and
+    fails closed: keys it cannot track count as blocked until windows expire.
+    """
+
+    def __init__(self, limit: int, window: int, max_keys: int = LOGIN_THROTTLE_MAX_KEYS):
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        self._counters: "OrderedDict[str, Tuple[int, int, int]]" = OrderedDict()
+        self._blocked: "OrderedDict[str, Tuple[int, int, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def is_blocked(self, key: str) -> bool:
+        now = time.time()
+        with self._lock:
+            counter = self._counters.get(key) or self._blocked.get(key)
+            if counter is None:
+                return self._saturated(now)
+        return weighted_count(*counter, now, self.window) >= self.limit
+
+    def record_failure(self, key: str):
+        now = time.time()
+        this_window = window_start_for(now, self.window)
+        with self._lock:
+            previous_counter = self._counters.pop(key, None) or self._blocked.pop(key, None)
+            if previous_counter is None and not self._make_room(now):
+                return
+            window_start, current, previous = previous_counter or (this_window, 0, 0)
+            if window_start == this_window:
+                counter = (this_window, current + 1, previous)
+            elif window_start == this_window - self.window:
+                counter = (this_window, 1, current)
+            else:
+                counter = (this_window, 1, 0)
+            if weighted_count(*counter, now, self.window) >= self.limit:
+                self._blocked[key] = counter
+            else:
+                self._counters[key] = counter
+
+    def reset(self, key: str):
+        with self._lock:
+            self._counters.pop(key, None)
+            self._blocked.pop(key, None)
+
+    def _make_room(self, now: float) -> bool:
+        """Free a slot for a new key (lock held); False when every tracked key is blocked"""
+        if len(self) < self.max_keys:
+            return True
+        self._purge_expired(now)
+        if len(self) < self.max_keys:
+            return True
+        if self._counters:
+            self._counters.popitem(last=False)
+            return True
+        return False
+
+    def _saturated(self, now: float) -> bool:
+        """Full of blocked keys, with nothing below the limit to make room from (lock held)"""
+        if len(self) < self.max_keys or self._counters:
+            return False
+        self._purge_expired(now)
+        return len(self) >= self.max_keys and not self._counters
+
+    def _purge_expired(self, now: float) -> int:
+        cutoff = window_start_for(now, self.window) - self.window
+        expired = 0
+        for counters in (self._counters, self._blocked):
+            # Keys are ordered by last failure, so stale ones sit at the front
+            while counters:
+                key, (window_start, _, _) = next(iter(counters.items()))
+                if window_start >= cutoff:
+                    break
+                del counters[key]
+                expired += 1
+        return expired
+
+    def purge_expired(self) -> int:
+        """Drop keys that no longer influence any decision"""
+        with self._lock:
+            return self._purge_expired(time.time())
+
+    def __len__(self):
+        return len(self._counters) + len(self._blocked)
+
+
+class PostgresRateLimitStore:
+    """
+    The same counters in an UNLOGGED table so every uvicorn worker shares them.
+    Losing the table on a crash only forgets recent failures, which is fine
+    for throttling and avoids WAL traffic on every failed login.
+    """
+
+    def __init__(self, limit: int, window: int, db_engine=engine):
+        self.limit = limit
+        self.window = window
+        self.engine = db_engine
+        self._ready = False
+
+    def _ensure_table(self, conn):
+        if self._ready:
+            return
+        conn.execute(text(
+            "CREATE UNLOGGED TABLE IF NOT EXISTS login_throttle ("
+            " key TEXT PRIMARY KEY,"
+            " window_start BIGINT NOT NULL,"
+            " current_count INTEGER NOT NULL,"
+            " previous_count INTEGER NOT NULL)"
+        ))
+        self._ready = True
+
+    def is_blocked(self, key: str) -> bool:
+        with self.engine.connect() as conn:
+            self._ensure_table(conn)
+            row = conn.execute(
+                text("SELECT window_start, current_count, previous_count FROM login_throttle WHERE key = :key"),
+                {"key": key}
+            ).first()
+            conn.commit()
+        if row is None:
+            return False
+        return weighted_count(*row, time.time(), self.window) >= self.limit
+
+    def record_failure(self, key: str):
+        this_window = window_start_for(time.time(), self.window)
+        with self.engine.connect() as conn:
+            self._ensure_table(conn)
+            conn.execute(
+                text(
+                    "INSERT INTO login_throttle (key, window_start, current_count, previous_count)"
+                    " VALUES (:key, :ws, 1, 0)"
+                    " ON CONFLICT (key) DO UPDATE SET"
+                    " previous_count = CASE"
+                    "   WHEN login_throttle.window_start = :ws THEN login_throttle.previous_count"
+                    "   WHEN login_throttle.window_start = :ws - :window THEN login_throttle.current_count"
+                    "   ELSE 0 END,"
+                    " current_count = CASE"
+                    "   WHEN login_throttle.window_start = :ws THEN login_throttle.current_count + 1"
+                    "   ELSE 1 END,"
+                    " window_start = :ws"
+                ),
+                {"key": key, "ws": this_window, "window": self.window}
+            )
+            conn.commit()
+
+    def reset(self, key: str):
+        with self.engine.connect() as conn:
+            self._ensure_table(conn)
+            conn.execute(text("DELETE FROM login_throttle WHERE key = :key"), {"key": key})
+            conn.commit()
+
+    def purge_expired(self) -> int:
+        cutoff = window_start_for(time.time(), self.window) - self.window
+        with self.engine.connect() as conn:
+            self._ensure_table(conn)
+            result = conn.execute(
+                text("DELETE FROM login_throttle WHERE window_start < :cutoff"),
+                {"cutoff": cutoff}
+            )
+            conn.commit()
+        return result.rowcount
+
+
+def build_login_throttle(backend: Optional[str] = None):
+    backend = backend or LOGIN_THROTTLE_BACKEND
+    if backend == "postgres":
+        return PostgresRateLimitStore(LOGIN_MAX_FAILURES, LOGIN_THROTTLE_WINDOW_SECONDS)
+    return MemoryRateLimitStore(LOGIN_MAX_FAILURES, LOGIN_THROTTLE_WINDOW_SECONDS)
+
+
+login_throttle = build_login_throttle()
@@ -0,0 +1,308 @@
+# services/response_cache.py
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Iterable, NamedTuple, Optional
+
+from fastapi import Request, Response
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session as OrmSession
+from sqlmodel import Session
+
+from .db import engine, get_async_engine
+from .fast_json import encode_json
+
+# "memory" (per worker) or "postgres" (unlogged tables shared by every worker)
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory")
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "30"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "10000"))
+
+
+class CachedResponse(NamedTuple):
+    etag: str
+    body: bytes
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match comparison; weak validators match too, as RFC 9110 requires for GET"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+
+
+class MemoryResponseCache:
+    """
+    LRU + TTL cache of encoded responses for one worker.
+
+    Staleness is tracked with a logical clock rather than per-entry deletes:
+    a reader takes a token before computing, invalidation stamps the auction
+    with a newer clock value, and an entry is only served while its token is
+    at least the auction's stamp. A reader racing a write therefore can never
+    store a result that outlives the write. Stamps are kept for at most
+    max_entries auctions; evicted ones fold into a floor that conservatively
+    invalidates everything older.
+    """
+
+    def __init__(self, ttl: float = RESPONSE_CACHE_TTL_SECONDS, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._stamps: "OrderedDict[int, int]" = OrderedDict()
+        self._clock = 0
+        self._floor = 0
+        self._lock = threading.Lock()
+
+    async def ensure_tables(self):
+        pass
+
+    async def version(self, auction_id: int) -> int:
+        return self._clock
+
+    async def get(self, key: str, auction_id: int) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                token, expires_at, response = entry
+                if token >= self._stamps.get(auction_id, self._floor) and expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return response
+                del self._entries[key]
+            self.misses += 1
+        return None
+
+    async def put(self, key: str, auction_id: int, version: int, response: CachedResponse, ttl: float):
+        with self._lock:
+            if version < self._stamps.get(auction_id, self._floor):
+                return
+            self._entries[key] = (version, time.monotonic() + ttl, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, db: Session, auction_ids: Iterable[int]):
+        """Invalidate once the caller's transaction commits, so readers never re-cache pre-commit state"""
+        db.info.setdefault("response_cache_invalidations", set()).update(auction_ids)
+
+    def bump(self, auction_ids: Iterable[int]):
+        with self._lock:
+            for auction_id in auction_ids:
+                self._clock += 1
+                self._stamps[auction_id] = self._clock
+                self._stamps.move_to_end(auction_id)
+            while len(self._stamps) > self.max_entries:
+                _, stamp = self._stamps.popitem(last=False)
+                self._floor = max(self._floor, stamp)
+
+    def purge_expired(self) -> int:
+        now = time.monotonic()
+        with self._lock:
+            expired = [key for key, (_, expires_at, _) in self._entries.items() if expires_at <= now]
+            for key in expired:
+                del self._entries[key]
+        return len(expired)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": "memory",
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+class PostgresResponseCache:
+    """
+    The same cache in UNLOGGED tables so every worker shares entries and
+    invalidations. Versions are bumped inside the writer's own transaction,
+    which makes invalidation atomic with the write it describes; a crash
+    truncates both tables together, which only empties the cache.
+    """
+
+    def __init__(self, ttl: float = RESPONSE_CACHE_TTL_SECONDS, db_engine=engine):
+        self.ttl = ttl
+        self.engine = db_engine
+        self.hits = 0
+        self.misses = 0
+        self._ready = False
+
+    def _ensure_tables(self):
+        if self._ready:
+            return
+        with self.engine.begin() as conn:
+            conn.execute(text(
+                "CREATE UNLOGGED TABLE IF NOT EXISTS response_cache_version ("
+                " auction_id BIGINT PRIMARY KEY,"
+                " version BIGINT NOT NULL)"
+            ))
+            conn.execute(text(
+                "CREATE UNLOGGED TABLE IF NOT EXISTS response_cache ("
+                " key TEXT PRIMARY KEY,"
+                " auction_id BIGINT NOT NULL,"
+                " version BIGINT NOT NULL,"
+                " expires_at DOUBLE PRECISION NOT NULL,"
+                " etag TEXT NOT NULL,"
+                " body BYTEA NOT NULL)"
+            ))
+        self._ready = True
+
+    async def ensure_tables(self):
+        """_ensure_tables on a worker thread; called at startup so no request pays for the DDL"""
+        if not self._ready:
+            await asyncio.to_thread(self._ensure_tables)
+
+    async def version(self, auction_id: int) -> int:
+        await self.ensure_tables()
+        async with get_async_engine().connect() as conn:
+            version = await conn.scalar(
+                text("SELECT version FROM response_cache_version WHERE auction_id = :auction_id"),
+                {"auction_id": auction_id}
+            )
+        return version or 0
+
+    async def get(self, key: str, auction_id: int) -> Optional[CachedResponse]:
+        await self.ensure_tables()
+        async with get_async_engine().connect() as conn:
+            row = (await conn.execute(
+                text(
+                    "SELECT c.etag, c.body FROM response_cache c"
+                    " LEFT JOIN response_cache_version v ON v.auction_id = c.auction_id"
+                    " WHERE c.key = :key AND c.expires_at > :now"
+                    " AND c.version = COALESCE(v.version, 0)"
+                ),
+                {"key": key, "now": time.time()}
+            )).first()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return CachedResponse(row.etag, bytes(row.body))
+
+    async def put(self, key: str, auction_id: int, version: int, response: CachedResponse, ttl: float):
+        await self.ensure_tables()
+        async with get_async_engine().begin() as conn:
+            await conn.execute(
+                text(
+                    "INSERT INTO response_cache (key, auction_id, version, expires_at, etag, body)"
+                    " VALUES (:key, :auction_id, :version, :expires_at, :etag, :body)"
+                    " ON CONFLICT (key) DO UPDATE SET"
+                    " version = excluded.version, expires_at = excluded.expires_at,"
+                    " etag = excluded.etag, body = excluded.body"
+                    " WHERE response_cache.version <= excluded.version"
+                ),
+                {
+                    "key": key,
+                    "auction_id": auction_id,
+                    "version": version,
+                    "expires_at": time.time() + ttl,
+                    "etag": response.etag,
+                    "body": response.body,
+                }
+            )
+
+    def invalidate(self, db: Session, auction_ids: Iterable[int]):
+        """Bump versions in the caller's transaction; they take effect when it commits"""
+        params = [{"auction_id": auction_id} for auction_id in set(auction_ids)]
+        if not params:
+            return
+        self._ensure_tables()
+        db.execute(
+            text(
+                "INSERT INTO response_cache_version (auction_id, version) VALUES (:auction_id, 1)"
+                " ON CONFLICT (auction_id) DO UPDATE SET version = response_cache_version.version + 1"
+            ),
+            params
+        )
+
+    def bump(self, auction_ids: Iterable[int]):
+        pass
+
+    def purge_expired(self) -> int:
+        self._ensure_tables()
+        with self.engine.begin() as conn:
+            result = conn.execute(text("DELETE FROM response_cache WHERE expires_at <= :now"), {"now": time.time()})
+        return result.rowcount
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": "postgres",
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+def build_response_cache(backend: Optional[str] = None):
+    backend = backend or RESPONSE_CACHE_BACKEND
+    if backend == "postgres":
+        return PostgresResponseCache()
+    return MemoryResponseCache()
+
+
+response_cache = build_response_cache()
+
+
+@event.listens_for(OrmSession, "after_commit")
+def _apply_invalidations(session):
+    auction_ids = session.info.pop("response_cache_invalidations", None)
+    if auction_ids:
+        response_cache.bump(auction_ids)
+
+
+@event.listens_for(OrmSession, "after_rollback")
+def _discard_invalidations(session):
+    session.info.pop("response_cache_invalidations", None)
+
+
+def invalidate_auctions(db: Session, auction_ids: Iterable[int]):
+    """Drop cached reads of these auctions as part of the caller's write"""
+    response_cache.invalidate(db, auction_ids)
+
+
+def _ttl_for(payload: dict) -> float:
+    """Never serve an active auction's response past its end_date, when it changes without a write"""
+    end_date = payload.get("end_date")
+    if not payload.get("is_active") or not isinstance(end_date, datetime):
+        return RESPONSE_CACHE_TTL_SECONDS
+    return min(RESPONSE_CACHE_TTL_SECONDS, (end_date - datetime.utcnow()).total_seconds())
+
+
+async def cached_auction_response(
+    request: Request, key: str, auction_id: int, compute: Callable[[], Awaitable[Optional[dict]]]
+) -> Optional[Response]:
+    """
+    Read-through: serve the cached encoding of an auction read, or compute and
+    cache it. Answers 304 when If-None-Match already has the current ETag.
+    Returns None when compute finds nothing, so the route can 404.
+    """
+    cached = await response_cache.get(key, auction_id)
+    if cached is None:
+        version = await response_cache.version(auction_id)
+        payload = await compute()
+        if payload is None:
+            return None
+        body = encode_json(payload)
+        cached = CachedResponse(make_etag(body), body)
+        ttl = _ttl_for(payload)
+        if ttl > 0:
+            await response_cache.put(key, auction_id, version, cached, ttl)
+
+    headers = {"ETag": cached.etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), cached.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(cached.body, media_type="application/json", headers=headers)
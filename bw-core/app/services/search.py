@@ -0,0 +1,317 @@
+# services/search.py
+import re
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import event, func, literal_column, or_
+from sqlalchemy.orm import Session as OrmSession
+from sqlmodel import Session, select
+
+from ..entities.auction import Auction
+from ..entities.item import Item, ITEM_SEARCH_DOCUMENT
+from ..entities.user import User, UserRole
+
+# pg_trgm's default similarity threshold; the in-memory index uses the same cut-off
+TRIGRAM_THRESHOLD = 0.3
+# In-memory term weights, mirroring setweight 'A' (name) and 'B' (description)
+NAME_WEIGHT = 1.0
+DESCRIPTION_WEIGHT = 0.4
+# Ids per IN list when loading in-memory matches, under SQLite's bound-parameter limit
+MEMORY_FETCH_CHUNK = 10_000
+
+
+def tokenize(text: str) -> List[str]:
+    return re.findall(r"\w+", text.lower())
+
+
+def word_trigrams(text: str) -> Set[str]:
+    """Trigrams the way pg_trgm builds them: each word padded with two leading spaces and one trailing"""
+    grams = set()
+    for word in tokenize(text):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def substring_trigrams(text: str) -> Set[str]:
+    text = text.lower()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def similarity(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def escape_like(value: str) -> str:
+    return value.replace("!", "!!").replace("%", "!%").replace("_", "!_")
+
+
+class MemorySearchIndex:
+    """
+    Inverted index over item text and user fields for databases without
+    tsvector and pg_trgm (SQLite in local runs and tests). Built from the
+    database on first search and kept current from committed ORM changes;
+    bulk loads that bypass the ORM must call invalidate().
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.ready = False
+        self._clear()
+
+    def _clear(self):
+        self.item_terms: Dict[str, Dict[int, float]] = defaultdict(dict)
+        self.item_grams: Dict[str, Set[int]] = defaultdict(set)
+        self.items: Dict[int, Tuple[str, str]] = {}
+        self.user_grams: Dict[str, Set[int]] = defaultdict(set)
+        self.users: Dict[int, Tuple[str, str]] = {}
+
+    def invalidate(self):
+        with self._lock:
+            self.ready = False
+            self._clear()
+
+    def ensure(self, db: Session):
+        if self.ready:
+            return
+        items = db.exec(select(Item.id, Item.name, Item.description)).all()
+        users = db.exec(select(User.id, User.username, User.email)).all()
+        with self._lock:
+            if self.ready:
+                return
+            for item_id, name, description in items:
+                self._add_item(item_id, name, description)
+            for user_id, username, email in users:
+                self._add_user(user_id, username, email)
+            self.ready = True
+
+    def _add_item(self, item_id: int, name: str, description: str):
+        self._remove_item(item_id)
+        self.items[item_id] = (name, description)
+        for term in tokenize(description):
+            self.item_terms[term][item_id] = DESCRIPTION_WEIGHT
+        for term in tokenize(name):
+            self.item_terms[term][item_id] = NAME_WEIGHT
+        for gram in word_trigrams(name):
+            self.item_grams[gram].add(item_id)
+
+    def _remove_item(self, item_id: int):
+        previous = self.items.pop(item_id, None)
+        if previous is None:
+            return
+        name, description = previous
+        for term in tokenize(name) + tokenize(description):
+            self.item_terms[term].pop(item_id, None)
+        for gram in word_trigrams(name):
+            self.item_grams[gram].discard(item_id)
+
+    def _add_user(self, user_id: int, username: str, email: str):
+        self._remove_user(user_id)
+        self.users[user_id] = (username.lower(), email.lower())
+        for gram in substring_trigrams(username) | substring_trigrams(email):
+            self.user_grams[gram].add(user_id)
+
+    def _remove_user(self, user_id: int):
+        previous = self.users.pop(user_id, None)
+        if previous is None:
+            return
+        for gram in substring_trigrams(previous[0]) | substring_trigrams(previous[1]):
+            self.user_grams[gram].discard(user_id)
+
+    def apply(self, changes: Dict[Tuple[type, int], Optional[tuple]]):
+        """Apply committed inserts/updates (a field tuple) and deletes (None)"""
+        with self._lock:
+            if not self.ready:
+                return
+            for (kind, key), fields in changes.items():
+                if kind is Item and fields:
+                    self._add_item(key, *fields)
+                elif kind is Item:
+                    self._remove_item(key)
+                elif fields:
+                    self._add_user(key, *fields)
+                else:
+                    self._remove_user(key)
+
+    def search_items(self, query: str) -> Dict[int, float]:
+        """Item ids matching the query words or similar to the name, with a score"""
+        scores: Dict[int, float] = defaultdict(float)
+        query_grams = word_trigrams(query)
+        with self._lock:
+            for term in set(tokenize(query)):
+                for item_id, weight in self.item_terms.get(term, {}).items():
+                    scores[item_id] += weight
+            candidates = set()
+            for gram in query_grams:
+                candidates |= self.item_grams.get(gram, set())
+            for item_id in candidates:
+                name_similarity = similarity(word_trigrams(self.items[item_id][0]), query_grams)
+                if name_similarity >= TRIGRAM_THRESHOLD or item_id in scores:
+                    scores[item_id] += name_similarity
+        return dict(scores)
+
+    def search_users(self, query: str) -> Dict[int, float]:
+        """User ids whose username or email contains the query, scored by similarity"""
+        needle = query.lower()
+        query_grams = word_trigrams(query)
+        with self._lock:
+            grams = substring_trigrams(needle)
+            if grams:
+                candidates = set.intersection(*(self.user_grams.get(gram, set()) for gram in grams))
+            else:
+                candidates = set(self.users)
+            matches = {}
+            for user_id in candidates:
+                username, email = self.users[user_id]
+                if needle in username or needle in email:
+                    matches[user_id] = max(
+                        similarity(word_trigrams(username), query_grams),
+                        similarity(word_trigrams(email), query_grams)
+                    )
+        return matches
+
+
+memory_index = MemorySearchIndex()
+
+
+@event.listens_for(OrmSession, "after_flush")
+def _collect_search_changes(session, flush_context):
+    if not memory_index.ready:
+        return
+    changes = session.info.setdefault("search_changes", {})
+    for obj in session.new | session.dirty:
+        if isinstance(obj, Item):
+            changes[(Item, obj.id)] = (obj.name, obj.description)
+        elif isinstance(obj, User):
+            changes[(User, obj.id)] = (obj.username, obj.email)
+    for obj in session.deleted:
+        if isinstance(obj, (Item, User)):
+            changes[(type(obj), obj.id)] = None
+
+
+@event.listens_for(OrmSession, "after_commit")
+def _apply_search_changes(session):
+    changes = session.info.pop("search_changes", None)
+    if changes:
+        memory_index.apply(changes)
+
+
+@event.listens_for(OrmSession, "after_rollback")
+def _discard_search_changes(session):
+    session.info.pop("search_changes", None)
+
+
+def _uses_postgres(db: Session) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def _fetch_best(db: Session, statement, column, scores: Dict[int, float], limit: int) -> list:
+    """
+    Rows of the statement whose column is among the scored ids, loaded best
+    score first in bounded IN lists, stopping once a whole score tier brings
+    the total to limit. A common word can match most of the index, which as
+    one IN list would exceed SQLite's parameter limit.
+    """
+    tiers: Dict[float, List[int]] = defaultdict(list)
+    for key, score in scores.items():
+        tiers[score].append(key)
+    rows = []
+    for score in sorted(tiers, reverse=True):
+        keys = tiers[score]
+        for start in range(0, len(keys), MEMORY_FETCH_CHUNK):
+            rows.extend(db.exec(statement.where(column.in_(keys[start:start + MEMORY_FETCH_CHUNK]))).all())
+        if len(rows) >= limit:
+            break
+    return rows
+
+
+def auction_result(auction: Auction, item: Item, score: float) -> dict:
+    return {
+        "id": auction.id,
+        "item_id": auction.item_id,
+        "user_id": auction.user_id,
+        "start_date": auction.start_date,
+        "end_date": auction.end_date,
+        "is_active": auction.is_active,
+        "current_price": auction.current_price if auction.current_price is not None else item.initial_price,
+        "score": round(float(score), 4),
+        "item": {
+            "id": item.id,
+            "name": item.name,
+            "description": item.description,
+            "initial_price": item.initial_price,
+            "image_url": item.image_url,
+        },
+    }
+
+
+def search_auctions(
+    db: Session,
+    query: str,
+    active_only: bool = True,
+    ending_within: Optional[timedelta] = None,
+    limit: int = 20
+) -> List[dict]:
+    """
+    Auctions whose item name or description matches the query, best match
+    first. On Postgres this is a tsvector match or trigram-similar name,
+    ranked by ts_rank plus name similarity; elsewhere the in-memory index.
+    """
+    statement = select(Auction, Item).join(Item, Item.id == Auction.item_id)
+    if active_only or ending_within is not None:
+        statement = statement.where(Auction.is_active == True)
+    if ending_within is not None:
+        # Past their end but not yet settled by the closer: no longer "ending soon"
+        now = datetime.utcnow()
+        statement = statement.where(Auction.end_date > now, Auction.end_date <= now + ending_within)
+
+    if _uses_postgres(db):
+        tsquery = func.websearch_to_tsquery(literal_column("'english'"), query)
+        score = func.ts_rank(ITEM_SEARCH_DOCUMENT, tsquery) + func.similarity(Item.name, query)
+        rows = db.exec(
+            statement.add_columns(score)
+            .where(or_(ITEM_SEARCH_DOCUMENT.op("@@")(tsquery), Item.name.op("%")(query)))
+            .order_by(score.desc(), Auction.end_date, Auction.id)
+            .limit(limit)
+        ).all()
+        return [auction_result(auction, item, rank) for auction, item, rank in rows]
+
+    memory_index.ensure(db)
+    scores = memory_index.search_items(query)
+    rows = _fetch_best(db, statement, Auction.item_id, scores, limit)
+    rows = sorted(rows, key=lambda row: (-scores[row[1].id], row[0].end_date, row[0].id))[:limit]
+    return [auction_result(auction, item, scores[item.id]) for auction, item in rows]
+
+
+def search_users(
+    db: Session, query: Optional[str] = None, role: Optional[UserRole] = None, limit: int = 50
+) -> List[User]:
+    """
+    Users whose username or email contains the query, closest match first.
+    The trigram GIN indexes serve the ILIKE on Postgres; elsewhere the
+    in-memory index narrows candidates by trigram before checking substrings.
+    """
+    statement = select(User)
+    if role:
+        statement = statement.where(User.role == role)
+    if not query:
+        return db.exec(statement.order_by(User.id).limit(limit)).all()
+
+    if _uses_postgres(db):
+        pattern = f"%{escape_like(query)}%"
+        score = func.greatest(func.similarity(User.username, query), func.similarity(User.email, query))
+        return db.exec(
+            statement
+            .where(or_(User.username.ilike(pattern, escape="!"), User.email.ilike(pattern, escape="!")))
+            .order_by(score.desc(), User.id)
+            .limit(limit)
+        ).all()
+
+    memory_index.ensure(db)
+    scores = memory_index.search_users(query)
+    users = _fetch_best(db, statement, User.id, scores, limit)
+    return sorted(users, key=lambda user: (-scores[user.id], user.id))[:limit]
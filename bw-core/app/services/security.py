@@ -1,10 +1,67 @@
+import asyncio
+import hmac
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
 import bcrypt
+from fastapi import Header, HTTPException
+
+# bcrypt cost factor for new hashes; raising it rehashes users on their next login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Processes dedicated to bcrypt so hashing never occupies the request threadpool
+BCRYPT_POOL_SIZE = int(os.getenv("BCRYPT_POOL_SIZE", str(os.cpu_count() or 1)))
+
+# Shared secret for operator-only endpoints such as the order export; unset disables them
+ADMIN_API_TOKEN = os.getenv("ADMIN_API_TOKEN")
+
+_pool: Optional[ProcessPoolExecutor] = None
+
 
 def hash_password(password: str) -> str:
     """Hashes a plain text password."""
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
     return bcrypt.hashpw(password.encode("utf-8"), salt).decode("utf-8")
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verifies a password against its hash."""
     return bcrypt.checkpw(plain_password.encode("utf-8"), hashed_password.encode("utf-8"))
+
+def needs_rehash(hashed_password: str) -> bool:
+    """True if the hash was made with a different cost factor than BCRYPT_ROUNDS."""
+    # bcrypt hashes look like $2b$<cost>$<salt+digest>
+    try:
+        return int(hashed_password.split("$")[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
+
+
+def get_password_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=BCRYPT_POOL_SIZE)
+    return _pool
+
+def shutdown_password_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+async def hash_password_async(password: str) -> str:
+    """hash_password on the bcrypt process pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_password_pool(), hash_password, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password on the bcrypt process pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_password_pool(), verify_password, plain_password, hashed_password)
+
+
+def require_admin_token(x_admin_token: Optional[str] = Header(None)):
+    """Dependency for operator-only routes: the X-Admin-Token header must match ADMIN_API_TOKEN."""
+    if not ADMIN_API_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token, ADMIN_API_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
@@ -0,0 +1,409 @@
+# services/synthetic_data.py
+"""
+Bulk synthetic dataset for load testing: millions of users, auctions and
+bids written straight to the tables, bypassing the ORM. Postgres gets the
+rows through COPY, from several worker processes at once; SQLite through
+executemany.
+
+Rows are written with explicit ids starting after the current maximum, so
+run it against a database nobody else is writing to. Each auction's
+denormalized top of book (current_price, highest_bid_id) and, once ended,
+its winning_bid_id are computed while its bids are generated, and the
+user_stats table is rebuilt at the end. Cached reads of the new auction
+ids are invalidated through the response cache, which every worker sees
+with the postgres backend; other in-memory state (the search index, the
+closer's timer heap) belongs to the process that holds it.
+
+    python -m app.services.synthetic_data --users 1000000 --auctions 500000 --bids 50000000
+"""
+import argparse
+import io
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional, Sequence
+
+from sqlalchemy import create_engine
+from sqlmodel import Session, func, select
+
+from ..entities.auction import Auction
+from ..entities.bid import Bid
+from ..entities.item import Item
+from ..entities.user import User
+from .response_cache import invalidate_auctions
+from .security import hash_password
+from .user_stats import rebuild_user_stats
+
+# Every generated user signs in with this password (it meets the sign-up rules)
+SYNTHETIC_PASSWORD = "Synthetic1!"
+# Rows buffered before they are flushed and committed
+DEFAULT_BATCH_ROWS = 500_000
+
+ITEM_WORDS = [
+    "vintage", "camera", "leica", "console", "watch", "swiss", "print", "signed", "cards", "rare",
+    "guitar", "vinyl", "lamp", "chair", "oak", "silver", "ring", "bicycle", "lens", "poster",
+    "antique", "clock", "mirror", "desk", "jacket", "leather", "sneakers", "limited", "edition", "boxed",
+]
+CITIES = ["Toronto", "Montreal", "Vancouver", "Calgary", "Ottawa", "Halifax", "Winnipeg", "Victoria"]
+# Auction lengths sellers pick from, in days
+DURATIONS = [1, 3, 5, 7, 10]
+MIN_BID_INCREMENTS = [1.0, 2.0, 5.0, 10.0]
+# Increments each new bid clears the last by: mostly the minimum, sometimes a jump
+BID_STEPS = (1, 1, 1, 1, 2, 2, 3, 5)
+
+USER_COLUMNS = (
+    "id", "username", "email", "password", "is_active", "is_admin", "role", "street", "city", "country", "postal_code"
+)
+ITEM_COLUMNS = ("id", "name", "description", "initial_price", "image_url", "created_at")
+AUCTION_COLUMNS = (
+    "id", "start_date", "end_date", "min_bid_increment", "item_id", "user_id", "is_active", "created_at",
+    "winning_bid_id", "current_price", "highest_bid_id"
+)
+BID_COLUMNS = ("id", "amount", "user_id", "auction_id", "created_at")
+
+
+@dataclass
+class SyntheticConfig:
+    users: int = 10_000
+    auctions: int = 5_000
+    bids: int = 500_000
+    # Share of users who are sellers; the rest bid
+    seller_fraction: float = 0.1
+    # Auctions start up to this many days ago (and a few up to a day ahead)
+    history_days: float = 60
+    # Spread of auction popularity (lognormal sigma); higher means a few very hot auctions
+    popularity_sigma: float = 1.0
+    # How strongly bids crowd into an auction's last moments; 1 spreads them evenly
+    snipe_skew: float = 3.0
+    batch_rows: int = DEFAULT_BATCH_ROWS
+    # Processes writing auction ranges in parallel (Postgres only; SQLite has one writer)
+    workers: int = 1
+    seed: int = 4413
+
+
+def _timestamp(moment: datetime) -> str:
+    # The same text SQLAlchemy stores for SQLite, which Postgres also parses
+    return moment.isoformat(sep=" ", timespec="microseconds")
+
+
+class PostgresWriter:
+    """Streams each batch into the table with COPY ... FROM STDIN on the raw psycopg2 connection"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        with connection.cursor() as cursor:
+            # Losing the tail of a synthetic load on a crash is fine; waiting on every commit's flush is not
+            cursor.execute("SET synchronous_commit TO off")
+
+    def write(self, table: str, columns: Sequence[str], rows: List[tuple]):
+        if not rows:
+            return
+        buffer = io.StringIO()
+        buffer.writelines(
+            ",".join("" if value is None else str(value) for value in row) + "\n" for row in rows
+        )
+        buffer.seek(0)
+        with self.connection.cursor() as cursor:
+            cursor.copy_expert(f'COPY "{table}" ({", ".join(columns)}) FROM STDIN WITH (FORMAT csv)', buffer)
+
+    def commit(self):
+        self.connection.commit()
+
+    def finish(self, tables: Sequence[str]):
+        with self.connection.cursor() as cursor:
+            # Rows went in with explicit ids, so move the sequences past them
+            for table in tables:
+                cursor.execute(
+                    f"SELECT setval(pg_get_serial_sequence('\"{table}\"', 'id'), "
+                    f"(SELECT COALESCE(MAX(id), 1) FROM \"{table}\"))"
+                )
+            # Fresh planner statistics, or every query plans for the empty tables
+            for table in tables:
+                cursor.execute(f'ANALYZE "{table}"')
+        self.connection.commit()
+
+
+class SQLiteWriter:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def write(self, table: str, columns: Sequence[str], rows: List[tuple]):
+        if not rows:
+            return
+        placeholders = ", ".join("?" for _ in columns)
+        self.connection.cursor().executemany(
+            f'INSERT INTO "{table}" ({", ".join(columns)}) VALUES ({placeholders})', rows
+        )
+
+    def commit(self):
+        self.connection.commit()
+
+    def finish(self, tables: Sequence[str]):
+        self.connection.commit()
+
+
+def _next_id(db: Session, model) -> int:
+    return (db.exec(select(func.max(model.id))).one() or 0) + 1
+
+
+def _bid_counts(rng: random.Random, total: int, weights: List[float]) -> List[int]:
+    """Split total bids over the auctions in proportion to their popularity weights"""
+    weight_sum = sum(weights)
+    if not weight_sum:
+        return [0] * len(weights)
+    counts = [int(total * weight / weight_sum) for weight in weights]
+    eligible = [index for index, weight in enumerate(weights) if weight]
+    for index in rng.sample(eligible, min(total - sum(counts), len(eligible))):
+        counts[index] += 1
+    return counts
+
+
+@dataclass
+class AuctionRange:
+    """One worker's contiguous slice of the auctions, with the ids its rows start from"""
+    offset: int
+    starts: List[datetime]
+    durations: List[timedelta]
+    counts: List[int]
+    first_item: int
+    first_auction: int
+    first_bid: int
+    first_seller: int
+    sellers: int
+    first_buyer: int
+    buyers: int
+
+
+def _open_writer(connection, dialect: str):
+    return PostgresWriter(connection) if dialect == "postgresql" else SQLiteWriter(connection)
+
+
+def write_auctions(
+    db_engine,
+    task: AuctionRange,
+    config: SyntheticConfig,
+    now: datetime,
+    progress: Optional[Callable[[str], None]] = None
+) -> int:
+    """Write the range's items, auctions and bids, committing every config.batch_rows rows; returns the bids written"""
+    rng = random.Random(config.seed * 1_000_003 + task.offset)
+    uniform, choice = rng.random, rng.choice
+    skew = config.snipe_skew
+    next_bid = task.first_bid
+    bids_written = 0
+    started = time.perf_counter()
+
+    connection = db_engine.raw_connection()
+    try:
+        writer = _open_writer(connection, db_engine.dialect.name)
+        items, auctions, bids = [], [], []
+        for index, (start, duration, count) in enumerate(zip(task.starts, task.durations, task.counts)):
+            item_id, auction_id = task.first_item + index, task.first_auction + index
+            end = start + duration
+            initial_price = round(max(rng.lognormvariate(4, 1), 1.0), 2)
+            increment = choice(MIN_BID_INCREMENTS)
+            name = " ".join(rng.sample(ITEM_WORDS, 2)).title()
+            description = " ".join(rng.choices(ITEM_WORDS, k=10))
+            items.append((item_id, name, description, initial_price, None, _timestamp(start)))
+
+            # Bid times crowd toward the close (u ** skew is dense near zero); amounts climb with time
+            window_end = min(end, now)
+            span = (window_end - start).total_seconds()
+            offsets = sorted(span * uniform() ** skew for _ in range(count))
+            price = initial_price
+            bidder = 0
+            highest_bid_id = None
+            for offset in reversed(offsets):
+                if highest_bid_id is not None:
+                    price += increment * choice(BID_STEPS)
+                # Nobody outbids themselves
+                previous, bidder = bidder, task.first_buyer + int(uniform() * task.buyers)
+                if bidder == previous and task.buyers > 1:
+                    bidder = task.first_buyer + (bidder - task.first_buyer + 1) % task.buyers
+                highest_bid_id = next_bid
+                bids.append((
+                    next_bid, round(price, 2), bidder, auction_id,
+                    _timestamp(window_end - timedelta(seconds=offset))
+                ))
+                next_bid += 1
+
+            ended = end <= now
+            auctions.append((
+                auction_id, _timestamp(start), _timestamp(end), increment, item_id,
+                task.first_seller + int(uniform() * task.sellers), not ended, _timestamp(start),
+                highest_bid_id if ended else None,
+                round(price, 2) if highest_bid_id is not None else None, highest_bid_id
+            ))
+
+            if len(bids) + len(auctions) >= config.batch_rows or index == len(task.starts) - 1:
+                # Foreign keys: items before auctions before their bids
+                writer.write("item", ITEM_COLUMNS, items)
+                writer.write("auction", AUCTION_COLUMNS, auctions)
+                writer.write("bid", BID_COLUMNS, bids)
+                writer.commit()
+                bids_written += len(bids)
+                if progress:
+                    elapsed = time.perf_counter() - started
+                    progress(f"{index + 1} auctions, {bids_written} bids ({bids_written / elapsed:,.0f} bids/s)")
+                items, auctions, bids = [], [], []
+    finally:
+        connection.close()
+    return bids_written
+
+
+def _write_auctions_in_worker(database_url: str, task: AuctionRange, config: SyntheticConfig, now: datetime) -> int:
+    db_engine = create_engine(database_url)
+    try:
+        return write_auctions(db_engine, task, config, now)
+    finally:
+        db_engine.dispose()
+
+
+def generate(
+    db_engine,
+    config: SyntheticConfig,
+    progress: Optional[Callable[[str], None]] = None
+) -> dict:
+    """Write config.users users, config.auctions items and auctions, and config.bids bids; returns the counts"""
+    started = time.perf_counter()
+    rng = random.Random(config.seed)
+    now = datetime.utcnow()
+    report = progress or (lambda message: None)
+
+    with Session(db_engine) as db:
+        first_user = _next_id(db, User)
+        first_item = _next_id(db, Item)
+        first_auction = _next_id(db, Auction)
+        first_bid = _next_id(db, Bid)
+    dialect = db_engine.dialect.name
+
+    # Users: sellers first, then buyers, so both are contiguous id ranges
+    sellers = max(int(config.users * config.seller_fraction), 1)
+    buyers = max(config.users - sellers, 1)
+    password = hash_password(SYNTHETIC_PASSWORD)
+    tag = f"{int(time.time()):x}"
+    connection = db_engine.raw_connection()
+    try:
+        writer = _open_writer(connection, dialect)
+        rows = []
+        for index in range(sellers + buyers):
+            role = "SELLER" if index < sellers else "BUYER"
+            rows.append((
+                first_user + index, f"syn_{tag}_{index}", f"syn_{tag}_{index}@synthetic.local", password, True,
+                False, role, f"{index % 9999 + 1} Synthetic St", CITIES[index % len(CITIES)], "Canada",
+                f"S{index % 100000:05d}"
+            ))
+            if len(rows) >= config.batch_rows:
+                writer.write("user", USER_COLUMNS, rows)
+                writer.commit()
+                rows = []
+        writer.write("user", USER_COLUMNS, rows)
+        writer.commit()
+    finally:
+        connection.close()
+    report(f"{sellers + buyers} users")
+
+    # Auction schedule and popularity up front, so bids can be shared out across all of them
+    history = config.history_days * 86400
+    starts, durations, weights = [], [], []
+    for _ in range(config.auctions):
+        start = now - timedelta(seconds=rng.uniform(-86400, history))
+        starts.append(start)
+        durations.append(timedelta(days=rng.choice(DURATIONS)))
+        # Auctions that haven't started yet can't have bids
+        weights.append(rng.lognormvariate(0, config.popularity_sigma) if start < now else 0.0)
+    counts = _bid_counts(rng, config.bids, weights)
+
+    # SQLite has a single writer, so only Postgres fans out
+    workers = max(config.workers, 1) if dialect == "postgresql" else 1
+    parts = workers * 4 if workers > 1 else 1
+    size = -(-config.auctions // parts) if config.auctions else 0
+    tasks = []
+    next_bid = first_bid
+    for offset in range(0, config.auctions, size or 1):
+        tasks.append(AuctionRange(
+            offset=offset,
+            starts=starts[offset:offset + size],
+            durations=durations[offset:offset + size],
+            counts=counts[offset:offset + size],
+            first_item=first_item + offset,
+            first_auction=first_auction + offset,
+            first_bid=next_bid,
+            first_seller=first_user,
+            sellers=sellers,
+            first_buyer=first_user + sellers,
+            buyers=buyers,
+        ))
+        next_bid += sum(tasks[-1].counts)
+
+    bids_written = 0
+    if workers == 1:
+        for task in tasks:
+            bids_written += write_auctions(db_engine, task, config, now, progress)
+    else:
+        database_url = db_engine.url.render_as_string(hide_password=False)
+        # Spawned, not forked, so no worker inherits this process's pooled connections
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = [pool.submit(_write_auctions_in_worker, database_url, task, config, now) for task in tasks]
+            for done, future in enumerate(as_completed(futures), start=1):
+                bids_written += future.result()
+                elapsed = time.perf_counter() - started
+                report(f"{done}/{len(tasks)} ranges, {bids_written} bids ({bids_written / elapsed:,.0f} bids/s)")
+
+    connection = db_engine.raw_connection()
+    try:
+        _open_writer(connection, dialect).finish(["user", "item", "auction", "bid"])
+    finally:
+        connection.close()
+    with Session(db_engine) as db:
+        stats_rows = rebuild_user_stats(db)
+    report(f"rebuilt stats for {stats_rows} users")
+    with Session(db_engine) as db:
+        # Ids start over after a database reset, and the cache may still hold reads from before it
+        invalidate_auctions(db, range(first_auction, first_auction + config.auctions))
+        db.commit()
+
+    return {
+        "users": sellers + buyers,
+        "sellers": sellers,
+        "auctions": config.auctions,
+        "bids": bids_written,
+        "workers": workers,
+        "first_ids": {"user": first_user, "item": first_item, "auction": first_auction, "bid": first_bid},
+        "password": SYNTHETIC_PASSWORD,
+        "seconds": round(time.perf_counter() - started, 1),
+    }
+
+
+def main():
+    from .db import engine
+
+    defaults = SyntheticConfig()
+    parser = argparse.ArgumentParser(description="Bulk-load a synthetic dataset into DATABASE_URL")
+    parser.add_argument("--users", type=int, default=defaults.users)
+    parser.add_argument("--auctions", type=int, default=defaults.auctions)
+    parser.add_argument("--bids", type=int, default=defaults.bids)
+    parser.add_argument("--seller-fraction", type=float, default=defaults.seller_fraction)
+    parser.add_argument("--history-days", type=float, default=defaults.history_days)
+    parser.add_argument("--popularity-sigma", type=float, default=defaults.popularity_sigma)
+    parser.add_argument("--snipe-skew", type=float, default=defaults.snipe_skew)
+    parser.add_argument("--batch-rows", type=int, default=defaults.batch_rows)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="parallel COPY processes (Postgres)")
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    args = parser.parse_args()
+
+    config = SyntheticConfig(**vars(args))
+    summary = generate(engine, config, progress=print)
+    print(summary)
+    print(
+        "Cached auction reads were invalidated. Restart running servers so their search index and auction "
+        "closer pick up the new rows (otherwise the closer's resync and fallback sweep catch up within minutes)"
+    )
+
+
+if __name__ == "__main__":
+    main()
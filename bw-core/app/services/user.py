@@ -5,8 +5,10 @@ from datetime import datetime
 from app.entities.bid import Bid
 from app.entities.auction import Auction
 
-from app.services.security import hash_password, verify_password
+from app.services.security import hash_password, verify_password, hash_password_async
 import re
+from collections import defaultdict
+from typing import Dict, List, Optional
 
 
 def get_all_users(db: Session):
@@ -14,6 +16,48 @@ def get_all_users(db: Session):
     results = db.exec(statement)
     return results.all()
 
+def get_users_page(db: Session, after: Optional[int] = None, limit: int = 100) -> List[dict]:
+    """
+    One page of users with the auctions they list and bid on, keyset-paginated
+    on id. Always three queries, however many users or bids there are.
+    """
+    statement = select(User).order_by(User.id).limit(limit)
+    if after is not None:
+        statement = statement.where(User.id > after)
+    users = db.exec(statement).all()
+    if not users:
+        return []
+    user_ids = [user.id for user in users]
+
+    listed: Dict[int, List[int]] = defaultdict(list)
+    for user_id, auction_id in db.exec(
+        select(Auction.user_id, Auction.id)
+        .where(Auction.user_id.in_(user_ids))
+        .order_by(Auction.id)
+    ):
+        listed[user_id].append(auction_id)
+
+    bidding: Dict[int, List[int]] = defaultdict(list)
+    for user_id, auction_id in db.exec(
+        select(Bid.user_id, Bid.auction_id)
+        .where(Bid.user_id.in_(user_ids))
+        .distinct()
+        .order_by(Bid.auction_id)
+    ):
+        bidding[user_id].append(auction_id)
+
+    return [
+        {
+            "id": user.id,
+            "username": user.username,
+            "email": user.email,
+            "role": user.role,
+            "listed_auctions": listed[user.id],
+            "bidding_on_auctions": bidding[user.id],
+        }
+        for user in users
+    ]
+
 def get_user_by_id(db: Session, user_id: int):
     return db.get(User, user_id)
 
@@ -32,13 +76,6 @@ def create_user(db: Session, user):
     db.refresh(user)
     return user
 
-def search_users_in_db(db: Session, query: str):
-    statement = select(User).where(
-        (User.username.ilike(f"%{query}%")) | (User.email.ilike(f"%{query}%"))
-    )
-    results = db.exec(statement)
-    return results.all()
-
 def has_active_bids(db: Session, user_id: int) -> bool:
     """Check if a user has active bids in auctions that haven't ended yet."""
     statement = (
@@ -53,9 +90,9 @@ def is_strong_password(password: str) -> bool:
     """Check if password is strong (8+ characters, at least one number and one special character)."""
     return bool(re.match(r'^(?=.*[A-Za-z])(?=.*\d)(?=.*[@$!%*?&])[A-Za-z\d@$!%*?&]{8,}$', password))
 
-def create_user_in_db(db: Session, user):
-    # Check for duplicate username/email
-      # Convert username and email to lowercase to prevent duplicates
+def validate_new_user(db: Session, user):
+    """Reject duplicate usernames/emails and weak passwords before any hashing."""
+    # Convert username and email to lowercase to prevent duplicates
     normalized_username = user.username.lower()
     normalized_email = user.email.lower()
 
@@ -69,10 +106,9 @@ def create_user_in_db(db: Session, user):
     if not is_strong_password(user.password):
         raise HTTPException(status_code=400, detail="Password must be at least 8 characters long, include a number and a special character.")
 
-    # Hash password before storing it
-    hashed_password = hash_password(user.password)
 
-    db_user = User(
+def build_user(user, hashed_password: str) -> User:
+    return User(
         username=user.username.lower(),
         email=user.email.lower(),
         password=hashed_password,
@@ -84,7 +120,28 @@ def create_user_in_db(db: Session, user):
         country=user.country,
         postal_code=user.postal_code
     )
-    return create_user(db, db_user)
+
+
+def create_user_in_db(db: Session, user):
+    validate_new_user(db, user)
+
+    # Hash password before storing it
+    hashed_password = hash_password(user.password)
+
+    return create_user(db, build_user(user, hashed_password))
+
+
+def update_user_password(db: Session, user: User, hashed_password: str):
+    user.password = hashed_password
+    db.add(user)
+    db.commit()
+
+
+async def create_user_in_db_async(db: Session, user):
+    """create_user_in_db for async routes on an AsyncSession, with bcrypt on the process pool."""
+    await db.run_sync(validate_new_user, user)
+    hashed_password = await hash_password_async(user.password)
+    return await db.run_sync(create_user, build_user(user, hashed_password))
 
 
 def get_user_role(db: Session, user_id: int):
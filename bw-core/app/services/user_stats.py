@@ -0,0 +1,160 @@
+# services/user_stats.py
+import argparse
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import delete, func, insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, select
+
+from ..entities.auction import Auction
+from ..entities.bid import Bid
+from ..entities.user_stats import UserStats
+
+STAT_FIELDS = ("bids_placed", "auctions_created", "auctions_won", "last_activity")
+
+
+def _bump(db: Session, user_id: int, field: str, amount: int = 1, last_activity: Optional[datetime] = None):
+    """Increment one counter with a single upsert, creating the row on first use"""
+    is_postgres = db.get_bind().dialect.name == "postgresql"
+    insert_fn = pg_insert if is_postgres else sqlite_insert
+    values = {"user_id": user_id, field: amount}
+    updates = {field: getattr(UserStats, field) + amount}
+    if last_activity is not None:
+        # Never move last_activity backwards (GREATEST in Postgres, scalar MAX in SQLite)
+        latest = func.greatest if is_postgres else func.max
+        values["last_activity"] = last_activity
+        updates["last_activity"] = latest(func.coalesce(UserStats.last_activity, last_activity), last_activity)
+    db.execute(
+        insert_fn(UserStats)
+        .values(**values)
+        .on_conflict_do_update(index_elements=[UserStats.user_id], set_=updates)
+    )
+
+
+def record_bid_placed(db: Session, bid: Bid):
+    _bump(db, bid.user_id, "bids_placed", last_activity=bid.created_at)
+
+
+def record_bids_placed(db: Session, bids: Iterable[Bid]):
+    """record_bid_placed for a whole batch, with one upsert per bidder"""
+    per_user: Dict[int, List[Bid]] = defaultdict(list)
+    for bid in bids:
+        per_user[bid.user_id].append(bid)
+    for user_id, placed in per_user.items():
+        _bump(db, user_id, "bids_placed", len(placed), last_activity=max(bid.created_at for bid in placed))
+
+
+def record_auction_created(db: Session, auction: Auction):
+    _bump(db, auction.user_id, "auctions_created", last_activity=auction.created_at)
+
+
+def record_auctions_won(db: Session, winning_bid_ids: Iterable[int]):
+    """Credit the bidders behind freshly settled winning bids"""
+    winning_bid_ids = [bid_id for bid_id in winning_bid_ids if bid_id]
+    if not winning_bid_ids:
+        return
+    wins = db.exec(
+        select(Bid.user_id, func.count())
+        .where(Bid.id.in_(winning_bid_ids))
+        .group_by(Bid.user_id)
+    ).all()
+    for user_id, count in wins:
+        _bump(db, user_id, "auctions_won", count)
+
+
+def get_user_stats(db: Session, user_id: int) -> Optional[UserStats]:
+    return db.get(UserStats, user_id)
+
+
+def compute_user_stats(db: Session, user_ids: Optional[List[int]] = None) -> Dict[int, dict]:
+    """The live aggregate from bids and auctions, optionally for some users only"""
+    stats: Dict[int, dict] = defaultdict(
+        lambda: {"bids_placed": 0, "auctions_created": 0, "auctions_won": 0, "last_activity": None}
+    )
+
+    def scoped(query, column):
+        return query.where(column.in_(user_ids)) if user_ids is not None else query
+
+    for user_id, count, last in db.exec(scoped(
+        select(Bid.user_id, func.count(), func.max(Bid.created_at)), Bid.user_id
+    ).group_by(Bid.user_id)):
+        stats[user_id]["bids_placed"] = count
+        stats[user_id]["last_activity"] = last
+
+    for user_id, count, last in db.exec(scoped(
+        select(Auction.user_id, func.count(), func.max(Auction.created_at)), Auction.user_id
+    ).group_by(Auction.user_id)):
+        stats[user_id]["auctions_created"] = count
+        previous = stats[user_id]["last_activity"]
+        stats[user_id]["last_activity"] = max(filter(None, [previous, last]), default=None)
+
+    for user_id, count in db.exec(scoped(
+        select(Bid.user_id, func.count()).join(Auction, Auction.winning_bid_id == Bid.id), Bid.user_id
+    ).group_by(Bid.user_id)):
+        stats[user_id]["auctions_won"] = count
+
+    return dict(stats)
+
+
+def refresh_user_stats(db: Session, user_ids: Optional[List[int]] = None) -> int:
+    """
+    Replace the stored stats (all, or just user_ids) with the live aggregate,
+    inside the caller's transaction. Used where a counter can't simply be
+    bumped, e.g. a deleted bid that may have been the user's latest activity.
+    """
+    stats = compute_user_stats(db, user_ids)
+    if user_ids is None:
+        db.execute(delete(UserStats))
+    else:
+        db.execute(delete(UserStats).where(UserStats.user_id.in_(user_ids)))
+    if stats:
+        db.execute(insert(UserStats), [{"user_id": user_id, **values} for user_id, values in stats.items()])
+    return len(stats)
+
+
+def rebuild_user_stats(db: Session, user_ids: Optional[List[int]] = None) -> int:
+    """Backfill: replace the stored stats (all, or just user_ids) with the live aggregate"""
+    count = refresh_user_stats(db, user_ids)
+    db.commit()
+    return count
+
+
+def check_user_stats(db: Session) -> List[dict]:
+    """Compare stored stats with the live aggregate and list every disagreement"""
+    expected = compute_user_stats(db)
+    stored = {row.user_id: row for row in db.exec(select(UserStats)).all()}
+    empty = {"bids_placed": 0, "auctions_created": 0, "auctions_won": 0, "last_activity": None}
+
+    mismatches = []
+    for user_id in sorted(set(expected) | set(stored)):
+        want = expected.get(user_id, empty)
+        row = stored.get(user_id)
+        have = {field: getattr(row, field) for field in STAT_FIELDS} if row else empty
+        if want != have:
+            mismatches.append({"user_id": user_id, "expected": want, "stored": have})
+    return mismatches
+
+
+def main():
+    from .db import engine
+
+    parser = argparse.ArgumentParser(description="Maintain the user_stats table")
+    parser.add_argument("command", choices=["rebuild", "check"])
+    args = parser.parse_args()
+
+    with Session(engine) as db:
+        if args.command == "rebuild":
+            print(f"Rebuilt stats for {rebuild_user_stats(db)} users")
+        else:
+            mismatches = check_user_stats(db)
+            for mismatch in mismatches:
+                print(mismatch)
+            print(f"{len(mismatches)} users out of sync")
+            raise SystemExit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
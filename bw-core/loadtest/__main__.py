@@ -0,0 +1,122 @@
+# loadtest/__main__.py
+import argparse
+import asyncio
+import json
+import os
+
+import httpx
+
+from .micro import MICROBENCHMARKS
+from .runner import BASELINE_DIR, Recorder, build_result, compare, load_baseline, print_result, save_baseline
+from .scenarios import SCENARIOS, Context
+
+# Per-scenario defaults for --auctions
+DEFAULT_AUCTIONS = {"browse": 50, "expiry": 1000, "search": 0, "settlement": 50000}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        prog="python -m loadtest",
+        description="Load-test the BidWise API and compare runs against saved JSON baselines"
+    )
+    parser.add_argument("scenario", choices=sorted([*SCENARIOS, *MICROBENCHMARKS]))
+    parser.add_argument("--base-url", default=os.getenv("LOADTEST_BASE_URL", "http://localhost:8000"))
+    parser.add_argument("--duration", type=float, default=30, help="seconds of load")
+    parser.add_argument("--concurrency", type=int, default=50, help="virtual users (or max in flight with --rate)")
+    parser.add_argument("--rate", type=float, help="storm: fixed arrival rate in bids/s instead of closed loop")
+    parser.add_argument("--buyers", type=int, default=20)
+    parser.add_argument("--auctions", type=int, help="auctions to create (browse 50, expiry 1000, search 0, settlement 50000)")
+    parser.add_argument("--bids-per-auction", type=int, default=20)
+    parser.add_argument("--accept-encoding", default="br, gzip", help='e.g. "gzip" or "identity" to compare')
+    parser.add_argument("--seed", type=int, default=4413)
+    parser.add_argument("--expiry-delay", type=float, default=60, help="expiry: seconds from setup to the shared end")
+    parser.add_argument("--expiry-timeout", type=float, default=120)
+    parser.add_argument("--watchers", type=int, default=1000)
+    parser.add_argument("--events", type=int, default=20, help="watchers: bids placed while watched")
+    parser.add_argument("--event-interval", type=float, default=0.5)
+    parser.add_argument("--format", choices=["ndjson", "csv"], default="ndjson")
+    parser.add_argument("--auction-id", type=int, help="export: only this auction's bids")
+    parser.add_argument("--admin-token", default=os.getenv("LOADTEST_ADMIN_TOKEN"),
+                        help="X-Admin-Token for the bid export (export, storm and proxy-war checks)")
+    parser.add_argument("--server-pid", type=int, help="export: sample this local server process's RSS")
+    parser.add_argument("--rss-ceiling-mb", type=float)
+    parser.add_argument("--rounds", type=int, default=100, help="proxy-war: price levels fought over")
+    parser.add_argument("--rows", type=int, default=10000, help="serialization/compression: bids per payload")
+    parser.add_argument("--logins", type=int, default=200, help="password-hashing: password checks per run")
+    parser.add_argument("--keys", type=int, default=1_000_000, help="throttle-memory: distinct emails that fail once")
+    parser.add_argument("--repeat", type=int, default=20, help="microbenchmarks: timed runs per variant")
+    parser.add_argument("--scratch-database-url", help="settlement/auction-detail/search-index: database to drop and load (default a temporary SQLite file)")
+    parser.add_argument("--bid-counts", type=int, nargs="+", default=[10000, 100000], help="auction-detail: bids on the auction")
+    parser.add_argument("--items", type=int, default=1_000_000, help="search-index: items (and auctions) to search")
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 100, 1000, 10000])
+    parser.add_argument("--limit", type=int, default=100, help="paging: rows per page")
+    parser.add_argument("--baseline-dir", default=BASELINE_DIR)
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the scenario's baseline")
+    parser.add_argument("--compare", action="store_true", help="fail on regressions against the saved baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative p95/p99/throughput change")
+    parser.add_argument("--output", help="also write the result JSON here")
+    args = parser.parse_args()
+    if args.auctions is None:
+        args.auctions = DEFAULT_AUCTIONS.get(args.scenario, 0)
+    return args
+
+
+async def run_scenario(args) -> dict:
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    headers = {"Accept-Encoding": args.accept_encoding}
+    if args.admin_token:
+        headers["X-Admin-Token"] = args.admin_token
+    async with httpx.AsyncClient(
+        base_url=args.base_url.rstrip("/") + "/api/v1",
+        headers=headers,
+        limits=limits,
+        timeout=30
+    ) as client:
+        ctx = Context(client=client, recorder=recorder, args=args, base_url=args.base_url.rstrip("/"))
+        metrics, checks = await SCENARIOS[args.scenario](ctx)
+    return build_result(args.scenario, config(args), recorder, metrics, checks)
+
+
+def run_micro(args) -> dict:
+    recorder = Recorder()
+    metrics, checks = MICROBENCHMARKS[args.scenario](args, recorder)
+    return build_result(args.scenario, config(args), recorder, metrics, checks)
+
+
+def config(args) -> dict:
+    ignored = {"baseline_dir", "save_baseline", "compare", "tolerance", "output", "admin_token"}
+    return {key: value for key, value in vars(args).items() if key not in ignored}
+
+
+def main():
+    args = parse_args()
+    if args.scenario in MICROBENCHMARKS:
+        result = run_micro(args)
+    else:
+        result = asyncio.run(run_scenario(args))
+    print_result(result)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2, sort_keys=True)
+    exit_code = 0 if all(value is True for value in result["checks"].values()) else 1
+    if args.compare:
+        baseline = load_baseline(args.scenario, args.baseline_dir)
+        if baseline is None:
+            print(f"No baseline for {args.scenario} in {args.baseline_dir}")
+        else:
+            regressions = compare(result, baseline, args.tolerance)
+            print(f"\nAgainst baseline from {baseline['recorded_at']}:")
+            for regression in regressions:
+                print(f"  REGRESSION {regression}")
+            if not regressions:
+                print("  no regressions")
+            exit_code = exit_code or (1 if regressions else 0)
+    if args.save_baseline:
+        print(f"Saved baseline to {save_baseline(result, args.baseline_dir)}")
+    raise SystemExit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# loadtest/fixtures.py
+import asyncio
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+import httpx
+
+# Meets the sign-up password rules
+PASSWORD = "Loadtest1!"
+# Words for item names and descriptions, and the search scenario's queries
+ITEM_WORDS = [
+    "vintage", "camera", "leica", "console", "watch", "swiss", "print", "signed", "cards", "rare",
+    "guitar", "vinyl", "lamp", "chair", "oak", "silver", "ring", "bicycle", "lens", "poster",
+]
+# Keep fixture setup from flooding the server with bcrypt hashes
+SETUP_CONCURRENCY = 16
+
+
+@dataclass
+class Fixture:
+    """Users and auctions created for one run, named with a run-unique prefix"""
+    prefix: str
+    seller_id: int = 0
+    buyer_ids: List[int] = field(default_factory=list)
+    buyer_emails: List[str] = field(default_factory=list)
+    auction_ids: List[int] = field(default_factory=list)
+    end_date: Optional[datetime] = None
+
+
+def run_prefix() -> str:
+    return f"lt{int(time.time())}{random.randint(100, 999)}"
+
+
+def item_text(rng: random.Random):
+    name = " ".join(rng.sample(ITEM_WORDS, 2)).title()
+    description = " ".join(rng.choices(ITEM_WORDS, k=8))
+    return name, description
+
+
+async def _gather_limited(coroutines, limit: int = SETUP_CONCURRENCY):
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(coroutine):
+        async with semaphore:
+            return await coroutine
+
+    return await asyncio.gather(*(run(coroutine) for coroutine in coroutines))
+
+
+async def create_user(client: httpx.AsyncClient, username: str, role: str) -> dict:
+    response = await client.post("/user/", json={
+        "username": username,
+        "email": f"{username}@loadtest.local",
+        "password": PASSWORD,
+        "role": role,
+        "street": "1 Load St",
+        "city": "Benchmark",
+        "country": "Testland",
+        "postal_code": "00000",
+    })
+    response.raise_for_status()
+    return response.json()
+
+
+async def create_auction(
+    client: httpx.AsyncClient,
+    seller_id: int,
+    end_date: datetime,
+    rng: random.Random,
+    initial_price: float = 100.0,
+    min_bid_increment: float = 1.0
+) -> int:
+    name, description = item_text(rng)
+    item = await client.post("/items/", json={"name": name, "description": description, "initial_price": initial_price})
+    item.raise_for_status()
+    auction = await client.post("/auctions/", json={
+        "start_date": (datetime.utcnow() - timedelta(minutes=1)).isoformat(),
+        "end_date": end_date.isoformat(),
+        "min_bid_increment": min_bid_increment,
+        "item_id": item.json()["id"],
+        "user_id": seller_id,
+    })
+    auction.raise_for_status()
+    return auction.json()["id"]
+
+
+async def build_fixture(
+    client: httpx.AsyncClient,
+    buyers: int,
+    auctions: int = 0,
+    ends_in: timedelta = timedelta(hours=1),
+    seed: int = 4413,
+    **auction_options
+) -> Fixture:
+    """One seller, `buyers` buyers and `auctions` auctions that all end at the same instant"""
+    fixture = Fixture(prefix=run_prefix())
+    fixture.end_date = datetime.utcnow() + ends_in
+    rng = random.Random(seed)
+    seller = await create_user(client, f"{fixture.prefix}_seller", "seller")
+    fixture.seller_id = seller["id"]
+    created = await _gather_limited(create_user(client, f"{fixture.prefix}_b{i}", "buyer") for i in range(buyers))
+    fixture.buyer_ids = [user["id"] for user in created]
+    fixture.buyer_emails = [user["email"] for user in created]
+    fixture.auction_ids = list(await _gather_limited(
+        create_auction(client, fixture.seller_id, fixture.end_date, rng, **auction_options) for _ in range(auctions)
+    ))
+    return fixture
@@ -0,0 +1,494 @@
+# loadtest/micro.py
+"""
+In-process microbenchmarks that need no running server. Each variant is
+timed `--repeat` times and recorded as a pseudo-route, so the results,
+baselines and comparisons work exactly like the HTTP scenarios.
+"""
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import List, Tuple
+
+from .runner import Recorder
+
+
+def _time(recorder: Recorder, route: str, repeat: int, fn, cpu: bool = False):
+    """Run fn repeat times, recording wall (or CPU) milliseconds; returns the last result"""
+    clock = time.process_time if cpu else time.perf_counter
+    result = None
+    for _ in range(repeat):
+        start = clock()
+        result = fn()
+        recorder.observe(route, (clock() - start) * 1000)
+    return result
+
+
+def _configure_models():
+    """Import every mapped entity so relationships resolve, as importing the app's routers would"""
+    from app.entities import order, paymentmethod, user, validpaymentinfo  # noqa: F401
+
+
+def _sample_bids(count: int) -> List:
+    from app.entities.bid import Bid
+
+    _configure_models()
+    start = datetime(2025, 1, 1)
+    return [
+        Bid(id=i, amount=100.0 + i, user_id=i % 500, auction_id=1, created_at=start + timedelta(seconds=i))
+        for i in range(1, count + 1)
+    ]
+
+
+def serialization(args, recorder: Recorder) -> Tuple[dict, dict]:
+    """A --rows-bid payload through orjson + compiled serializers versus the stdlib and pydantic paths"""
+    from fastapi.encoders import jsonable_encoder
+    from pydantic import TypeAdapter
+
+    from app.entities.bid import BidRead
+    from app.services.fast_json import encode_json, serialize_bid
+
+    bids = _sample_bids(args.rows)
+    adapter = TypeAdapter(List[BidRead])
+    variants = {
+        "orjson + compiled serializer": lambda: encode_json([serialize_bid(bid) for bid in bids]),
+        "stdlib json + jsonable_encoder": lambda: json.dumps(
+            jsonable_encoder([BidRead.model_validate(bid) for bid in bids])
+        ).encode(),
+        "pydantic TypeAdapter.dump_json": lambda: adapter.dump_json(
+            adapter.validate_python(bids, from_attributes=True)
+        ),
+    }
+    sizes = {}
+    for name, fn in variants.items():
+        sizes[name] = len(_time(recorder, f"serialize {args.rows} bids: {name}", args.repeat, fn))
+    recorder.stop()
+    decoded = {name: json.loads(fn()) for name, fn in variants.items()}
+    first = next(iter(decoded.values()))
+    return {"payload_bytes": sizes}, {"all_variants_agree": all(value == first for value in decoded.values())}
+
+
+def compression(args, recorder: Recorder) -> Tuple[dict, dict]:
+    """Bytes on the wire and CPU per payload for gzip and Brotli at the middleware's settings"""
+    from app.services.compression import Compressor, brotli
+    from app.services.fast_json import encode_json, serialize_bid
+
+    payloads = {
+        f"{args.rows} bids": encode_json([serialize_bid(bid) for bid in _sample_bids(args.rows)]),
+        "50 bids": encode_json([serialize_bid(bid) for bid in _sample_bids(50)]),
+    }
+    encodings = ["gzip"] + (["br"] if brotli is not None else [])
+    metrics = {}
+    for label, payload in payloads.items():
+        metrics[label] = {"identity_bytes": len(payload)}
+        for encoding in encodings:
+            compressed = _time(
+                recorder, f"compress {label}: {encoding} (cpu)", args.repeat,
+                lambda: Compressor(encoding).compress_all(payload), cpu=True
+            )
+            metrics[label][f"{encoding}_bytes"] = len(compressed)
+            metrics[label][f"{encoding}_ratio"] = round(len(compressed) / len(payload), 4)
+    recorder.stop()
+    return metrics, {"brotli_available": brotli is not None}
+
+
+def paging(args, recorder: Recorder) -> Tuple[dict, dict]:
+    """
+    Fetch page N of the bid listing (newest first, --limit rows) with
+    OFFSET and with the keyset seek the API uses, straight against
+    DATABASE_URL. Pages beyond the bids present are skipped, so bulk-load
+    with `python -m app.services.synthetic_data` to reach the deep ones.
+    """
+    from sqlmodel import Session, func, select
+
+    from app.entities.bid import Bid
+    from app.services.db import engine
+    from app.services.pagination import encode_cursor, keyset_page
+
+    _configure_models()
+    keys = (Bid.created_at, Bid.id)
+    metrics = {}
+    with Session(engine) as db:
+        total = db.exec(select(func.count()).select_from(Bid)).one()
+        ordered = select(Bid).order_by(Bid.created_at.desc(), Bid.id.desc())
+        for page in args.pages:
+            offset = (page - 1) * args.limit
+            if offset >= total:
+                metrics[f"page {page}"] = "skipped: not enough bids"
+                continue
+            offset_rows = _time(
+                recorder, f"bids page {page}: OFFSET", args.repeat,
+                lambda: db.exec(ordered.offset(offset).limit(args.limit)).all()
+            )
+            cursor = None
+            if offset:
+                boundary = db.exec(ordered.offset(offset - 1).limit(1)).one()
+                cursor = encode_cursor(boundary.created_at, boundary.id)
+            keyset_rows, _ = _time(
+                recorder, f"bids page {page}: keyset", args.repeat,
+                lambda: keyset_page(db, select(Bid), keys, cursor, args.limit, descending=True)
+            )
+            metrics[f"page {page}"] = "same rows" if [bid.id for bid in offset_rows] == [bid.id for bid in keyset_rows] else "rows differ"
+            db.expunge_all()
+    recorder.stop()
+    metrics["bids"] = total
+    return metrics, {"keyset_matches_offset": "rows differ" not in metrics.values()}
+
+
+def settlement(args, recorder: Recorder) -> Tuple[dict, dict]:
+    """
+    Settle --auctions auctions (about --bids-per-auction bids each) that
+    all expired at the same instant, with the closer's one-statement
+    sweep. Runs against --scratch-database-url, whose tables are dropped
+    and recreated, or a temporary SQLite file. Every timed run reopens
+    all the auctions first and must pick each one's top bid as winner.
+    """
+    from sqlalchemy import create_engine, update
+    from sqlmodel import Session, SQLModel, func, select
+
+    from app.entities.auction import Auction
+    from app.entities.bid import Bid
+    from app.services.auction_service import process_ended_auctions
+    from app.services.synthetic_data import SyntheticConfig, generate
+
+    _configure_models()
+    scratch = None
+    url = args.scratch_database_url
+    if url is None:
+        scratch = tempfile.mkdtemp(prefix="bw-settlement-")
+        url = f"sqlite:///{os.path.join(scratch, 'settlement.db')}"
+    engine = create_engine(url)
+    SQLModel.metadata.drop_all(engine)
+    SQLModel.metadata.create_all(engine)
+    loaded = generate(engine, SyntheticConfig(
+        users=max(args.auctions // 10, 100),
+        auctions=args.auctions,
+        bids=args.auctions * args.bids_per_auction,
+        workers=os.cpu_count() or 1,
+    ))
+
+    # The winner the sweep must choose: highest amount, earliest id on ties
+    ranked = select(
+        Bid.auction_id,
+        Bid.id,
+        func.row_number().over(partition_by=Bid.auction_id, order_by=(Bid.amount.desc(), Bid.id)).label("rank"),
+    ).subquery()
+    with Session(engine) as db:
+        expected = dict(db.exec(select(ranked.c.auction_id, ranked.c.id).where(ranked.c.rank == 1)).all())
+
+    winners_match, settled = True, 0
+    for _ in range(args.repeat):
+        with Session(engine) as db:
+            db.exec(update(Auction).values(
+                is_active=True, winning_bid_id=None, end_date=datetime.utcnow() - timedelta(seconds=1)
+            ))
+            db.commit()
+        with Session(engine) as db:
+            settled = _time(recorder, f"settle {args.auctions} expired auctions", 1, lambda: process_ended_auctions(db))
+            still_open = db.exec(select(func.count()).select_from(Auction).where(Auction.is_active == True)).one()
+            winners = dict(db.exec(select(Auction.id, Auction.winning_bid_id)).all())
+        winners_match = winners_match and all(winners[auction_id] == expected.get(auction_id) for auction_id in winners)
+    recorder.stop()
+    engine.dispose()
+    if scratch is not None:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    metrics = {"auctions": loaded["auctions"], "bids": loaded["bids"], "dialect": engine.dialect.name}
+    checks = {
+        "every_auction_settled": settled == loaded["auctions"] and still_open == 0,
+        "winners_are_top_bids": winners_match,
+    }
+    return metrics, checks
+
+
+def password_hashing(args, recorder: Recorder) -> Tuple[dict, dict]:
+    """
+    Login password checks per second and per core: --logins bcrypt verifies
+    at BCRYPT_ROUNDS one after another on the calling thread, as login did
+    before the process pool, versus all of them fanned out over the pool
+    the login route now uses (BCRYPT_POOL_SIZE processes).
+    """
+    import asyncio
+
+    from app.services.security import (
+        BCRYPT_POOL_SIZE,
+        BCRYPT_ROUNDS,
+        get_password_pool,
+        hash_password,
+        shutdown_password_pool,
+        verify_password,
+        verify_password_async,
+    )
+
+    hashed = hash_password("Synthetic1!")
+    attempts = ["Synthetic1!" if index % 10 else "wrong-password" for index in range(args.logins)]
+    expected = [attempt == "Synthetic1!" for attempt in attempts]
+
+    async def pooled():
+        return list(await asyncio.gather(*(verify_password_async(attempt, hashed) for attempt in attempts)))
+
+    # Start the workers outside the timed runs, as the app does at startup
+    list(get_password_pool().map(verify_password, attempts[:BCRYPT_POOL_SIZE], [hashed] * BCRYPT_POOL_SIZE))
+    variants = {
+        "inline": lambda: [verify_password(attempt, hashed) for attempt in attempts],
+        "process pool": lambda: asyncio.run(pooled()),
+    }
+    metrics = {"bcrypt_rounds": BCRYPT_ROUNDS, "pool_size": BCRYPT_POOL_SIZE, "cores": os.cpu_count()}
+    results = {}
+    try:
+        for name, fn in variants.items():
+            route = f"verify {args.logins} passwords: {name}"
+            results[name] = _time(recorder, route, args.repeat, fn)
+            mean_s = sum(recorder.routes[route].latencies_ms) / len(recorder.routes[route].latencies_ms) / 1000
+            cores = 1 if name == "inline" else min(BCRYPT_POOL_SIZE, os.cpu_count() or 1)
+            key = name.replace(" ", "_")
+            metrics[f"{key}_logins_per_s"] = round(args.logins / mean_s, 2)
+            metrics[f"{key}_logins_per_s_per_core"] = round(args.logins / mean_s / cores, 2)
+    finally:
+        shutdown_password_pool()
+    recorder.stop()
+    return metrics, {"all_variants_agree": all(result == expected for result in results.values())}
+
+
+def throttle_memory(args, recorder: Recorder) -> Tuple[dict, dict]:
+    """
+    One failed login each for --keys distinct emails against the in-memory
+    login throttle at LOGIN_THROTTLE_MAX_KEYS, as an attacker rotating
+    addresses would send. Memory must stay bounded by the cap, and an
+    account blocked before the flood must still be blocked after it.
+    """
+    import tracemalloc
+
+    from app.services.rate_limit import LOGIN_MAX_FAILURES, LOGIN_THROTTLE_WINDOW_SECONDS, MemoryRateLimitStore
+
+    tracemalloc.start()
+    store = MemoryRateLimitStore(LOGIN_MAX_FAILURES, LOGIN_THROTTLE_WINDOW_SECONDS)
+    for _ in range(LOGIN_MAX_FAILURES):
+        store.record_failure("victim@example.com")
+    batch = 10_000
+    for start in range(0, args.keys, batch):
+        emails = [f"rotated-{index}@example.com" for index in range(start, min(start + batch, args.keys))]
+        _time(recorder, f"record {batch} failures", 1, lambda: [store.record_failure(email) for email in emails])
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    recorder.stop()
+
+    metrics = {
+        "keys_sent": args.keys,
+        "max_keys": store.max_keys,
+        "tracked_keys": len(store),
+        "peak_traced_mb": round(peak / 1024 / 1024, 1),
+    }
+    checks = {
+        "tracked_keys_within_cap": len(store) <= store.max_keys,
+        "victim_still_blocked": store.is_blocked("victim@example.com"),
+    }
+    return metrics, checks
+
+
+def auction_detail(args, recorder: Recorder) -> Tuple[dict, dict]:
+    """
+    The auction detail read for one auction with each of --bid-counts bids:
+    get_auction_with_latest_bid's top-N query against loading and
+    serializing the full bid history, as the endpoint used to. Runs against
+    --scratch-database-url, whose tables are dropped and recreated, or a
+    temporary SQLite file.
+    """
+    from sqlalchemy import create_engine
+    from sqlmodel import Session, SQLModel, select
+
+    from app.entities.bid import Bid
+    from app.services.auction_service import TOP_BIDS_LIMIT, get_auction_with_latest_bid
+    from app.services.fast_json import encode_json, serialize_bid
+    from app.services.synthetic_data import SyntheticConfig, generate
+
+    _configure_models()
+    scratch = None
+    url = args.scratch_database_url
+    if url is None:
+        scratch = tempfile.mkdtemp(prefix="bw-auction-detail-")
+        url = f"sqlite:///{os.path.join(scratch, 'auction-detail.db')}"
+    engine = create_engine(url)
+    SQLModel.metadata.drop_all(engine)
+    SQLModel.metadata.create_all(engine)
+
+    def full_history(db: Session, auction_id: int) -> dict:
+        detail = get_auction_with_latest_bid(db, auction_id)
+        bids = db.exec(select(Bid).where(Bid.auction_id == auction_id).order_by(Bid.amount.desc(), Bid.id)).all()
+        detail["bids"] = [serialize_bid(bid) for bid in bids]
+        return detail
+
+    metrics, same_top = {"dialect": engine.dialect.name}, True
+    for count in args.bid_counts:
+        generate(engine, SyntheticConfig(users=200, auctions=1, bids=count, seed=args.seed))
+        with Session(engine) as db:
+            # Each load adds one auction, which takes all of its bids
+            auction_id = db.exec(select(Bid.auction_id).order_by(Bid.auction_id.desc())).first()
+
+            def read(build):
+                payload = encode_json(build(db, auction_id))
+                db.expunge_all()
+                return payload
+
+            top = _time(recorder, f"detail with {count} bids: top {TOP_BIDS_LIMIT}", args.repeat,
+                        lambda: read(get_auction_with_latest_bid))
+            full = _time(recorder, f"detail with {count} bids: full history", args.repeat,
+                         lambda: read(full_history))
+        metrics[f"{count} bids"] = {"top_n_bytes": len(top), "full_history_bytes": len(full)}
+        same_top = same_top and json.loads(top)["bids"] == json.loads(full)["bids"][:TOP_BIDS_LIMIT]
+    recorder.stop()
+    engine.dispose()
+    if scratch is not None:
+        shutil.rmtree(scratch, ignore_errors=True)
+    return metrics, {"top_n_matches_full_history": same_top}
+
+
+def db_layer(args, recorder: Recorder) -> Tuple[dict, dict]:
+    """
+    Requests/sec for the auction detail read served two ways from the same
+    DATABASE_URL: a sync `def` route on a get_db session (Starlette's
+    threadpool) and an `async def` route on get_async_db, as the hot routes
+    now are. Each runs for --duration seconds with --concurrency clients
+    through the ASGI app in-process, so only the database layer differs.
+    """
+    import asyncio
+
+    import httpx
+    from fastapi import Depends, FastAPI
+    from sqlmodel import Session, select
+
+    from app.entities.auction import Auction
+    from app.services.auction_service import get_auction_with_latest_bid
+    from app.services.db import dispose_async_engine, engine, get_async_db, get_db
+    from app.services.fast_json import FastJSONResponse
+
+    _configure_models()
+    with Session(engine) as db:
+        auction_id = db.exec(select(Auction.id).order_by(Auction.id)).first()
+    if auction_id is None:
+        return {"auction": "skipped: no auctions in DATABASE_URL"}, {}
+
+    app = FastAPI()
+
+    @app.get("/sync/{auction_id}")
+    def read_sync(auction_id: int, db: Session = Depends(get_db)):
+        return FastJSONResponse(get_auction_with_latest_bid(db, auction_id))
+
+    @app.get("/async/{auction_id}")
+    async def read_async(auction_id: int, db=Depends(get_async_db)):
+        return FastJSONResponse(await db.run_sync(get_auction_with_latest_bid, auction_id))
+
+    async def drive(prefix: str, route: str) -> bytes:
+        deadline = time.perf_counter() + args.duration
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://micro") as client:
+            async def client_loop():
+                while time.perf_counter() < deadline:
+                    await recorder.request(client, "GET", f"/{prefix}/{auction_id}", route)
+
+            await asyncio.gather(*(client_loop() for _ in range(args.concurrency)))
+            return (await client.get(f"/{prefix}/{auction_id}")).content
+
+    async def run():
+        bodies = {}
+        for prefix, route in (("sync", "auction detail: sync def + get_db"), ("async", "auction detail: async def + get_async_db")):
+            bodies[prefix] = await drive(prefix, route)
+        await dispose_async_engine()
+        return bodies
+
+    bodies = asyncio.run(run())
+    recorder.stop()
+    metrics = {
+        "dialect": engine.dialect.name,
+        "requests_per_second": {
+            route: round(len(stats.latencies_ms) / args.duration, 1) for route, stats in recorder.routes.items()
+        },
+    }
+    checks = {
+        "no_server_errors": all(stats.errors == 0 for stats in recorder.routes.values()),
+        "same_response": bodies["sync"] == bodies["async"],
+    }
+    return metrics, checks
+
+
+def search_index(args, recorder: Recorder) -> Tuple[dict, dict]:
+    """
+    Auction search over --items items (1,000,000) with one- and two-word
+    queries, misspellings and the ending-soon filter, straight through
+    search_auctions. Runs against --scratch-database-url, whose tables are
+    dropped and recreated (Postgres exercises the tsvector and trigram
+    indexes), or a temporary SQLite file and the in-memory index.
+    """
+    import random
+
+    from sqlalchemy import create_engine
+    from sqlmodel import Session, SQLModel
+
+    from app.services.search import memory_index, search_auctions
+    from app.services.synthetic_data import ITEM_WORDS, SyntheticConfig, generate
+
+    _configure_models()
+    scratch = None
+    url = args.scratch_database_url
+    if url is None:
+        scratch = tempfile.mkdtemp(prefix="bw-search-")
+        url = f"sqlite:///{os.path.join(scratch, 'search.db')}"
+    engine = create_engine(url)
+    SQLModel.metadata.drop_all(engine)
+    SQLModel.metadata.create_all(engine)
+    loaded = generate(engine, SyntheticConfig(
+        users=max(args.items // 100, 100), auctions=args.items, bids=0, workers=os.cpu_count() or 1, seed=args.seed,
+    ))
+    rng = random.Random(args.seed)
+
+    def misspell(word: str) -> str:
+        position = rng.randrange(len(word))
+        return word[:position] + word[position + 1:]
+
+    queries = {
+        "one word": lambda: rng.choice(ITEM_WORDS),
+        "two words": lambda: " ".join(rng.sample(ITEM_WORDS, 2)),
+        "misspelt": lambda: misspell(rng.choice(ITEM_WORDS)),
+    }
+    found, ending_soon_ok = {}, True
+    with Session(engine) as db:
+        memory_index.invalidate()
+        if engine.dialect.name != "postgresql":
+            _time(recorder, f"build the in-memory index ({args.items} items)", 1, lambda: memory_index.ensure(db))
+        for name, make_query in queries.items():
+            results = _time(recorder, f"search {args.items} items: {name}", args.repeat,
+                            lambda: search_auctions(db, make_query()))
+            found[name] = len(results)
+            db.expunge_all()
+        window = timedelta(days=1)
+        soon = _time(recorder, f"search {args.items} items: ending within a day", args.repeat,
+                     lambda: search_auctions(db, rng.choice(ITEM_WORDS), ending_within=window))
+        now = datetime.utcnow()
+        ending_soon_ok = all(now - timedelta(minutes=1) < result["end_date"] <= now + window for result in soon)
+        found["ending within a day"] = len(soon)
+    memory_index.invalidate()
+    recorder.stop()
+    engine.dispose()
+    if scratch is not None:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    metrics = {"items": loaded["auctions"], "dialect": engine.dialect.name, "results_on_last_run": found}
+    checks = {
+        "word_queries_find_items": found["one word"] > 0 and found["two words"] > 0,
+        "ending_soon_only_open_auctions": ending_soon_ok,
+    }
+    return metrics, checks
+
+
+MICROBENCHMARKS = {
+    "serialization": serialization,
+    "compression": compression,
+    "paging": paging,
+    "settlement": settlement,
+    "password-hashing": password_hashing,
+    "throttle-memory": throttle_memory,
+    "auction-detail": auction_detail,
+    "db-layer": db_layer,
+    "search-index": search_index,
+}
@@ -0,0 +1,218 @@
+# loadtest/runner.py
+import asyncio
+import json
+import os
+import platform
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+BASELINE_DIR = os.path.join(os.path.dirname(__file__), "baselines")
+# Statuses that mean the server failed, as opposed to rejecting the request
+SERVER_ERROR = 500
+
+
+def percentile(ordered: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return None
+    rank = max(int(round(q / 100 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+class RouteStats:
+    def __init__(self):
+        self.latencies_ms: List[float] = []
+        self.statuses: Counter = Counter()
+        self.errors = 0
+        self.wire_bytes = 0
+
+    def summary(self, elapsed: float) -> dict:
+        ordered = sorted(self.latencies_ms)
+        return {
+            "requests": len(ordered),
+            "throughput_rps": round(len(ordered) / elapsed, 2) if elapsed else None,
+            "p50_ms": _round(percentile(ordered, 50)),
+            "p95_ms": _round(percentile(ordered, 95)),
+            "p99_ms": _round(percentile(ordered, 99)),
+            "max_ms": _round(ordered[-1] if ordered else None),
+            "mean_ms": _round(sum(ordered) / len(ordered) if ordered else None),
+            "errors": self.errors,
+            "statuses": {str(status): count for status, count in sorted(self.statuses.items())},
+            "wire_bytes_per_request": round(self.wire_bytes / len(ordered)) if ordered else None,
+        }
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 2) if value is not None else None
+
+
+class Recorder:
+    """
+    Latency, status and bytes-on-wire per route template (e.g.
+    "GET /auctions/{id}"), so ids in URLs never split a route's numbers.
+    """
+
+    def __init__(self):
+        self.routes: Dict[str, RouteStats] = defaultdict(RouteStats)
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+
+    async def request(self, client: httpx.AsyncClient, method: str, url: str, route: str, **kwargs) -> Optional[httpx.Response]:
+        stats = self.routes[route]
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            stats.latencies_ms.append((time.perf_counter() - start) * 1000)
+            stats.errors += 1
+            stats.statuses["exception"] += 1
+            return None
+        stats.latencies_ms.append((time.perf_counter() - start) * 1000)
+        stats.statuses[response.status_code] += 1
+        stats.wire_bytes += response.num_bytes_downloaded
+        if response.status_code >= SERVER_ERROR:
+            stats.errors += 1
+        return response
+
+    def start(self):
+        """Begin the measured phase; setup (fixtures, seed bids) before this is not counted"""
+        self.started = time.perf_counter()
+
+    def observe(self, route: str, latency_ms: float):
+        """Record a latency measured outside an HTTP call (e.g. WebSocket delivery)"""
+        self.routes[route].latencies_ms.append(latency_ms)
+
+    def stop(self):
+        self.finished = time.perf_counter()
+
+    def summary(self) -> Dict[str, dict]:
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        return {route: stats.summary(elapsed) for route, stats in sorted(self.routes.items())}
+
+
+async def run_closed_loop(duration: float, concurrency: int, step: Callable[[int], Awaitable[None]]):
+    """`concurrency` virtual users each running step back to back until the deadline"""
+    deadline = time.perf_counter() + duration
+
+    async def user(index: int):
+        while time.perf_counter() < deadline:
+            await step(index)
+
+    await asyncio.gather(*(user(index) for index in range(concurrency)))
+
+
+async def run_open_loop(duration: float, rate: float, step: Callable[[int], Awaitable[None]], max_in_flight: int = 1000):
+    """
+    Start step at a fixed arrival rate regardless of how fast responses come
+    back, which is what exposes queueing under overload. Arrivals beyond
+    max_in_flight are counted as dropped by the client, not sent.
+    """
+    semaphore = asyncio.Semaphore(max_in_flight)
+    interval = 1 / rate
+    start = time.perf_counter()
+    tasks = set()
+    dropped = 0
+    sent = 0
+
+    async def run(index: int):
+        try:
+            await step(index)
+        finally:
+            semaphore.release()
+
+    while True:
+        now = time.perf_counter()
+        if now - start >= duration:
+            break
+        due = int((now - start) / interval) + 1
+        while sent < due:
+            if semaphore.locked():
+                dropped += 1
+            else:
+                await semaphore.acquire()
+                task = asyncio.create_task(run(sent))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            sent += 1
+        await asyncio.sleep(min(interval, 0.001))
+    if tasks:
+        await asyncio.gather(*tasks)
+    return {"target_rate": rate, "arrivals": sent, "dropped_by_client": dropped}
+
+
+def build_result(scenario: str, config: dict, recorder: Recorder, metrics: dict, checks: dict) -> dict:
+    return {
+        "scenario": scenario,
+        "recorded_at": datetime.utcnow().isoformat(timespec="seconds"),
+        "host": platform.node(),
+        "config": config,
+        "duration_s": round((recorder.finished or time.perf_counter()) - recorder.started, 2),
+        "routes": recorder.summary(),
+        "metrics": metrics,
+        "checks": checks,
+    }
+
+
+def baseline_path(scenario: str, directory: str = BASELINE_DIR) -> str:
+    return os.path.join(directory, f"{scenario}.json")
+
+
+def save_baseline(result: dict, directory: str = BASELINE_DIR) -> str:
+    os.makedirs(directory, exist_ok=True)
+    path = baseline_path(result["scenario"], directory)
+    with open(path, "w") as f:
+        json.dump(result, f, indent=2, sort_keys=True)
+    return path
+
+
+def load_baseline(scenario: str, directory: str = BASELINE_DIR) -> Optional[dict]:
+    path = baseline_path(scenario, directory)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> List[str]:
+    """
+    Regressions of this run against a baseline: a route whose p95/p99 grew,
+    or whose throughput fell, by more than `tolerance` (0.2 = 20%), plus any
+    check that passed in the baseline and fails now.
+    """
+    regressions = []
+    for route, now in result["routes"].items():
+        before = baseline["routes"].get(route)
+        if not before:
+            continue
+        for field in ("p95_ms", "p99_ms"):
+            if before[field] and now[field] and now[field] > before[field] * (1 + tolerance):
+                regressions.append(f"{route} {field}: {before[field]} -> {now[field]}")
+        if before["throughput_rps"] and now["throughput_rps"] and now["throughput_rps"] < before["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{route} throughput_rps: {before['throughput_rps']} -> {now['throughput_rps']}")
+    for name, passed in result["checks"].items():
+        if baseline["checks"].get(name) is True and passed is not True:
+            regressions.append(f"check {name} now fails")
+    return regressions
+
+
+def print_result(result: dict):
+    print(f"\n== {result['scenario']} ({result['duration_s']}s) ==")
+    header = f"{'route':<52} {'reqs':>8} {'rps':>9} {'p50':>9} {'p95':>9} {'p99':>9} {'err':>5}"
+    print(header)
+    for route, stats in result["routes"].items():
+        print(
+            f"{route[:52]:<52} {stats['requests']:>8} {_fmt(stats['throughput_rps']):>9} "
+            f"{_fmt(stats['p50_ms']):>9} {_fmt(stats['p95_ms']):>9} {_fmt(stats['p99_ms']):>9} {stats['errors']:>5}"
+        )
+    for name, value in result["metrics"].items():
+        print(f"  {name}: {value}")
+    for name, passed in result["checks"].items():
+        print(f"  [{'ok' if passed else 'FAIL'}] {name}")
+
+
+def _fmt(value) -> str:
+    return "-" if value is None else f"{value:.2f}" if isinstance(value, float) else str(value)
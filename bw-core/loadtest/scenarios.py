@@ -0,0 +1,519 @@
+# loadtest/scenarios.py
+import asyncio
+import json
+import random
+import re
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from .fixtures import ITEM_WORDS, PASSWORD, build_fixture
+from .runner import Recorder, run_closed_loop, run_open_loop
+
+MIN_BID_PATTERN = re.compile(r"at least ([0-9.]+)")
+
+
+@dataclass
+class Context:
+    client: httpx.AsyncClient
+    recorder: Recorder
+    args: object
+    base_url: str
+
+
+def no_server_errors(recorder: Recorder) -> bool:
+    return all(stats.errors == 0 for stats in recorder.routes.values())
+
+
+def min_bid_from(response: Optional[httpx.Response]) -> Optional[float]:
+    """The floor the server quoted when rejecting a low bid"""
+    if response is None or response.status_code != 400:
+        return None
+    match = MIN_BID_PATTERN.search(response.json().get("detail", ""))
+    return float(match.group(1)) if match else None
+
+
+async def fetch_auction_bids(client: httpx.AsyncClient, auction_id: int) -> List[dict]:
+    """Every stored bid on the auction in id order, through the streaming export"""
+    bids = []
+    async with client.stream("GET", "/bids/export", params={"auction_id": auction_id, "format": "ndjson"}) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if line:
+                bids.append(json.loads(line))
+    return bids
+
+
+async def seed_bids(client: httpx.AsyncClient, auction_ids: List[int], buyer_ids: List[int], per_auction: int):
+    """A short ascending bid history on each auction, so bid pages have something to page through"""
+    async def seed(auction_id: int):
+        for i in range(per_auction):
+            await client.post("/bids/", json={
+                "auction_id": auction_id, "user_id": buyer_ids[i % len(buyer_ids)], "amount": 100.0 + i
+            })
+
+    await asyncio.gather(*(seed(auction_id) for auction_id in auction_ids))
+
+
+async def browse(ctx: Context) -> Tuple[dict, dict]:
+    """
+    Read-heavy mix: auction detail (half revalidated with If-None-Match),
+    status, bid-history and listing pages, search, and a trickle of bids
+    that keeps invalidating the response cache.
+    """
+    args, client, recorder = ctx.args, ctx.client, ctx.recorder
+    fixture = await build_fixture(client, buyers=args.buyers, auctions=args.auctions)
+    await seed_bids(client, fixture.auction_ids, fixture.buyer_ids, args.bids_per_auction)
+    cache_before = (await client.get("/auctions/cache/metrics")).json()
+    rng = random.Random(args.seed)
+    etags: Dict[str, str] = {}
+    prices: Dict[int, float] = {auction_id: 100.0 + args.bids_per_auction - 1 for auction_id in fixture.auction_ids}
+    recorder.start()
+
+    async def follow(url: str, route: str, pages: int, cursor_of):
+        params = {"limit": 50}
+        for _ in range(pages):
+            response = await recorder.request(client, "GET", url, route, params=params)
+            cursor = cursor_of(response) if response is not None and response.status_code == 200 else None
+            if not cursor:
+                return
+            params = {"limit": 50, "after": cursor}
+
+    async def step(_):
+        auction_id = rng.choice(fixture.auction_ids)
+        roll = rng.random()
+        if roll < 0.35:
+            url = f"/auctions/{auction_id}"
+            if url in etags and rng.random() < 0.5:
+                await recorder.request(
+                    client, "GET", url, "GET /auctions/{id} (If-None-Match)", headers={"If-None-Match": etags[url]}
+                )
+                return
+            response = await recorder.request(client, "GET", url, "GET /auctions/{id}")
+            if response is not None and "etag" in response.headers:
+                etags[url] = response.headers["etag"]
+        elif roll < 0.50:
+            await recorder.request(client, "GET", f"/auctions/{auction_id}/status", "GET /auctions/{id}/status")
+        elif roll < 0.70:
+            await follow(
+                f"/auctions/{auction_id}/bids", "GET /auctions/{id}/bids", 3,
+                lambda response: response.json().get("next_cursor")
+            )
+        elif roll < 0.88:
+            await follow(
+                "/auctions/", "GET /auctions/", 3, lambda response: response.headers.get("x-next-cursor")
+            )
+        elif roll < 0.95:
+            query = " ".join(rng.sample(ITEM_WORDS, rng.randint(1, 2)))
+            await recorder.request(client, "GET", "/auctions/search", "GET /auctions/search", params={"q": query})
+        else:
+            response = await recorder.request(client, "POST", "/bids/", "POST /bids/", json={
+                "auction_id": auction_id, "user_id": rng.choice(fixture.buyer_ids), "amount": prices[auction_id] + 1
+            })
+            if response is not None and response.status_code == 201:
+                prices[auction_id] = response.json()["amount"]
+            else:
+                prices[auction_id] = (min_bid_from(response) or prices[auction_id] + 1) - 1
+
+    await run_closed_loop(args.duration, args.concurrency, step)
+    recorder.stop()
+
+    cache_after = (await client.get("/auctions/cache/metrics")).json()
+    hits = cache_after["hits"] - cache_before["hits"]
+    misses = cache_after["misses"] - cache_before["misses"]
+    revalidations = recorder.routes["GET /auctions/{id} (If-None-Match)"]
+    metrics = {
+        "cache_backend": cache_after["backend"],
+        "cache_hit_ratio": round(hits / (hits + misses), 4) if hits + misses else None,
+        "not_modified_ratio": round(revalidations.statuses[304] / len(revalidations.latencies_ms), 4)
+        if revalidations.latencies_ms else None,
+        "accept_encoding": args.accept_encoding,
+    }
+    return metrics, {"no_server_errors": no_server_errors(recorder)}
+
+
+async def storm(ctx: Context) -> Tuple[dict, dict]:
+    """
+    Last-minute bidding storm on a single auction: every buyer bids one to
+    three increments over the price they last saw, either at a fixed
+    arrival rate (--rate) or flat out. Afterwards the stored history must
+    show exactly one accepted bid per price level, in ascending order, and
+    some bids must have lost a race for a level they were sent for.
+    """
+    args, client, recorder = ctx.args, ctx.client, ctx.recorder
+    fixture = await build_fixture(
+        client, buyers=args.buyers, auctions=1, ends_in=timedelta(seconds=args.duration + 30)
+    )
+    auction_id = fixture.auction_ids[0]
+    sequencer = (await client.get("/bids/sequencer/metrics")).json()
+    rng = random.Random(args.seed)
+    seen = {"price": 99.0}
+    accepted: List[dict] = []
+    recorder.start()
+
+    async def step(_):
+        amount = seen["price"] + rng.randint(1, 3)
+        response = await recorder.request(client, "POST", "/bids/", "POST /bids/", json={
+            "auction_id": auction_id, "user_id": rng.choice(fixture.buyer_ids), "amount": amount
+        })
+        if response is not None and response.status_code == 201:
+            accepted.append(response.json())
+            seen["price"] = max(seen["price"], amount)
+        else:
+            floor = min_bid_from(response)
+            if floor is not None:
+                seen["price"] = max(seen["price"], floor - 1)
+
+    if args.rate:
+        load = await run_open_loop(args.duration, args.rate, step, max_in_flight=args.concurrency)
+    else:
+        await run_closed_loop(args.duration, args.concurrency, step)
+        load = {"concurrency": args.concurrency}
+    recorder.stop()
+
+    stored = await fetch_auction_bids(client, auction_id)
+    amounts = [bid["amount"] for bid in stored]
+    auction = (await client.get(f"/auctions/{auction_id}")).json()
+    elapsed = recorder.finished - recorder.started
+    metrics = {
+        **load,
+        "sequencer_enabled": sequencer["enabled"],
+        "bids_sent": len(recorder.routes["POST /bids/"].latencies_ms),
+        "accepted_bids": len(accepted),
+        "accepted_bids_per_s": round(len(accepted) / elapsed, 2),
+        "rejected_bids": recorder.routes["POST /bids/"].statuses[400],
+        "final_price": auction.get("current_price"),
+    }
+    checks = {
+        "no_server_errors": no_server_errors(recorder),
+        "bids_competed": metrics["rejected_bids"] > 0,
+        "one_winner_per_price": len(set(amounts)) == len(amounts),
+        "prices_strictly_increase": all(a < b for a, b in zip(amounts, amounts[1:])),
+        "every_accepted_bid_stored": {bid["id"] for bid in accepted} <= {bid["id"] for bid in stored},
+        "top_of_book_matches_history": bool(amounts) and auction.get("current_price") == amounts[-1],
+    }
+    return metrics, checks
+
+
+async def login_burst(ctx: Context) -> Tuple[dict, dict]:
+    """
+    Burst of logins: mostly valid credentials, plus a few accounts hammered
+    with wrong passwords. Valid users must never be throttled; the attacked
+    accounts must start getting 429s.
+    """
+    args, client, recorder = ctx.args, ctx.client, ctx.recorder
+    fixture = await build_fixture(client, buyers=args.buyers)
+    victims = fixture.buyer_emails[:2]
+    users = fixture.buyer_emails[2:] or fixture.buyer_emails
+    rng = random.Random(args.seed)
+    recorder.start()
+
+    async def step(_):
+        if rng.random() < 0.85:
+            await recorder.request(client, "POST", "/user/login", "POST /user/login (valid)", json={
+                "email": rng.choice(users), "password": PASSWORD
+            })
+        else:
+            await recorder.request(client, "POST", "/user/login", "POST /user/login (wrong password)", json={
+                "email": rng.choice(victims), "password": "not-the-password"
+            })
+
+    await run_closed_loop(args.duration, args.concurrency, step)
+    recorder.stop()
+
+    valid = recorder.routes["POST /user/login (valid)"].statuses
+    wrong = recorder.routes["POST /user/login (wrong password)"].statuses
+    metrics = {"logins_per_s": round(sum(valid.values()) / (recorder.finished - recorder.started), 2)}
+    checks = {
+        "no_server_errors": no_server_errors(recorder),
+        "valid_logins_never_throttled": set(valid) <= {200},
+        "attacked_accounts_throttled": wrong[429] > 0,
+    }
+    return metrics, checks
+
+
+async def expiry(ctx: Context) -> Tuple[dict, dict]:
+    """
+    Mass expiry: --auctions auctions (each with a bid) all end at the same
+    instant while readers keep loading them. Measures how long the closer
+    takes to settle all of them and the read latency while it does.
+    """
+    args, client, recorder = ctx.args, ctx.client, ctx.recorder
+    fixture = await build_fixture(
+        client, buyers=2, auctions=args.auctions, ends_in=timedelta(seconds=args.expiry_delay)
+    )
+    await seed_bids(client, fixture.auction_ids, fixture.buyer_ids, 1)
+    created_in_time = datetime.utcnow() < fixture.end_date
+    before = (await client.get("/auctions/closer/metrics")).json()["close_lag"]
+    await asyncio.sleep(max((fixture.end_date - datetime.utcnow()).total_seconds(), 0))
+    deadline = time.perf_counter()
+    recorder.start()
+    rng = random.Random(args.seed)
+    done = asyncio.Event()
+    closed_after: Optional[float] = None
+
+    async def watch_closer():
+        nonlocal closed_after
+        while time.perf_counter() - deadline < args.expiry_timeout:
+            snapshot = (await client.get("/auctions/closer/metrics")).json()["close_lag"]
+            if snapshot["closed"] - before["closed"] >= len(fixture.auction_ids):
+                closed_after = time.perf_counter() - deadline
+                break
+            await asyncio.sleep(0.1)
+        done.set()
+
+    async def read(_):
+        # Detail reads only: a status read would settle an expired auction itself
+        while not done.is_set():
+            await recorder.request(client, "GET", f"/auctions/{rng.choice(fixture.auction_ids)}", "GET /auctions/{id}")
+
+    await asyncio.gather(watch_closer(), *(read(index) for index in range(args.concurrency)))
+    recorder.stop()
+
+    after = (await client.get("/auctions/closer/metrics")).json()["close_lag"]
+    closed = after["closed"] - before["closed"]
+    lag_sum = after["mean_ms"] * after["closed"] - before["mean_ms"] * before["closed"]
+    sample = rng.sample(fixture.auction_ids, min(100, len(fixture.auction_ids)))
+    statuses = await asyncio.gather(*(client.get(f"/auctions/{auction_id}/status") for auction_id in sample))
+    metrics = {
+        "auctions": len(fixture.auction_ids),
+        "closed_by_closer": closed,
+        "seconds_to_close_all": round(closed_after, 3) if closed_after is not None else None,
+        "close_lag_mean_ms": round(lag_sum / closed, 2) if closed else None,
+        "close_lag_max_ms": round(after["max_ms"], 2),
+    }
+    checks = {
+        "no_server_errors": no_server_errors(recorder),
+        "all_created_before_deadline": created_in_time,
+        "all_closed_within_timeout": closed_after is not None,
+        "sampled_auctions_settled": all(
+            not status.json()["is_active"] and "winner" in status.json() for status in statuses
+        ),
+    }
+    return metrics, checks
+
+
+async def watchers(ctx: Context) -> Tuple[dict, dict]:
+    """
+    --watchers WebSocket clients on one auction while bids land on it;
+    reports connect latency and bid-to-client fan-out latency.
+    """
+    import websockets
+
+    args, client, recorder = ctx.args, ctx.client, ctx.recorder
+    fixture = await build_fixture(client, buyers=2, auctions=1)
+    auction_id = fixture.auction_ids[0]
+    url = re.sub(r"^http", "ws", ctx.base_url) + f"/api/v1/ws/auctions/{auction_id}"
+    received: Dict[int, List[float]] = defaultdict(list)
+    connect_slots = asyncio.Semaphore(200)
+    connections = []
+
+    async def connect():
+        async with connect_slots:
+            start = time.perf_counter()
+            try:
+                socket = await websockets.connect(url, max_queue=None)
+            except (OSError, websockets.WebSocketException):
+                recorder.routes["WS connect"].errors += 1
+                return
+            recorder.observe("WS connect", (time.perf_counter() - start) * 1000)
+            connections.append(socket)
+
+    async def listen(socket):
+        try:
+            async for message in socket:
+                event = json.loads(message)
+                if event.get("type") == "bid":
+                    received[event["bid_id"]].append(time.perf_counter())
+        except websockets.WebSocketException:
+            pass
+
+    recorder.start()
+    await asyncio.gather(*(connect() for _ in range(args.watchers)))
+    listeners = [asyncio.create_task(listen(socket)) for socket in connections]
+    sent_at: Dict[int, float] = {}
+    for i in range(args.events):
+        start = time.perf_counter()
+        response = await recorder.request(client, "POST", "/bids/", "POST /bids/", json={
+            "auction_id": auction_id, "user_id": fixture.buyer_ids[i % 2], "amount": 100.0 + i
+        })
+        if response is not None and response.status_code == 201:
+            sent_at[response.json()["id"]] = start
+        await asyncio.sleep(args.event_interval)
+    await asyncio.sleep(2)
+    await asyncio.gather(*(socket.close() for socket in connections), return_exceptions=True)
+    for listener in listeners:
+        listener.cancel()
+    await asyncio.gather(*listeners, return_exceptions=True)
+    recorder.stop()
+
+    for bid_id, start in sent_at.items():
+        for arrived in received.get(bid_id, []):
+            recorder.observe("WS bid fan-out", (arrived - start) * 1000)
+    expected = len(sent_at) * len(connections)
+    delivered = sum(len(received.get(bid_id, [])) for bid_id in sent_at)
+    metrics = {"watchers_connected": len(connections), "bids": len(sent_at), "deliveries": delivered}
+    checks = {
+        "all_watchers_connected": len(connections) == args.watchers,
+        "every_watcher_got_every_bid": expected > 0 and delivered == expected,
+    }
+    return metrics, checks
+
+
+async def search(ctx: Context) -> Tuple[dict, dict]:
+    """
+    Auction and user search against whatever data is loaded (bulk-load with
+    `python -m app.services.synthetic_data` for realistic volumes): one- and
+    two-word queries plus misspellings that only the trigram path can match.
+    """
+    args, client, recorder = ctx.args, ctx.client, ctx.recorder
+    if args.auctions:
+        await build_fixture(client, buyers=1, auctions=args.auctions)
+    rng = random.Random(args.seed)
+
+    def misspell(word: str) -> str:
+        position = rng.randrange(len(word))
+        return word[:position] + word[position + 1:]
+
+    recorder.start()
+
+    async def step(_):
+        roll = rng.random()
+        if roll < 0.5:
+            query = " ".join(rng.sample(ITEM_WORDS, rng.randint(1, 2)))
+            await recorder.request(client, "GET", "/auctions/search", "GET /auctions/search", params={"q": query})
+        elif roll < 0.8:
+            query = misspell(rng.choice(ITEM_WORDS))
+            await recorder.request(
+                client, "GET", "/auctions/search", "GET /auctions/search (misspelt)", params={"q": query}
+            )
+        else:
+            await recorder.request(
+                client, "GET", "/user/search/", "GET /user/search/", params={"query": f"b{rng.randint(1, 999)}"}
+            )
+
+    await run_closed_loop(args.duration, args.concurrency, step)
+    recorder.stop()
+    return {}, {"no_server_errors": no_server_errors(recorder)}
+
+
+def read_rss_mb(pid: int) -> Optional[float]:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+    return None
+
+
+async def export(ctx: Context) -> Tuple[dict, dict]:
+    """
+    Stream the whole bid export (optionally one --auction-id) once. With
+    --server-pid on the same host, samples the server's RSS throughout to
+    show the export runs in constant memory.
+    """
+    args, client, recorder = ctx.args, ctx.client, ctx.recorder
+    params = {"format": args.format}
+    if args.auction_id:
+        params["auction_id"] = args.auction_id
+    recorder.start()
+    rss = [read_rss_mb(args.server_pid)] if args.server_pid else []
+    sampling = True
+
+    async def sample_rss():
+        while sampling:
+            rss.append(read_rss_mb(args.server_pid))
+            await asyncio.sleep(0.1)
+
+    sampler = asyncio.create_task(sample_rss()) if args.server_pid else None
+    lines = 0
+    start = time.perf_counter()
+    first_byte: Optional[float] = None
+    async with client.stream("GET", "/bids/export", params=params, timeout=None) as response:
+        async for chunk in response.aiter_bytes():
+            if first_byte is None:
+                first_byte = time.perf_counter()
+            lines += chunk.count(b"\n")
+        wire_bytes = response.num_bytes_downloaded
+    total = time.perf_counter() - start
+    sampling = False
+    if sampler:
+        await sampler
+    recorder.observe("GET /bids/export (first byte)", ((first_byte or time.perf_counter()) - start) * 1000)
+    recorder.observe("GET /bids/export (full stream)", total * 1000)
+    recorder.stop()
+
+    # CSV starts with a header line
+    rows = max(lines - 1, 0) if args.format == "csv" else lines
+    rss = [value for value in rss if value is not None]
+    metrics = {
+        "rows": rows,
+        "wire_bytes": wire_bytes,
+        "rows_per_s": round(rows / total, 1) if total else None,
+        "server_rss_start_mb": round(rss[0], 1) if rss else None,
+        "server_rss_peak_mb": round(max(rss), 1) if rss else None,
+    }
+    checks = {"status_ok": response.status_code == 200}
+    if rss and args.rss_ceiling_mb:
+        checks["server_rss_under_ceiling"] = max(rss) <= args.rss_ceiling_mb
+    return metrics, checks
+
+
+async def proxy_war(ctx: Context) -> Tuple[dict, dict]:
+    """
+    Two buyers fight over --rounds price levels, once with manual bids and
+    once with proxy maximums, on separate auctions. Reports requests sent
+    and bids written for each; both must end at the same price.
+    """
+    args, client, recorder = ctx.args, ctx.client, ctx.recorder
+    fixture = await build_fixture(client, buyers=2, auctions=2)
+    manual_auction, proxy_auction = fixture.auction_ids
+    first, second = fixture.buyer_ids
+    top = 100.0 + args.rounds - 1
+    recorder.start()
+
+    start = time.perf_counter()
+    for i in range(args.rounds):
+        await recorder.request(client, "POST", "/bids/", "POST /bids/", json={
+            "auction_id": manual_auction, "user_id": fixture.buyer_ids[i % 2], "amount": 100.0 + i
+        })
+    manual_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    for user_id, max_amount in ((first, top - 1), (second, top)):
+        await recorder.request(client, "POST", "/bids/proxy", "POST /bids/proxy", json={
+            "auction_id": proxy_auction, "user_id": user_id, "max_amount": max_amount
+        })
+    proxy_ms = (time.perf_counter() - start) * 1000
+    recorder.stop()
+
+    manual_bids = await fetch_auction_bids(client, manual_auction)
+    proxy_bids = await fetch_auction_bids(client, proxy_auction)
+    metrics = {
+        "manual": {"requests": args.rounds, "bids_written": len(manual_bids), "elapsed_ms": round(manual_ms, 1)},
+        "proxy": {"requests": 2, "bids_written": len(proxy_bids), "elapsed_ms": round(proxy_ms, 1)},
+    }
+    checks = {
+        "no_server_errors": no_server_errors(recorder),
+        "same_final_price": bool(manual_bids and proxy_bids) and manual_bids[-1]["amount"] == proxy_bids[-1]["amount"] == top,
+        "proxy_writes_fewer_bids": len(proxy_bids) < len(manual_bids),
+    }
+    return metrics, checks
+
+
+SCENARIOS = {
+    "browse": browse,
+    "storm": storm,
+    "login": login_burst,
+    "expiry": expiry,
+    "watchers": watchers,
+    "search": search,
+    "export": export,
+    "proxy-war": proxy_war,
+}
@@ -0,0 +1,106 @@
+# tests/conftest.py
+import itertools
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+# Point the app at a throwaway SQLite database and in-process backends before anything imports it
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='bw-tests-')}/test.db"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ["READ_REPLICA_URLS"] = ""
+os.environ["EMAIL_TRANSPORT"] = "fake"
+os.environ["BCRYPT_ROUNDS"] = "4"
+for backend in ("RESPONSE_CACHE_BACKEND", "AUCTION_EVENTS_BACKEND", "IDEMPOTENCY_BACKEND", "LOGIN_THROTTLE_BACKEND"):
+    os.environ[backend] = "memory"
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlmodel import Session, SQLModel
+
+from app.main import app
+from app.entities.auction import Auction
+from app.entities.item import Item
+from app.entities.user import User
+from app.services.db import engine as app_engine
+
+# Names stay unique across the session, so tests share one database without colliding
+_sequence = itertools.count(1)
+
+
+class QueryLog:
+    """Every statement run on an engine or connection while the block is active"""
+
+    def __init__(self, bind):
+        self.bind = bind
+        self.statements = []
+
+    def __enter__(self):
+        event.listen(self.bind, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(self.bind, "before_cursor_execute", self._record)
+
+    def _record(self, connection, cursor, statement, parameters, context, executemany):
+        self.statements.append((statement, parameters))
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+
+@pytest.fixture(scope="session")
+def engine():
+    SQLModel.metadata.create_all(app_engine)
+    return app_engine
+
+
+@pytest.fixture
+def db(engine):
+    with Session(engine, expire_on_commit=False) as session:
+        yield session
+
+
+@pytest.fixture
+def client(engine):
+    # No context manager: startup (closer, scheduler, sequencer) stays off unless a test asks for it
+    return TestClient(app)
+
+
+@pytest.fixture
+def query_log():
+    return QueryLog
+
+
+@pytest.fixture
+def make_user(db):
+    def make(role: str = "buyer", **fields) -> User:
+        n = next(_sequence)
+        user = User(
+            username=f"user{n}", email=f"user{n}@test.local", password="x", is_active=True, is_admin=False,
+            role=role, street="1 Test St", city="Testville", country="Testland", postal_code="00000", **fields
+        )
+        db.add(user)
+        db.commit()
+        return user
+    return make
+
+
+@pytest.fixture
+def make_auction(db, make_user):
+    def make(seller: User = None, ends_in: timedelta = timedelta(days=1), initial_price: float = 100.0,
+             min_bid_increment: float = 5.0, **fields) -> Auction:
+        seller = seller or make_user(role="seller")
+        item = Item(name=f"Item {next(_sequence)}", description="test item", initial_price=initial_price)
+        db.add(item)
+        db.flush()
+        now = datetime.utcnow()
+        auction = Auction(
+            start_date=now - timedelta(days=1), end_date=now + ends_in, min_bid_increment=min_bid_increment,
+            item_id=item.id, user_id=seller.id, **fields
+        )
+        db.add(auction)
+        db.commit()
+        return auction
+    return make
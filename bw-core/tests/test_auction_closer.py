@@ -0,0 +1,41 @@
+# tests/test_auction_closer.py
+import asyncio
+from datetime import timedelta
+
+from sqlalchemy.exc import OperationalError
+
+from app.entities.auction import Auction
+from app.entities.bid import Bid
+from app.services import auction_closer
+from app.services.auction_closer import AuctionCloser
+from app.services.background_service import process_ended_auctions_task
+
+
+def test_resync_survives_a_database_without_tables(monkeypatch):
+    def missing_tables():
+        raise OperationalError("SELECT auction.id FROM auction", {}, Exception("no such table: auction"))
+
+    monkeypatch.setattr(auction_closer, "_load_deadlines", missing_tables)
+    closer = AuctionCloser()
+
+    async def start_and_stop():
+        await closer.start()
+        await closer.stop()
+
+    asyncio.run(start_and_stop())
+    assert closer.pending() == 0
+
+
+def test_sweep_settles_auctions_the_heap_never_saw(db, make_user, make_auction):
+    buyer = make_user()
+    auction = make_auction(ends_in=timedelta(minutes=-1))
+    bid = Bid(amount=150.0, user_id=buyer.id, auction_id=auction.id)
+    db.add(bid)
+    db.commit()
+
+    process_ended_auctions_task()
+
+    db.expire_all()
+    settled = db.get(Auction, auction.id)
+    assert settled.is_active is False
+    assert settled.winning_bid_id == bid.id
@@ -0,0 +1,49 @@
+# tests/test_auction_events.py
+import asyncio
+
+from app.services.auction_events import ENDED_EVENT_ID, AuctionEventHub, format_sse
+
+
+class SharedBackend:
+    """Stands in for LISTEN/NOTIFY: every published event reaches every worker's hub"""
+
+    def __init__(self):
+        self.hubs = []
+
+    def start(self, hub):
+        self.hubs.append(hub)
+
+    def stop(self):
+        pass
+
+    def publish(self, auction_id, event):
+        for hub in self.hubs:
+            hub.deliver(auction_id, event)
+
+
+def _bid(bid_id, amount):
+    return {"type": "bid", "auction_id": 7, "bid_id": bid_id, "amount": amount, "user_id": 1, "created_at": None}
+
+
+def test_a_client_resumes_on_another_worker_from_its_last_event_id():
+    async def scenario():
+        backend = SharedBackend()
+        first, second = AuctionEventHub(), AuctionEventHub()
+        first.start(asyncio.get_running_loop(), backend)
+        second.start(asyncio.get_running_loop(), backend)
+        # The second worker saw one bid the first never did (it started later)
+        second.deliver(7, _bid(3, 90.0))
+        for bid_id, amount in ((11, 100.0), (12, 105.0), (15, 110.0)):
+            first.publish(7, _bid(bid_id, amount))
+        first.publish(7, {"type": "ended", "auction_id": 7, "winning_bid_id": 15, "winning_amount": 110.0})
+        await asyncio.sleep(0)
+
+        # Watching the first worker, the client got as far as bid 12
+        last_event_id = first.events_since(7, 0)[1][0]
+        assert format_sse(last_event_id, _bid(12, 105.0)).startswith("id: 12\n")
+
+        replayed = second.events_since(7, last_event_id)
+        assert [event_id for event_id, _ in replayed] == [15, ENDED_EVENT_ID]
+        assert [event["type"] for _, event in replayed] == ["bid", "ended"]
+
+    asyncio.run(scenario())
@@ -0,0 +1,61 @@
+# tests/test_bid_export.py
+import asyncio
+import json
+
+from app.entities.bid import Bid
+from app.main import app
+from app.services import export, security
+
+EXPORT = "/api/v1/bids/export"
+
+
+def _stream(path: str, query: str, headers: dict) -> tuple:
+    """Drive the ASGI app directly and keep every body message, which test clients join into one"""
+    messages, requested = [], []
+
+    async def receive():
+        if not requested:
+            requested.append(True)
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # The client stays connected until the response is complete
+        await asyncio.Event().wait()
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http", "http_version": "1.1", "method": "GET", "scheme": "http", "path": path,
+        "raw_path": path.encode(), "root_path": "", "query_string": query.encode(),
+        "headers": [(name.lower().encode(), value.encode()) for name, value in headers.items()],
+        "client": ("testclient", 50000), "server": ("testserver", 80),
+    }
+    asyncio.run(app(scope, receive, send))
+    start = messages[0]
+    chunks = [message["body"] for message in messages[1:] if message["body"]]
+    return start["status"], dict((name.decode(), value.decode()) for name, value in start["headers"]), chunks
+
+
+def test_bid_export_needs_the_admin_token(client, monkeypatch):
+    monkeypatch.setattr(security, "ADMIN_API_TOKEN", "s3cret")
+    assert client.get(EXPORT).status_code == 401
+    assert client.get(EXPORT, headers={"X-Admin-Token": "guess"}).status_code == 401
+    monkeypatch.setattr(security, "ADMIN_API_TOKEN", None)
+    assert client.get(EXPORT, headers={"X-Admin-Token": "s3cret"}).status_code == 403
+
+
+def test_bid_export_streams_one_chunk_per_batch(db, make_user, make_auction, monkeypatch):
+    monkeypatch.setattr(security, "ADMIN_API_TOKEN", "s3cret")
+    monkeypatch.setattr(export, "EXPORT_BATCH_SIZE", 2)
+    buyer, auction = make_user(), make_auction()
+    for amount in (110.0, 120.0, 130.0, 140.0, 150.0):
+        db.add(Bid(amount=amount, user_id=buyer.id, auction_id=auction.id))
+    db.commit()
+
+    status, headers, chunks = _stream(EXPORT, f"auction_id={auction.id}", {"X-Admin-Token": "s3cret"})
+
+    assert status == 200
+    # Sent as it is read: no Content-Length up front, and one body message per batch of two rows
+    assert "content-length" not in headers
+    assert [chunk.count(b"\n") for chunk in chunks] == [2, 2, 1]
+    rows = [json.loads(line) for chunk in chunks for line in chunk.splitlines()]
+    assert [row["amount"] for row in rows] == [110.0, 120.0, 130.0, 140.0, 150.0]
@@ -0,0 +1,75 @@
+# tests/test_bid_sequencer.py
+import asyncio
+import re
+
+import pytest
+
+from sqlmodel import Session
+
+from app.entities.bid import BidCreate
+from app.services.bid_sequencer import BidSequencer
+from app.services.bid_service import delete_bid
+from app.services.db import engine
+
+from conftest import QueryLog
+
+
+def test_several_workers_need_explicit_slots_without_postgres():
+    sequencer = BidSequencer(enabled=True, worker_index=None, worker_count=4)
+    with pytest.raises(RuntimeError):
+        asyncio.run(sequencer.start())
+
+
+def test_an_explicit_slot_is_used_as_given():
+    sequencer = BidSequencer(enabled=True, worker_index=2, worker_count=4)
+    asyncio.run(sequencer.start())
+    owned = [auction_id for auction_id in range(1, 200) if sequencer.owns(auction_id)]
+    assert owned and all(sequencer.ring.owner(auction_id) == 2 for auction_id in owned)
+
+
+def test_steady_batches_read_state_once_and_roles_once_per_bidder(make_user, make_auction):
+    buyers = [make_user(), make_user()]
+    auction = make_auction(initial_price=100, min_bid_increment=5)
+    sequencer = BidSequencer(enabled=True, worker_index=None, worker_count=1)
+
+    async def bid_six_times():
+        await sequencer.start()
+        placed = []
+        for step in range(6):
+            bid = BidCreate(auction_id=auction.id, user_id=buyers[step % 2].id, amount=100 + step * 5)
+            placed.append(await sequencer.submit(bid))
+        await sequencer.stop()
+        return placed
+
+    with QueryLog(engine) as log:
+        placed = asyncio.run(bid_six_times())
+
+    assert [bid.amount for bid in placed] == [100, 105, 110, 115, 120, 125]
+    reads = [statement for statement, _ in log.statements if statement.lstrip().upper().startswith("SELECT")]
+    assert sum("JOIN item" in statement for statement in reads) == 1
+    # One role lookup per bidder, however many bids each places
+    assert sum(bool(re.search(r"FROM user\b", statement)) for statement in reads) == len(buyers)
+
+
+def test_a_lost_compare_and_swap_revalidates_bids_rejected_on_stale_state(make_user, make_auction):
+    buyers = [make_user(), make_user()]
+    auction = make_auction(initial_price=100, min_bid_increment=5)
+    sequencer = BidSequencer(enabled=True, worker_index=None, worker_count=1)
+
+    async def bid_around_a_deletion():
+        await sequencer.start()
+        top = await sequencer.submit(BidCreate(auction_id=auction.id, user_id=buyers[0].id, amount=200))
+        # Edited behind the actor's back: the price falls back to initial_price
+        with Session(engine) as db:
+            delete_bid(db, top.id)
+        # One batch: 150 is too low for the actor's stale price of 200, 210 is not
+        placed = await asyncio.gather(*(
+            sequencer.submit(BidCreate(auction_id=auction.id, user_id=buyer.id, amount=amount))
+            for buyer, amount in zip(buyers, (150, 210))
+        ), return_exceptions=True)
+        await sequencer.stop()
+        return placed
+
+    placed = asyncio.run(bid_around_a_deletion())
+
+    assert [bid.amount for bid in placed] == [150, 210]
@@ -0,0 +1,37 @@
+# tests/test_email_outbox.py
+import asyncio
+
+from sqlmodel import select
+
+from app.entities.email_outbox import EmailOutbox
+from app.services import email_service
+from app.services.email_service import EmailOutboxWorker, FakeTransport, get_transport, queue_auction_end_notification
+
+
+def test_the_fake_transport_is_opt_in(monkeypatch):
+    monkeypatch.setattr(email_service, "EMAIL_TRANSPORT", "fake")
+    assert isinstance(get_transport(), FakeTransport)
+
+    monkeypatch.setattr(email_service, "EMAIL_TRANSPORT", "resend")
+    monkeypatch.setattr(email_service, "RESEND_API_KEY", None)
+    assert get_transport() is None
+
+
+def test_without_a_resend_key_queued_emails_stay_pending(db, monkeypatch):
+    monkeypatch.setattr(email_service, "EMAIL_TRANSPORT", "resend")
+    monkeypatch.setattr(email_service, "RESEND_API_KEY", None)
+    queue_auction_end_notification(db, "winner@example.com", "seller@example.com", "Lamp", 120)
+    db.commit()
+    queued = [message.id for message in db.exec(select(EmailOutbox).where(EmailOutbox.status == "pending")).all()]
+
+    async def run_worker():
+        worker = EmailOutboxWorker(poll_seconds=0.01)
+        worker.start()
+        worker.notify()
+        await asyncio.sleep(0.05)
+        await worker.stop()
+
+    asyncio.run(run_worker())
+    db.expire_all()
+    statuses = {message.status for message in db.exec(select(EmailOutbox).where(EmailOutbox.id.in_(queued))).all()}
+    assert queued and statuses == {"pending"}
@@ -0,0 +1,109 @@
+# tests/test_idempotency.py
+import asyncio
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from sqlmodel import select
+
+from app.entities.bid import Bid
+from app.services.idempotency import REPLAYED_HEADER, IdempotencyMiddleware, MemoryIdempotencyStore
+
+
+def _payment_app(handler):
+    """A one-route app behind the middleware with its own store, so tests never share keys"""
+    app = FastAPI()
+    app.add_middleware(IdempotencyMiddleware, routes=[("POST", r"/pay")], store=MemoryIdempotencyStore())
+    app.post("/pay")(handler)
+    return app
+
+
+def _post(app, *requests):
+    """Send the (json, key) requests concurrently; returns their responses in order"""
+    async def send_all():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await asyncio.gather(*(
+                client.post("/pay", json=body, headers={"Idempotency-Key": key}) for body, key in requests
+            ))
+    return asyncio.run(send_all())
+
+
+def test_parallel_requests_with_one_key_run_once():
+    calls = []
+    release = asyncio.Event()
+
+    async def pay(request: Request):
+        calls.append(await request.json())
+        # Hold the first request open until the duplicate has been answered
+        await release.wait()
+        return {"paid": True}
+
+    async def duplicate_then_release(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            first = asyncio.create_task(client.post("/pay", json={"amount": 10}, headers={"Idempotency-Key": "k1"}))
+            while not calls:
+                await asyncio.sleep(0)
+            second = await client.post("/pay", json={"amount": 10}, headers={"Idempotency-Key": "k1"})
+            release.set()
+            return await first, second
+
+    first, second = asyncio.run(duplicate_then_release(_payment_app(pay)))
+    assert first.status_code == 200
+    assert second.status_code == 409
+    assert len(calls) == 1
+
+
+def test_a_retry_after_completion_is_replayed():
+    calls = []
+
+    async def pay(request: Request):
+        calls.append(await request.json())
+        return {"paid": True}
+
+    app = _payment_app(pay)
+    (first,) = _post(app, ({"amount": 10}, "k2"))
+    (retry,) = _post(app, ({"amount": 10}, "k2"))
+    assert first.json() == retry.json() == {"paid": True}
+    assert retry.headers[REPLAYED_HEADER] == "true"
+    assert len(calls) == 1
+
+
+def test_reusing_a_key_for_a_different_body_is_rejected():
+    async def pay(request: Request):
+        return {"paid": True}
+
+    app = _payment_app(pay)
+    _post(app, ({"amount": 10}, "k3"))
+    (reused,) = _post(app, ({"amount": 99}, "k3"))
+    assert reused.status_code == 422
+
+
+def test_server_errors_are_not_stored():
+    calls = []
+
+    async def pay(request: Request):
+        calls.append(await request.json())
+        if len(calls) == 1:
+            return JSONResponse({"detail": "gateway down"}, status_code=503)
+        return {"paid": True}
+
+    app = _payment_app(pay)
+    (failed,) = _post(app, ({"amount": 10}, "k4"))
+    (retry,) = _post(app, ({"amount": 10}, "k4"))
+    assert failed.status_code == 503
+    assert retry.status_code == 200 and REPLAYED_HEADER not in retry.headers
+    assert len(calls) == 2
+
+
+def test_a_retried_bid_is_placed_once(client, db, make_user, make_auction):
+    buyer, auction = make_user(), make_auction()
+    bid = {"auction_id": auction.id, "user_id": buyer.id, "amount": 100}
+    headers = {"Idempotency-Key": f"bid-{auction.id}"}
+
+    first = client.post("/api/v1/bids/", json=bid, headers=headers)
+    retry = client.post("/api/v1/bids/", json=bid, headers=headers)
+
+    assert first.status_code == 201
+    assert retry.status_code == 201 and retry.headers[REPLAYED_HEADER] == "true"
+    assert retry.json()["id"] == first.json()["id"]
+    assert len(db.exec(select(Bid).where(Bid.auction_id == auction.id)).all()) == 1
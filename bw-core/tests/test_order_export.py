@@ -0,0 +1,50 @@
+# tests/test_order_export.py
+import json
+
+import pytest
+
+from app.entities.order import Order
+from app.services import security
+
+EXPORT = "/api/v1/orders/export"
+
+
+@pytest.fixture
+def order(db, make_user, make_auction):
+    buyer, auction = make_user(), make_auction()
+    order = Order(
+        user_id=buyer.id, user_name="Pat Buyer", street_address="1 Test St", phone_number="555-0100",
+        province="ON", country="Canada", postal_code="M3J 1P3", total_paid=120.0,
+        item_id=auction.item_id, auction_id=auction.id
+    )
+    db.add(order)
+    db.commit()
+    return order
+
+
+def _rows(response):
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_export_is_disabled_without_an_admin_token(client, order, monkeypatch):
+    monkeypatch.setattr(security, "ADMIN_API_TOKEN", None)
+    assert client.get(EXPORT, headers={"X-Admin-Token": "anything"}).status_code == 403
+
+
+def test_export_rejects_a_wrong_or_missing_token(client, order, monkeypatch):
+    monkeypatch.setattr(security, "ADMIN_API_TOKEN", "s3cret")
+    assert client.get(EXPORT).status_code == 401
+    assert client.get(EXPORT, headers={"X-Admin-Token": "guess"}).status_code == 401
+
+
+def test_export_leaves_out_shipping_details_unless_asked(client, order, monkeypatch):
+    monkeypatch.setattr(security, "ADMIN_API_TOKEN", "s3cret")
+    headers = {"X-Admin-Token": "s3cret"}
+
+    (row,) = _rows(client.get(EXPORT, params={"auction_id": order.auction_id}, headers=headers))
+    assert row == {
+        "id": order.id, "user_id": order.user_id, "auction_id": order.auction_id,
+        "item_id": order.item_id, "total_paid": 120.0,
+    }
+    (row,) = _rows(client.get(EXPORT, params={"auction_id": order.auction_id, "include_shipping": True}, headers=headers))
+    assert row["street_address"] == "1 Test St" and row["phone_number"] == "555-0100"
@@ -0,0 +1,59 @@
+# tests/test_query_counts.py
+"""
+The list and detail reads must run a fixed number of queries however many
+rows they return: a lazy load per row (an N+1) shows up as a count that
+grows with the data.
+"""
+import pytest
+
+from app.entities.bid import Bid
+from app.services.db import engine, get_async_engine
+
+from conftest import QueryLog
+
+API = "/api/v1"
+
+
+def _queries(client, url: str) -> int:
+    """Statements a GET runs on either engine; each url is fetched once, so never from the response cache"""
+    with QueryLog(engine) as sync_log, QueryLog(get_async_engine().sync_engine) as async_log:
+        response = client.get(url)
+    assert response.status_code == 200, response.text
+    return sync_log.count + async_log.count
+
+
+@pytest.fixture
+def add_bids(db, make_user):
+    def add(auction, count: int):
+        bidders = [make_user() for _ in range(count)]
+        for step, bidder in enumerate(bidders, start=1):
+            db.add(Bid(auction_id=auction.id, user_id=bidder.id, amount=100 + step * 5))
+        db.commit()
+        return bidders
+    return add
+
+
+def test_read_auctions_query_count_is_constant(client, make_auction):
+    make_auction()
+    few = _queries(client, f"{API}/auctions/?limit=2")
+    for _ in range(20):
+        make_auction()
+    many = _queries(client, f"{API}/auctions/?limit=20")
+    assert few == many == 1
+
+
+def test_read_auction_query_count_is_constant(client, make_auction, add_bids):
+    quiet, busy = make_auction(), make_auction()
+    add_bids(quiet, 1)
+    add_bids(busy, 20)
+    few = _queries(client, f"{API}/auctions/{quiet.id}")
+    many = _queries(client, f"{API}/auctions/{busy.id}")
+    assert few == many <= 3
+
+
+def test_get_users_page_query_count_is_constant(client, make_auction, add_bids):
+    for _ in range(3):
+        add_bids(make_auction(), 3)
+    few = _queries(client, f"{API}/user/?limit=2")
+    many = _queries(client, f"{API}/user/?limit=40")
+    assert few == many <= 3
@@ -0,0 +1,112 @@
+# tests/test_query_plans.py
+"""
+EXPLAIN every statement the hot service queries run, against a database
+seeded with PLAN_TEST_BIDS synthetic bids, and fail on any full scan of
+a table. Runs on SQLite by default; point PLAN_TEST_DATABASE_URL at a
+scratch Postgres database (its tables are dropped and recreated) to check
+the Postgres plans too.
+"""
+import os
+import re
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlmodel import Session, SQLModel, select
+
+from app.entities.auction import Auction
+from app.entities.bid import Bid
+from app.entities.user import User
+from app.services.auction_service import (
+    close_due_auctions,
+    get_auction_bids_page,
+    get_auction_with_latest_bid,
+    get_auctions_by_seller,
+    get_latest_bid,
+    process_ended_auctions,
+)
+from app.services.synthetic_data import SyntheticConfig, generate
+from app.services.user import has_active_bids
+
+from conftest import QueryLog
+
+PLAN_TEST_BIDS = int(os.getenv("PLAN_TEST_BIDS", "1000000"))
+PLAN_TEST_DATABASE_URL = os.getenv("PLAN_TEST_DATABASE_URL")
+TABLES = set(SQLModel.metadata.tables)
+WRITES = re.compile(r"^\s*(SELECT|UPDATE|DELETE)\b", re.IGNORECASE)
+
+
+@pytest.fixture(scope="module")
+def plan_engine(tmp_path_factory):
+    url = PLAN_TEST_DATABASE_URL or f"sqlite:///{tmp_path_factory.mktemp('plans')}/plans.db"
+    engine = create_engine(url)
+    SQLModel.metadata.drop_all(engine)
+    SQLModel.metadata.create_all(engine)
+    generate(engine, SyntheticConfig(
+        users=max(PLAN_TEST_BIDS // 50, 100),
+        auctions=max(PLAN_TEST_BIDS // 100, 50),
+        bids=PLAN_TEST_BIDS,
+        workers=os.cpu_count() or 1,
+    ))
+    if engine.dialect.name == "sqlite":
+        # generate() analyzes on Postgres; give SQLite's planner the same statistics
+        with engine.begin() as connection:
+            connection.exec_driver_sql("ANALYZE")
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(scope="module")
+def sample(plan_engine):
+    """Ids for the queries: the busiest auction, a seller and a bidder"""
+    with Session(plan_engine) as db:
+        auction_id = db.exec(select(Bid.auction_id).order_by(Bid.amount.desc()).limit(1)).one()
+        seller_id = db.exec(select(Auction.user_id).limit(1)).one()
+        bidder_id = db.exec(select(Bid.user_id).where(Bid.auction_id == auction_id).limit(1)).one()
+        ended_ids = db.exec(select(Auction.id).where(Auction.is_active == False).limit(50)).all()
+    return {"auction": auction_id, "seller": seller_id, "bidder": bidder_id, "ended": ended_ids}
+
+
+def _full_scans(connection, statement: str, parameters) -> list:
+    """Tables the statement reads in full, according to the database's own planner"""
+    if connection.dialect.name == "sqlite":
+        rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+        # "SCAN bid" is a table scan; "SEARCH ..." and "SCAN ... USING INDEX" are not
+        return [match.group(1) for *_, detail in rows if (match := re.fullmatch(r"SCAN (\w+)", detail))]
+
+    (plan,) = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters).one()
+    scans, nodes = [], [plan[0]["Plan"]]
+    while nodes:
+        node = nodes.pop()
+        if node["Node Type"] == "Seq Scan":
+            scans.append(node["Relation Name"])
+        nodes.extend(node.get("Plans", []))
+    return scans
+
+
+QUERIES = {
+    "get_latest_bid": lambda db, ids: get_latest_bid(db, ids["auction"]),
+    "get_auction_with_latest_bid": lambda db, ids: get_auction_with_latest_bid(db, ids["auction"]),
+    "get_auction_bids_page": lambda db, ids: get_auction_bids_page(db, ids["auction"]),
+    "process_ended_auctions": lambda db, ids: process_ended_auctions(db),
+    "close_due_auctions": lambda db, ids: close_due_auctions(db, ids["ended"]),
+    "has_active_bids": lambda db, ids: has_active_bids(db, ids["bidder"]),
+    "get_auctions_by_seller": lambda db, ids: get_auctions_by_seller(db, ids["seller"]),
+}
+
+
+@pytest.mark.parametrize("name", QUERIES)
+def test_hot_query_uses_indexes(plan_engine, sample, name):
+    with plan_engine.connect() as connection:
+        transaction = connection.begin()
+        # The session joins the outer transaction, so even the settling queries' commits are rolled back
+        with QueryLog(connection) as log, Session(bind=connection) as db:
+            QUERIES[name](db, sample)
+        statements = [(statement, parameters) for statement, parameters in log.statements if WRITES.match(statement)]
+        assert statements, f"{name} ran no queries"
+        scans = {
+            statement: tables
+            for statement, parameters in statements
+            if (tables := [table for table in _full_scans(connection, statement, parameters) if table in TABLES])
+        }
+        transaction.rollback()
+    assert not scans, f"{name} scans whole tables at {PLAN_TEST_BIDS} bids: {scans}"
@@ -0,0 +1,53 @@
+# tests/test_rate_limit.py
+from app.services.rate_limit import MemoryRateLimitStore
+
+
+def test_rotating_keys_cannot_evict_a_blocked_key():
+    store = MemoryRateLimitStore(limit=5, window=300, max_keys=10)
+    for _ in range(5):
+        store.record_failure("victim@example.com")
+    assert store.is_blocked("victim@example.com")
+
+    for index in range(100):
+        store.record_failure(f"rotated-{index}@example.com")
+
+    assert store.is_blocked("victim@example.com")
+    assert len(store) == 10
+
+
+def test_expired_counters_are_evicted_before_live_ones(monkeypatch):
+    clock = {"now": 1_000_000.0}
+    monkeypatch.setattr("app.services.rate_limit.time.time", lambda: clock["now"])
+    store = MemoryRateLimitStore(limit=5, window=300, max_keys=3)
+    store.record_failure("stale-1")
+    store.record_failure("stale-2")
+    clock["now"] += 900
+    store.record_failure("live-1")
+    store.record_failure("live-2")
+
+    assert set(store._counters) == {"live-1", "live-2"}
+
+
+def test_a_store_full_of_blocked_keys_fails_closed():
+    store = MemoryRateLimitStore(limit=5, window=300, max_keys=10)
+    for index in range(10):
+        for _ in range(5):
+            store.record_failure(f"attacker-{index}@example.com")
+
+    for _ in range(50):
+        store.record_failure("victim@example.com")
+
+    assert store.is_blocked("victim@example.com")
+    assert all(store.is_blocked(f"attacker-{index}@example.com") for index in range(10))
+    assert len(store) == 10
+
+
+def test_making_room_drops_the_least_recently_failed_counter():
+    store = MemoryRateLimitStore(limit=5, window=300, max_keys=3)
+    for key in ("first", "second", "third", "fourth"):
+        store.record_failure(key)
+    store.record_failure("second")
+    store.record_failure("fifth")
+
+    assert set(store._counters) == {"fourth", "second", "fifth"}
+    assert not store.is_blocked("first")
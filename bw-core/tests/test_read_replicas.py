@@ -0,0 +1,60 @@
+# tests/test_read_replicas.py
+"""
+Reads go to a replica unless the client wrote within REPLICA_STICKY_SECONDS.
+The "replica" here is a second, empty SQLite database, so which one served
+a read shows in whether the primary's rows came back.
+"""
+import pytest
+from sqlmodel import SQLModel, create_engine
+
+from app.services import db as db_module
+
+API = "/api/v1"
+
+
+@pytest.fixture
+def replica(tmp_path, monkeypatch):
+    url = f"sqlite:///{tmp_path}/replica.db"
+    schema_engine = create_engine(url)
+    SQLModel.metadata.create_all(schema_engine)
+    schema_engine.dispose()
+    for replica_set in (db_module.replicas, db_module.async_replicas):
+        monkeypatch.setattr(replica_set, "urls", [url])
+        monkeypatch.setattr(replica_set, "_engines", None)
+    yield url
+    for engine_ in db_module.replicas.created():
+        engine_.dispose()
+    for engine_ in db_module.async_replicas.created():
+        engine_.sync_engine.dispose()
+
+
+def _write(client):
+    response = client.post(f"{API}/items/", json={"name": "Lamp", "description": "brass lamp", "initial_price": 20})
+    assert response.status_code == 201
+    assert db_module.LAST_WRITE_COOKIE in response.cookies
+
+
+def test_reads_use_the_replica_without_a_recent_write(client, replica, make_auction):
+    auction = make_auction()
+
+    assert client.get(f"{API}/auctions/startedby", params={"seller_id": auction.user_id}).status_code == 404
+    assert client.get(f"{API}/auctions/", params={"limit": 500}).json() == []
+
+
+def test_reads_after_a_write_go_to_the_primary(client, replica, make_auction):
+    auction = make_auction()
+    _write(client)
+
+    sync_read = client.get(f"{API}/auctions/startedby", params={"seller_id": auction.user_id})
+    assert sync_read.status_code == 200
+    assert [row["id"] for row in sync_read.json()] == [auction.id]
+    async_read = client.get(f"{API}/auctions/", params={"limit": 500})
+    assert auction.id in {row["id"] for row in async_read.json()}
+
+
+def test_the_read_your_writes_window_expires(client, replica, make_auction, monkeypatch):
+    auction = make_auction()
+    _write(client)
+    monkeypatch.setattr(db_module, "REPLICA_STICKY_SECONDS", 0)
+
+    assert client.get(f"{API}/auctions/startedby", params={"seller_id": auction.user_id}).status_code == 404
@@ -0,0 +1,33 @@
+# tests/test_search.py
+from datetime import timedelta
+
+from app.entities.item import Item
+from app.services import search
+from app.services.search import search_auctions
+
+
+def test_ending_soon_skips_auctions_already_past_their_end(db, make_auction):
+    auctions = {
+        "expired": make_auction(ends_in=timedelta(minutes=-5)),
+        "soon": make_auction(ends_in=timedelta(minutes=30)),
+        "later": make_auction(ends_in=timedelta(days=2)),
+    }
+    for auction in auctions.values():
+        db.get(Item, auction.item_id).name = "Brass zeppelin telescope"
+    db.commit()
+
+    found = [result["id"] for result in search_auctions(db, "zeppelin", ending_within=timedelta(hours=1))]
+
+    assert found == [auctions["soon"].id]
+
+
+def test_the_in_memory_path_loads_matches_in_bounded_chunks(db, make_auction, monkeypatch):
+    monkeypatch.setattr(search, "MEMORY_FETCH_CHUNK", 2)
+    auctions = [make_auction(ends_in=timedelta(days=1, minutes=index)) for index in range(5)]
+    for auction in auctions:
+        db.get(Item, auction.item_id).name = "Walnut gramophone cabinet"
+    db.commit()
+
+    found = [result["id"] for result in search_auctions(db, "gramophone", limit=3)]
+
+    assert found == [auction.id for auction in auctions[:3]]
@@ -0,0 +1,38 @@
+# tests/test_synthetic_data.py
+import asyncio
+
+from sqlmodel import func, select
+
+from app.entities.auction import Auction
+from app.services import security
+from app.services.response_cache import CachedResponse, response_cache
+from app.services.synthetic_data import SyntheticConfig, generate
+
+
+def test_generate_invalidates_cached_reads_of_the_new_auctions(engine, db):
+    # As after a database reset: the cache still holds a read for an id the load is about to reuse
+    next_id = (db.exec(select(func.max(Auction.id))).one() or 0) + 1
+    key = f"auction:{next_id}"
+
+    async def cache_stale_read():
+        version = await response_cache.version(next_id)
+        await response_cache.put(key, next_id, version, CachedResponse('"stale"', b'{"stale": true}'), ttl=3600)
+        return await response_cache.get(key, next_id)
+
+    assert asyncio.run(cache_stale_read()) is not None
+
+    summary = generate(engine, SyntheticConfig(users=10, auctions=3, bids=20))
+
+    assert summary["first_ids"]["auction"] == next_id
+    assert asyncio.run(response_cache.get(key, next_id)) is None
+
+
+def test_the_synthetic_load_endpoint_needs_the_admin_token(client, monkeypatch):
+    monkeypatch.setattr(security, "ADMIN_API_TOKEN", "s3cret")
+    url = "/api/v1/auctions/create-synthetic"
+    params = {"users": 2, "auctions": 0, "bids": 0}
+
+    assert client.post(url, params=params).status_code == 401
+    assert client.post(url, params=params, headers={"X-Admin-Token": "guess"}).status_code == 401
+    monkeypatch.setattr(security, "ADMIN_API_TOKEN", None)
+    assert client.post(url, params=params, headers={"X-Admin-Token": "s3cret"}).status_code == 403
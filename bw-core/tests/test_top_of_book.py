@@ -0,0 +1,47 @@
+# tests/test_top_of_book.py
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException
+import pytest
+
+from app.entities.auction import Auction
+from app.entities.bid import Bid, BidCreate
+from app.services.background_service import backfill_top_of_book_task
+from app.services.bid_service import backfill_top_of_book, place_bid
+
+
+def test_backfill_seeds_auctions_whose_bids_predate_the_columns(db, make_user, make_auction):
+    buyer, rival = make_user(), make_user()
+    legacy = make_auction()
+    # Same amount twice: the earlier id wins, as it does at settlement
+    first = Bid(amount=300.0, user_id=buyer.id, auction_id=legacy.id, created_at=datetime.utcnow())
+    db.add(first)
+    db.commit()
+    db.add(Bid(amount=300.0, user_id=rival.id, auction_id=legacy.id, created_at=datetime.utcnow() - timedelta(hours=1)))
+    db.add(Bid(amount=200.0, user_id=rival.id, auction_id=legacy.id))
+    untouched = make_auction()
+    db.commit()
+
+    # Other tests share the database, so only this auction is checked
+    assert backfill_top_of_book(db) >= 1
+    db.expire_all()
+    seeded = db.get(Auction, legacy.id)
+    assert (seeded.current_price, seeded.highest_bid_id) == (300.0, first.id)
+    assert db.get(Auction, untouched.id).highest_bid_id is None
+
+    # The compare-and-swap now measures new bids against the real top bid
+    with pytest.raises(HTTPException):
+        place_bid(db, BidCreate(amount=250.0, user_id=rival.id, auction_id=legacy.id))
+    assert backfill_top_of_book(db) == 0
+
+
+def test_the_startup_backfill_runs_against_the_app_database(db, make_user, make_auction):
+    buyer = make_user()
+    legacy = make_auction()
+    db.add(Bid(amount=180.0, user_id=buyer.id, auction_id=legacy.id))
+    db.commit()
+
+    backfill_top_of_book_task()
+
+    db.expire_all()
+    assert db.get(Auction, legacy.id).current_price == 180.0
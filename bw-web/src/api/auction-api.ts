@@ -1,4 +1,4 @@
-import axios from "axios";
+import axios from "@/lib/http";
 import { Auction, Item, AuctionWithItem } from "@/types/auction";
 
 const API_BASE_URL = "http://localhost:8000/api/v1";
@@ -6,7 +6,7 @@ const API_BASE_URL = "http://localhost:8000/api/v1";
 export const fetchAuctionsWithItems = async (): Promise<AuctionWithItem[]> => {
   try {
     const auctionsResponse = await axios.get<Auction[]>(
-      `${API_BASE_URL}/auctions/?skip=0&limit=100`
+      `${API_BASE_URL}/auctions/?limit=100`
     );
 
     const auctionsWithItems = await Promise.all(
@@ -67,9 +67,13 @@ export interface BidCreate {
   auction_id: number;
 }
 
-export const createBid = async (bid: BidCreate): Promise<void> => {
+// idempotencyKey names one bid attempt: pass the same key when retrying it,
+// so the backend places it at most once
+export const createBid = async (bid: BidCreate, idempotencyKey: string): Promise<void> => {
   try {
-    await axios.post(`${API_BASE_URL}/bids/`, bid);
+    await axios.post(`${API_BASE_URL}/bids/`, bid, {
+      headers: { "Idempotency-Key": idempotencyKey },
+    });
   } catch (error) {
     console.error("Error creating bid:", error);
     throw error;
@@ -87,4 +91,31 @@ export const createAuction = async (auction: AuctionCreate): Promise<void> => {
   }
 };
 
-  
\ No newline at end of file
+  
+export type AuctionEvent =
+  | {
+      type: "bid";
+      auction_id: number;
+      bid_id: number;
+      amount: number;
+      user_id: number;
+      created_at: string;
+    }
+  | {
+      type: "ended";
+      auction_id: number;
+      winning_bid_id: number | null;
+      winning_amount: number | null;
+    };
+
+// Opens the push channel for one auction; returns a function that closes it
+export const subscribeToAuction = (
+  id: number,
+  onEvent: (event: AuctionEvent) => void
+): (() => void) => {
+  const socket = new WebSocket(
+    `${API_BASE_URL.replace(/^http/, "ws")}/ws/auctions/${id}`
+  );
+  socket.onmessage = (message) => onEvent(JSON.parse(message.data));
+  return () => socket.close();
+};
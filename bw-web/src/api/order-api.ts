@@ -1,4 +1,4 @@
-import axios from "axios";
+import axios from "@/lib/http";
 import { Order } from "@/types/order";
 import { Item } from "@/types/auction";
 
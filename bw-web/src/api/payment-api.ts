@@ -1,4 +1,4 @@
-import axios from "axios";
+import axios from "@/lib/http";
 import {AuctionWithWinner, WinnerIdAndItemPrice} from "@/types/auction";
 /**
  * Calls the backend API to get the auction status for a given auction ID.
@@ -1,4 +1,4 @@
-import axios from "axios";
+import axios from "@/lib/http";
 
 const API_BASE_URL = "http://localhost:8000/api/v1";
 
@@ -1,5 +1,6 @@
 import { NextRequest, NextResponse } from "next/server";
 import axios, { AxiosError } from "axios";
+import { relayHeaders, relayJson } from "@/lib/relay";
 
 const API_BASE_URL = "http://localhost:8000/api/v1";
 
@@ -28,9 +29,10 @@ export async function POST(
 
     const response = await axios.post(
       `${API_BASE_URL}/orders/auction/add/${id}`,
-      requestBody
+      requestBody,
+      { headers: relayHeaders(request) }
     );
-    return NextResponse.json(response.data);
+    return relayJson(response);
   } catch (error) {
     console.error("Error confirming purchase:", error);
     const axiosError = error as AxiosError<ErrorResponse>;
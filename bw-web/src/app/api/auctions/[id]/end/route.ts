@@ -1,5 +1,6 @@
 import { NextRequest, NextResponse } from "next/server";
 import axios, { AxiosError } from "axios";
+import { relayHeaders, relayJson } from "@/lib/relay";
 
 const API_BASE_URL = "http://bidwize-core:8000/api/v1";
 
@@ -17,9 +18,11 @@ export async function POST(
     const { id } = await params;
 
     const response = await axios.post(
-      `${API_BASE_URL}/auctions/${id}/end`
+      `${API_BASE_URL}/auctions/${id}/end`,
+      undefined,
+      { headers: relayHeaders(request) }
     );
-    return NextResponse.json(response.data);
+    return relayJson(response);
   } catch (error) {
     console.error("Error ending auction:", error);
     const axiosError = error as AxiosError<ErrorResponse>;
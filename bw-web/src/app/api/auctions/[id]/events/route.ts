@@ -0,0 +1,39 @@
+import { NextRequest, NextResponse } from "next/server";
+import { relayHeaders } from "@/lib/relay";
+
+const API_BASE_URL = "http://bidwize-core:8000/api/v1";
+
+type Params = Promise<{ id: string }>;
+
+// Relays the backend's SSE price feed so browsers never need a WebSocket
+export async function GET(
+  request: NextRequest,
+  { params }: { params: Params }
+) {
+  const { id } = await params;
+  const lastEventId = request.headers.get("last-event-id");
+
+  const upstream = await fetch(`${API_BASE_URL}/auctions/${id}/events`, {
+    headers: {
+      ...relayHeaders(request),
+      ...(lastEventId ? { "Last-Event-ID": lastEventId } : {}),
+    },
+    signal: request.signal,
+    cache: "no-store",
+  });
+
+  if (!upstream.ok || !upstream.body) {
+    return NextResponse.json(
+      { error: "Failed to open auction event stream" },
+      { status: upstream.status || 502 }
+    );
+  }
+
+  return new Response(upstream.body, {
+    headers: {
+      "Content-Type": "text/event-stream",
+      "Cache-Control": "no-cache",
+      Connection: "keep-alive",
+    },
+  });
+}
@@ -1,5 +1,6 @@
 import { NextResponse } from "next/server";
 import axios from "axios";
+import { relayHeaders, relayJson } from "@/lib/relay";
 
 const API_BASE_URL = "http://bidwize-core:8000/api/v1";
 
@@ -7,8 +8,10 @@ const API_BASE_URL = "http://bidwize-core:8000/api/v1";
 export async function POST(request: Request) {
   try {
     const body = await request.json();
-    const response = await axios.post(`${API_BASE_URL}/auctions/`, body);
-    return NextResponse.json(response.data);
+    const response = await axios.post(`${API_BASE_URL}/auctions/`, body, {
+      headers: relayHeaders(request),
+    });
+    return relayJson(response);
   } catch (error) {
     console.error("Error creating auction:", error);
     return NextResponse.json(
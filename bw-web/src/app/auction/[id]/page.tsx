@@ -3,7 +3,7 @@
 import { useEffect, useState, useCallback } from "react";
 import { useParams, useRouter } from "next/navigation";
 import { AuctionWithItem } from "@/types/auction";
-import { fetchAuctionById, createBid } from "@/api/auction-api";
+import { fetchAuctionById, createBid, subscribeToAuction } from "@/api/auction-api";
 import { Button } from "@/components/ui/button";
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from "@/components/ui/card";
 import { Header } from "@/components/home-page/Header";
@@ -24,6 +24,8 @@ export default function AuctionPage() {
   const [error, setError] = useState<string | null>(null);
   const [bidAmount, setBidAmount] = useState<string>("");
   const [isSubmitting, setIsSubmitting] = useState(false);
+  // Key for the bid being attempted; kept across retries, dropped once it succeeds or the amount changes
+  const [bidKey, setBidKey] = useState<string | null>(null);
   const [timeLeft, setTimeLeft] = useState<{ days: number; hours: number; minutes: number; seconds: number }>({ days: 0, hours: 0, minutes: 0, seconds: 0 });
 
   const loadAuction = useCallback(async () => {
@@ -50,6 +52,38 @@ export default function AuctionPage() {
     loadAuction();
   }, [loadAuction]);
 
+  useEffect(() => {
+    setBidKey(null);
+  }, [bidAmount]);
+
+  // Apply pushed bids and auction end instead of refetching
+  useEffect(() => {
+    const id = parseInt(params.id as string);
+    if (isNaN(id)) return;
+
+    return subscribeToAuction(id, (event) => {
+      setAuction((current) => {
+        if (!current) return current;
+        if (event.type === "ended") {
+          return { ...current, is_active: false, winning_bid_id: event.winning_bid_id ?? undefined };
+        }
+        const bid = {
+          id: event.bid_id,
+          amount: event.amount,
+          user_id: event.user_id,
+          auction_id: event.auction_id,
+          created_at: event.created_at,
+        };
+        return {
+          ...current,
+          current_price: event.amount,
+          latest_bid: bid,
+          bids: [bid, ...current.bids],
+        };
+      });
+    });
+  }, [params.id]);
+
   useEffect(() => {
     if (!auction) return;
 
@@ -132,12 +166,15 @@ export default function AuctionPage() {
         return;
       }
 
+      const idempotencyKey = bidKey ?? crypto.randomUUID();
+      setBidKey(idempotencyKey);
       await createBid({
         amount,
         user_id: user.id,
         auction_id: auction.id,
-      });
+      }, idempotencyKey);
 
+      setBidKey(null);
       toast.success("Bid placed successfully!");
       // Refresh auction data
       await loadAuction();
@@ -36,6 +36,12 @@ export default function AuctionsPage() {
     security_code: ""
   });
   const [completedOrders, setCompletedOrders] = useState<Order[]>([]);
+  // Key for the payment being attempted; kept across retries, dropped once it succeeds or the details change
+  const [paymentKey, setPaymentKey] = useState<string | null>(null);
+
+  useEffect(() => {
+    setPaymentKey(null);
+  }, [paymentData, selectedAuction]);
 
   useEffect(() => {
     const loadAuctions = async () => {
@@ -138,11 +144,14 @@ export default function AuctionsPage() {
   const handlePaymentSubmit = async () => {
     if (!selectedAuction) return;
 
+    const idempotencyKey = paymentKey ?? crypto.randomUUID();
+    setPaymentKey(idempotencyKey);
     try {
       const response = await fetch(`/api/v1/payments/process-auction-payment/${selectedAuction.id}`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
+          'Idempotency-Key': idempotencyKey,
         },
         body: JSON.stringify(paymentData),
       });
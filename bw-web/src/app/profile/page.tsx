@@ -3,7 +3,7 @@
 import { useEffect, useState } from "react";
 import { useUser } from "@/contexts/UserContext";
 import { redirect } from "next/navigation";
-import axios from "axios";
+import axios from "@/lib/http";
 import { Header } from "@/components/home-page/Header";
 import { Footer } from "@/components/home-page/Footer";
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from "@/components/ui/card";
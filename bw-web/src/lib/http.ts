@@ -0,0 +1,8 @@
+import axios from "axios";
+
+// The backend pins a client to the primary database for a few seconds after
+// it writes, using a cookie. Cross-origin calls only carry that cookie with
+// credentials on, and without it a read right after a write can hit a lagging replica.
+axios.defaults.withCredentials = true;
+
+export default axios;
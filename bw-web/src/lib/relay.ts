@@ -0,0 +1,19 @@
+import { NextResponse } from "next/server";
+import type { AxiosResponse } from "axios";
+
+// Headers for a backend call made on the browser's behalf: its cookies,
+// including the read-your-writes one, travel with it
+export function relayHeaders(request: Request): Record<string, string> {
+  const cookie = request.headers.get("cookie");
+  return cookie ? { Cookie: cookie } : {};
+}
+
+// The backend's JSON answer with any cookies it set passed on to the browser
+export function relayJson(response: AxiosResponse) {
+  const relayed = NextResponse.json(response.data, { status: response.status });
+  const setCookies = response.headers["set-cookie"];
+  for (const cookie of setCookies ?? []) {
+    relayed.headers.append("Set-Cookie", cookie);
+  }
+  return relayed;
+}